@@ -1,35 +1,140 @@
 import ac
 import acsys
-import os
-import sys
-import platform
 import math
+import time
+import threading
+from collections import namedtuple
+from itertools import repeat
+from operator import sub
 
 from TrackConditionsLib.ac_gl_utils import Point
+from TrackConditionsLib.sim_info import get_info
 
-# Import Assetto Corsa shared memory library.
-# It has a dependency on ctypes, which is not included in AC python version.
-# Point to correct ctypes module based on platform architecture.
-# First, get directory of the app, then add correct folder to sys.path.
-app_dir = os.path.dirname(os.path.dirname(__file__))
+# Session data read from shared memory at one moment in time.
+# time is the time.perf_counter() value at which it was read.
+# The packets are the packetId of the physics and graphics page the data is from.
+# Session time left and lap time are in seconds, 0 if there is none.
+# The front axle (FL x, FL z, FR x, FR z) and yaw rate are of the player car.
+SessionSnapshot = namedtuple('SessionSnapshot', [
+    'time', 'physics_packet', 'graphics_packet', 'status', 'air_temp', 'road_temp', 'track_grip',
+    'session_time_left', 'lap_time', 'front_axle', 'yaw_rate'])
 
-if platform.architecture()[0] == "64bit":
-    sysdir = os.path.join(app_dir, 'dll', 'stdlib64')
-else:
-    sysdir = os.path.join(app_dir, 'dll', 'stdlib')
-# Python looks in sys.path for modules to load, insert new dir first in line.
-sys.path.insert(0, sysdir)
-os.environ['PATH'] = os.environ['PATH'] + ";."
+# Longest lap time taken as valid, in ms.
+MAX_LAP_TIME = 3600000
 
-from TrackConditionsLib.sim_info import info
+class SessionSampler:
+    """ Reads session data from shared memory into immutable snapshots.
+
+    By default a snapshot is read whenever the latest one is asked for.
+    After start() is called, a background thread reads snapshots at a fixed rate
+    instead, and latest() returns the most recently published one.
+
+    Snapshots are immutable and published with a single reference assignment,
+    which is atomic in python. The thread builds each new snapshot on the side and
+    swaps it in, so readers never wait and never see a partly updated snapshot.
+    Each page is read in one go, and read again if the game wrote it meanwhile.
+    If the game wrote it during every attempt, the read is dropped and the
+    previous snapshot stays the latest one, as if there was no new data.
+    """
+    def __init__(self):
+        # Shared memory fields are read in one go per page, with the packetId.
+        self._physics_reader = get_info().reader(
+            'physics', ['airTemp', 'roadTemp', 'tyreContactPoint', 'localAngularVel'], coherent=True)
+        self._graphics_reader = get_info().reader(
+            'graphics', ['status', 'iLastTime', 'iBestTime', 'sessionTimeLeft', 'surfaceGrip'], coherent=True)
+
+        self.snapshot = None
+        self.snapshot = self.sample()
+        self._thread = None
+        self._stop = None
+
+    def sample(self):
+        """Read a new snapshot from shared memory.
+
+        Returns the previous snapshot instead if a page couldn't be read
+        consistently, unless there is none yet.
+        """
+        physics_packet, air_temp, road_temp, points, angular_vel = self._physics_reader.read()
+        graphics_packet, status, last_lap, best_lap, time_left, surface_grip = self._graphics_reader.read()
+        consistent = self._physics_reader.consistent and self._graphics_reader.consistent
+        if not consistent and self.snapshot is not None:
+            return self.snapshot
+        # Lap times are in ms, 0 or out of range before the first lap.
+        lap_time = last_lap if 0 < last_lap < MAX_LAP_TIME else best_lap
+        lap_time = lap_time / 1000 if 0 < lap_time < MAX_LAP_TIME else 0
+        return SessionSnapshot(time.perf_counter(), physics_packet, graphics_packet,
+                               status, air_temp, road_temp, surface_grip * 100,
+                               max(time_left / 1000, 0), lap_time,
+                               front_axle(points), yaw_rate(angular_vel))
+
+    def latest(self):
+        """Return latest snapshot, reading one first if there is no background thread."""
+        if self._thread is None:
+            self.snapshot = self.sample()
+        return self.snapshot
+
+    @property
+    def running(self):
+        """Whether snapshots are read on the background thread."""
+        return self._thread is not None
+
+    def start(self, rate):
+        """Start reading snapshots on a background thread.
+
+        Args:
+            rate (float): Snapshots per second.
+        """
+        if self._thread is not None:
+            return
+        # Every thread gets its own stop event, so a thread that is slow to stop
+        # still stops, whatever start() does next.
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(1 / rate, self._stop), name="SessionSampler")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread, going back to reading on demand.
+
+        A thread still busy after a second exits on its own, without
+        publishing the snapshot it was reading.
+        """
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(1)
+        self._thread = None
+
+    def _run(self, period, stop):
+        """Background thread, publish a snapshot every period until stopped.
+
+        Args:
+            period (float): Seconds between snapshots.
+            stop (obj:threading.Event): Set to stop this thread.
+        """
+        while not stop.wait(period):
+            snapshot = self.sample()
+            if stop.is_set():
+                return
+            self.snapshot = snapshot
 
 class Session:
     """ Handling all data from AC that is not car-specific.
+
+    Everything that follows the data subscribes to its topic, 'conditions'
+    or 'car', and is called after each update of that topic, see publish().
+    Data is read once per update, however many windows show it.
+
+    The game bumps the packetId of a page every time it writes it. An update
+    whose pages have the same packetId as last time, e.g. while paused,
+    only reads the packetIds, and its subscribers aren't called.
     
     Args:
         cfg (obj:Config): App configuration.
+        sampler (obj:SessionSampler): Source of shared memory data.
+            Optional, defaults to reading shared memory on every update.
     """
-    def __init__(self, cfg):
+    def __init__(self, cfg, sampler=None):
         # Config object
         self.cfg = cfg
 
@@ -44,15 +149,95 @@ class Session:
         self.air_temp = 0
         self.road_temp = 0
         self.track_grip = 0
+        # Seconds left in the session and of the last lap, 0 if unknown.
+        self.session_time_left = 0
+        self.lap_time = 0
 
         # Initialize focused car object
         self.focused_car = Car(cfg, self.focused_car_id)
 
+        # Shared memory data comes in snapshots.
+        # Data from the ac module can only be read on the main thread.
+        self.sampler = sampler if sampler is not None else SessionSampler()
+
+        # Functions called after an update, per topic.
+        self.subscribers = {'conditions': [], 'car': []}
+
+        # Per topic: what its data was read from at the last update, whether
+        # that was new, the time since it was last published and the number
+        # of times it was published.
+        self._sources = {'conditions': None, 'car': None}
+        self.changed = {'conditions': False, 'car': False}
+        self.unpublished = {'conditions': 0.0, 'car': 0.0}
+        self.published = {'conditions': 0, 'car': 0}
+
+        # Packet ids of both pages, to tell whether the focused car moved.
+        self._physics_packet = get_info().reader('physics', [], coherent=True)
+        self._graphics_packet = get_info().reader('graphics', [], coherent=True)
+
+    def subscribe(self, topic, callback):
+        """Call a function after every update of a topic.
+
+        Args:
+            topic (str): 'conditions' or 'car'.
+            callback (callable): Called as callback(dt), with dt the time in
+                seconds since the previous update of the topic.
+        """
+        self.subscribers[topic].append(callback)
+
+    def publish(self, topic, dt):
+        """Call the subscribers of a topic, if its last update brought new data.
+
+        Subscribers get the time since the topic was last published,
+        which includes the updates without new data.
+
+        Args:
+            topic (str): 'conditions' or 'car'.
+            dt (float): Time in seconds since the previous update of the topic.
+        """
+        self.unpublished[topic] += dt
+        if not self.changed[topic]:
+            return
+        dt = self.unpublished[topic]
+        self.unpublished[topic] = 0.0
+        self.published[topic] += 1
+        for callback in self.subscribers[topic]:
+            callback(dt)
+
+    @property
+    def age(self):
+        """Seconds since the game last wrote new data, as of the last publish.
+
+        Conditions come from both pages, so this is the time since either
+        packetId changed. Grows while paused, or if the game stops writing.
+        """
+        return self.unpublished['conditions']
+
+    def _new_data(self, topic, source):
+        """Remember where the data of a topic is read from, returning if that changed."""
+        changed = source != self._sources[topic]
+        self._sources[topic] = source
+        self.changed[topic] = changed
+        return changed
+
     def update(self):
         """Update session data."""
         # Update session attributes first, then car specific ones.
-        self.focused_car_id = ac.getFocusedCar()
-        self.status = info.graphics.status
+        self.update_conditions()
+        self.update_car()
+
+    def update_conditions(self):
+        """Update data that changes slowly: status, wind, temperatures and grip.
+
+        Skipped if neither page has a new packetId.
+
+        Returns:
+            bool: Whether there was new data.
+        """
+        snapshot = self.sampler.latest()
+        if not self._new_data('conditions', (snapshot.physics_packet, snapshot.graphics_packet)):
+            return False
+        self.status = snapshot.status
 
         # Wind direction is provided based on compass directions in degrees.
         # North is 0 (or 360) degrees, East is 90, South is 180, West is 270.
@@ -61,18 +246,54 @@ class Session:
         self.wind_dir = ac.getWindDirection() * math.pi / 180
 
         self.wind_speed = ac.getWindSpeed()
-        self.air_temp = info.physics.airTemp
-        self.road_temp = info.physics.roadTemp
-        self.track_grip = info.graphics.surfaceGrip * 100
+        self.air_temp = snapshot.air_temp
+        self.road_temp = snapshot.road_temp
+        self.track_grip = snapshot.track_grip
+        self.session_time_left = snapshot.session_time_left
+        self.lap_time = snapshot.lap_time
+        return True
 
-        # Update car specific data
-        self.focused_car.set_id(self.focused_car_id)
-        self.focused_car.update()
+    def update_car(self):
+        """Update data of the focused car, which changes quickly.
+
+        Skipped if the focused car is the same and the page its data comes from
+        has the same packetId: physics for the player car, which is read from it.
+        Other cars come from the ac module, so either page counts for them,
+        e.g. the graphics page in a replay.
 
+        Returns:
+            bool: Whether there was new data.
+        """
+        self.focused_car_id = ac.getFocusedCar()
+        # With background sampling, the player car comes from the snapshot,
+        # so the main thread doesn't read shared memory at all.
+        snapshot = self.sampler.latest() if self.sampler.running else None
+        if self.focused_car_id == 0:
+            if snapshot is not None:
+                source = (0, snapshot.physics_packet)
+            else:
+                source = (0, self._physics_packet.read()[0])
+        else:
+            source = (self.focused_car_id, self._physics_packet.read()[0], self._graphics_packet.read()[0])
+        if not self._new_data('car', source):
+            return False
+        self.focused_car.set_id(self.focused_car_id)
+        if not self.focused_car.update(snapshot):
+            # Nothing new was read, so read this source again on the next update.
+            self._sources['car'] = None
+            self.changed['car'] = False
+            return False
+        return True
 
 class Car:
     """ Handling all data from AC that is car-specific.
     
+    Heading is calculated from the contact points of the front wheels.
+    For the player car (ID 0) they are read from the physics shared memory page,
+    in a single read of the contact point array, or taken from a session
+    snapshot if one is given. For other cars, e.g. when
+    spectating, they come from the ac module, which takes a call per wheel.
+
     Args:
         cfg (obj:Config): App configuration.
         car_id (int, optional): Car ID number to retrieve data from.
@@ -84,6 +305,12 @@ class Car:
 
         # Initialize car data attributes
         self.heading = 0
+        # Rate of change of heading in radians per second, None if unknown.
+        self.yaw_rate = None
+
+        # Contact points of all four wheels, x, y, z per wheel,
+        # and angular velocity around the car's own x, y, z axes.
+        self._physics_reader = get_info().reader('physics', ['tyreContactPoint', 'localAngularVel'], coherent=True)
 
 
     def set_id(self, car_id):
@@ -95,25 +322,188 @@ class Car:
         self.id = car_id
 
 
-    def update(self):
-        """ Update car data. """        
-        # Assetto Corsa world position coordinate system (x,y,z):
-        # The x-axis is longitude, with east being positive.
-        # The y-axis is elevation, with up being positive.
-        # The z-axis is latitude, which south being positive.
+    def update(self, snapshot=None):
+        """ Update car data.
+
+        Args:
+            snapshot (obj:SessionSnapshot): Player car data read by the
+                session sampler. Optional, read from shared memory if None.
+
+        Returns:
+            bool: Whether the data was updated, False if shared memory
+                couldn't be read consistently.
+        """
+        if self.id == 0 and snapshot is not None:
+            fl_x, fl_z, fr_x, fr_z = snapshot.front_axle
+            self.yaw_rate = snapshot.yaw_rate
+        elif self.id == 0:
+            points = self.front_contact_points_shared_memory()
+            if points is None:
+                return False
+            fl_x, fl_z, fr_x, fr_z = points
+        else:
+            fl_x, fl_z, fr_x, fr_z = self.front_contact_points_api()
+            self.yaw_rate = None
+        self.heading = heading_from_front_axle(fl_x, fl_z, fr_x, fr_z)
+        return True
+
+
+    def front_contact_points_shared_memory(self):
+        """ Horizontal position of front wheel contact points, from shared memory.
+
+        Only available for the player car. Also sets the yaw rate,
+        which is read together with the contact points.
+
+        Returns:
+            tuple: FL x, FL z, FR x, FR z, or None if the game wrote
+                the page during every read attempt.
+        """
+        packet_id, points, angular_vel = self._physics_reader.read()
+        if not self._physics_reader.consistent:
+            return None
+        self.yaw_rate = yaw_rate(angular_vel)
+        return front_axle(points)
+
+
+    def front_contact_points_api(self):
+        """ Horizontal position of front wheel contact points, from the ac module.
+
+        Returns:
+            tuple: FL x, FL z, FR x, FR z
+        """
         fl_x, fl_y, fl_z = ac.getCarState(self.id, acsys.CS.TyreContactPoint, acsys.WHEELS.FL)
         fr_x, fr_y, fr_z = ac.getCarState(self.id, acsys.CS.TyreContactPoint, acsys.WHEELS.FR)
+        return fl_x, fl_z, fr_x, fr_z
+
+
+def front_axle(points):
+    """ Horizontal position of the front wheel contact points.
+
+    Args:
+        points (tuple): tyreContactPoint of the physics page, x, y, z per wheel.
+
+    Returns:
+        tuple: FL x, FL z, FR x, FR z
+    """
+    # Wheels are in order FL, FR, RL, RR.
+    return points[0], points[2], points[3], points[5]
+
+
+def yaw_rate(angular_vel):
+    """ Rate of change of compass heading in radians per second.
+
+    Args:
+        angular_vel (tuple): localAngularVel of the physics page.
+    """
+    # Rotation around the y-axis (up) is counterclockwise seen from above,
+    # while compass heading runs clockwise.
+    return -angular_vel[1]
+
+
+def heading_from_front_axle(fl_x, fl_z, fr_x, fr_z):
+    """ Calculate car heading from the world position of its front wheels.
+
+    Assetto Corsa world position coordinate system (x,y,z):
+    The x-axis is longitude, with east being positive.
+    The y-axis is elevation, with up being positive.
+    The z-axis is latitude, which south being positive.
+
+    Args:
+        fl_x, fl_z (float): Horizontal position of the front left wheel.
+        fr_x, fr_z (float): Horizontal position of the front right wheel.
+
+    Returns:
+        float: Heading in radians based on compass direction angles.
+            0 (or 2pi) is North, pi/2 East, pi South, 3/2 pi West
+    """
+    # Calculate a vector that represents the direction of the front axle.
+    # Done by taking relative world position of FR wheel to FL wheel.
+    fa_x = fr_x - fl_x
+    fa_z = fr_z - fl_z
+
+    # Heading direction is perpendicular to front axle direction,
+    # So needs to be rotated 90 degrees counterclockwise.
+    h_x = fa_z
+    h_z = -fa_x
+
+    return -math.atan2(h_x, h_z) + math.pi
+
+
+class Grid:
+    """ Relative wind of every car in the session.
+
+    Front contact points of all cars are gathered in two list comprehensions,
+    after which headings and relative wind angles of the whole grid are
+    calculated in single passes over those lists, instead of per car objects.
+
+    Args:
+        cfg (obj:Config): App configuration.
+        session (obj:Session): Session providing wind data.
+
+    Attributes:
+        num_cars (int): Number of cars in the session.
+        headings (list): Heading per car ID in radians, see heading_from_front_axle.
+        tailwind (list): IDs of cars with the wind at most
+            cfg.grid_tailwind_angle degrees off their tail.
+    """
+    def __init__(self, cfg, session):
+        self.cfg = cfg
+        self.session = session
+
+        self.num_cars = 0
+        self.headings = []
+        self.tailwind = []
+
+        # Player car is read from shared memory, or taken from the session
+        # snapshot with background sampling. Other cars come from the ac module.
+        self._player = Car(cfg, 0)
+        self._static_reader = get_info().reader('static', ['numCars'])
+
+    def update(self, dt=None):
+        """ Update headings and relative wind of all cars.
+
+        Args:
+            dt (float): Unused, allows running the update as a scheduler task.
+        """
+        num_cars = self._static_reader.read()[0]
+        self.num_cars = num_cars
+        if num_cars == 0:
+            self.headings = []
+            self.tailwind = []
+            return
 
-        # Calculate a vector that represents the direction of the front axle.
-        # Done by taking relative world position of FR wheel to FL wheel.
-        fa_x = fr_x - fl_x
-        fa_z = fr_z - fl_z
+        # Gather front contact points of all cars, x, y, z per wheel.
+        get_car_state = ac.getCarState
+        contact_point = acsys.CS.TyreContactPoint
+        wheel_fl = acsys.WHEELS.FL
+        wheel_fr = acsys.WHEELS.FR
+        sampler = self.session.sampler
+        if sampler.running:
+            fl_x, fl_z, fr_x, fr_z = sampler.latest().front_axle
+        else:
+            points = self._player.front_contact_points_shared_memory()
+            if points is None:
+                # Keep the headings of the last consistent read.
+                return
+            fl_x, fl_z, fr_x, fr_z = points
+        fl = [(fl_x, 0, fl_z)]
+        fr = [(fr_x, 0, fr_z)]
+        fl.extend([get_car_state(car_id, contact_point, wheel_fl) for car_id in range(1, num_cars)])
+        fr.extend([get_car_state(car_id, contact_point, wheel_fr) for car_id in range(1, num_cars)])
 
-        # Heading direction is perpendicular to front axle direction,
-        # So needs to be rotated 90 degrees counterclockwise.
-        h_x = fa_z
-        h_z = -fa_x
+        # Same calculation as heading_from_front_axle, over all cars at once.
+        h_x = [r[2] - l[2] for l, r in zip(fl, fr)]
+        h_z = [l[0] - r[0] for l, r in zip(fl, fr)]
+        self.headings = list(map(sub, repeat(math.pi), map(math.atan2, h_x, h_z)))
 
-        # Calculate heading based on compass direction angles
-        # 0 (or 2pi) is North, pi/2 East, pi South, 3/2 pi West
-        self.heading = -math.atan2(h_x, h_z) + math.pi
\ No newline at end of file
+        # Wind direction points where the wind is going,
+        # so the relative angle is 0 for a pure tailwind.
+        if (self.session.wind_speed < 0.1) or (self.session.status == 1):
+            self.tailwind = []
+            return
+        threshold = math.cos(math.radians(self.cfg.grid_tailwind_angle))
+        alignment = map(math.cos, map(sub, repeat(self.session.wind_dir), self.headings))
+        # Cars without contact points, e.g. empty slots, have no front axle.
+        self.tailwind = [
+            car_id for car_id, a, x, z in zip(range(num_cars), alignment, h_x, h_z)
+            if a > threshold and (x or z)]
@@ -1,4 +1,6 @@
 import math
+from array import array
+from collections import OrderedDict
 
 # The classes below are used as building blocks for the OpenGL rendering of vector graphics in Assetto Corsa. 
 # All classes are based on the two dimensional cartesian coordinate system.
@@ -143,213 +145,344 @@ class Point:
         return Point(self.x, self.y)
 
 
-class Line:
-    """A line in a 2D cartesian coordinate system.
-    
-    Each line is described by a set of two points.
+
+
+def _xy(p):
+    """Split value into separate x and y components.
 
     Args:
-        p1 (obj:Point): Start point of the line.
-        p2 (obj:Point): End point of the line.
+        p (obj:Point/float): Point obj, or a float used for both x and y.
     """
-    def __init__(self, p1=Point(), p2=Point()):
-        self.points = [p1, p2]
+    if isinstance(p, Point):
+        return p.x, p.y
+    return p, p
 
-    def add(self, p):
-        """Add value to all points in Line.
+
+class VertexBuffer:
+    """Flat buffer of 2D vertices, stored as x,y pairs in a float array.
+
+    All transformations work in place as a single index loop over a range
+    of vertices. They create no Point object, list or array per vertex;
+    the only per-coordinate objects are the transient floats python makes
+    when reading an array item, which are freed straight away.
+    Shapes (Line, Triangle, Quad) are views on a range of a buffer,
+    so a complete drawable can be kept in, and transformed as, one buffer.
+
+    Args:
+        points (list): Point objects to initialize the buffer with.
+            Optional, defaults to an empty buffer.
+    """
+    def __init__(self, points=()):
+        self.data = array('f')
+        for point in points:
+            self.data.append(point.x)
+            self.data.append(point.y)
+
+    def __len__(self):
+        """Number of vertices in buffer."""
+        return len(self.data) // 2
+
+    def append(self, point):
+        """Append a vertex to the buffer.
 
         Args:
-            p (obj:Point/float): Value to add to points in Line.
-                Can be Point obj to add different values to x and y of points,
-                or a float to add same value to both x and y of points.
+            point (obj:Point): Vertex to append.
+
+        Returns:
+            int: Index of the appended vertex.
         """
-        for point in self.points:
-            point.add(p)
+        self.data.append(point.x)
+        self.data.append(point.y)
+        return len(self) - 1
 
-    def subtract(self, p):
-        """Subtract value from all points in Line.
+    def add_shape(self, shape):
+        """Append the vertices of a shape and return a view on them.
 
         Args:
-            p (obj:Point/float): Value to subtract from points in Line.
-                Can be Point obj to subtract different values from x and y of points,
-                or a float to subtract same value from both x and y of points.
+            shape (obj:Line/Triangle/Quad): Shape to copy into the buffer.
+
+        Returns:
+            obj: Shape of the same type, viewing the appended vertices.
         """
-        for point in self.points:
-            point.subtract(p)
+        offset = len(self)
+        self.data.extend(shape.buffer.data[2 * shape.offset:2 * (shape.offset + shape.n_points)])
+        return shape.view(self, offset)
 
-    def multiply(self, p):
-        """Multiply all points in Line with value.
+    def point(self, index):
+        """Return vertex at index as a new Point object."""
+        return Point(self.data[2 * index], self.data[2 * index + 1])
+
+    def _range(self, start, count):
+        """Index of the first x value and end index of a range of vertices."""
+        if count is None:
+            count = len(self) - start
+        return 2 * start, 2 * (start + count)
+
+    def add(self, p, start=0, count=None):
+        """Add value to vertices in buffer.
 
         Args:
-            p (obj:Point/float): Value to multiply points in Line with.
-                Can be Point obj to multiply different values with x and y of points,
-                or a float to multiply same value with both x and y of points.
-        """        
-        for point in self.points:
-            point.multiply(p)
+            p (obj:Point/float): Value to add to the vertices x,y.
+                Can be Point obj to add different values to x and y,
+                or a float to add same value to both x and y.
+            start (int): Index of first vertex. Defaults to 0.
+            count (int): Number of vertices. Defaults to all from start.
+        """
+        px, py = _xy(p)
+        self._translate(px, py, start, count)
 
-    def divide(self, p):
-        """Divide all points in Line by value.
+    def subtract(self, p, start=0, count=None):
+        """Subtract value from vertices in buffer.
 
         Args:
-            p (obj:Point/float): Value to divide points in Line by.
-                Can be Point obj to divide x and y of points with different values,
-                or a float to divide both x and y of points by the same value.
+            p (obj:Point/float): Value to subtract from the vertices x,y.
+                Can be Point obj to subtract different values from x and y,
+                or a float to subtract same value from both x and y.
+            start (int): Index of first vertex. Defaults to 0.
+            count (int): Number of vertices. Defaults to all from start.
         """
-        for point in self.points:
-            point.divide(p)
+        px, py = _xy(p)
+        self._translate(-px, -py, start, count)
 
-    def rotate_rad(self, angle, cor=0):
-        """Rotate Line in positive counterclockwise direction.
+    def _translate(self, dx, dy, start=0, count=None):
+        """Move a range of vertices by dx, dy."""
+        d = self.data
+        lo, hi = self._range(start, count)
+        for i in range(lo, hi, 2):
+            d[i] += dx
+            d[i + 1] += dy
+
+    def multiply(self, p, start=0, count=None):
+        """Multiply vertices in buffer by value.
+
+        Args:
+            p (obj:Point/float): Value to multiply vertices x,y with.
+                Can be Point obj to multiply different values with x and y,
+                or a float to multiply same value with both x and y.
+            start (int): Index of first vertex. Defaults to 0.
+            count (int): Number of vertices. Defaults to all from start.
+        """
+        px, py = _xy(p)
+        d = self.data
+        lo, hi = self._range(start, count)
+        for i in range(lo, hi, 2):
+            d[i] *= px
+            d[i + 1] *= py
+
+    def divide(self, p, start=0, count=None):
+        """Divide vertices in buffer by value.
+
+        Args:
+            p (obj:Point/float): Value to divide vertices x,y by.
+                Can be Point obj to divide x and y by different values,
+                or a float to divide both x and y by the same value.
+            start (int): Index of first vertex. Defaults to 0.
+            count (int): Number of vertices. Defaults to all from start.
+        """
+        px, py = _xy(p)
+        d = self.data
+        lo, hi = self._range(start, count)
+        for i in range(lo, hi, 2):
+            d[i] /= px
+            d[i + 1] /= py
+
+    def rotate_rad(self, angle, cor=0, start=0, count=None):
+        """Rotate vertices in positive counterclockwise direction.
 
         Rotation is done in radians, optionally around a specified
         center of rotation. If no center of rotation is specified,
-        the Line is rotated around origin (0,0).
+        vertices are rotated around origin (0,0).
 
         Args:
             angle (float): Rotation in radians.
-            cor (obj:Point): Center of rotation (x,y)
+            cor (obj:Point): Center of rotation (x,y).
+            start (int): Index of first vertex. Defaults to 0.
+            count (int): Number of vertices. Defaults to all from start.
         """
-        # Calculate trig functions only once beforehand.
-        c = math.cos(angle)
-        s = math.sin(angle)
+        self._rotate(math.cos(angle), math.sin(angle), cor, start, count)
 
-        for points in self.points:
-            points._rotate(c, s, cor)
-
-    def rotate_deg(self, angle, cor=0):
-        """Rotate Line in positive counterclockwise direction.
+    def rotate_deg(self, angle, cor=0, start=0, count=None):
+        """Rotate vertices in positive counterclockwise direction.
 
         Rotation is done in degrees, optionally around a specified
         center of rotation. If no center of rotation is specified,
-        the Line is rotated around origin (0,0).
+        vertices are rotated around origin (0,0).
 
         Args:
             angle (float): Rotation in degrees.
-            cor (obj:Point): Center of rotation (x,y)
+            cor (obj:Point): Center of rotation (x,y).
+            start (int): Index of first vertex. Defaults to 0.
+            count (int): Number of vertices. Defaults to all from start.
         """
-        # Convert degrees to radians
-        angle = angle * math.pi / 180
+        self.rotate_rad(angle * math.pi / 180, cor, start, count)
 
-        # Calculate trig functions
-        c = math.cos(angle)
-        s = math.sin(angle)
+    def _rotate(self, c, s, cor=0, start=0, count=None):
+        """Rotate vertices in positive counterclockwise direction.
 
-        for points in self.points:
-            points._rotate(c, s, cor)
+        Args:
+            c (float): cosine of desired rotation angle.
+            s (float): sine of desired rotation angle.
+            cor (obj:Point): center of rotation (x,y).
+            start (int): Index of first vertex. Defaults to 0.
+            count (int): Number of vertices. Defaults to all from start.
+        """
+        cx, cy = _xy(cor)
+        d = self.data
+        lo, hi = self._range(start, count)
+        # Rotate around origin (0,0) relative to the center of rotation,
+        # then add back center of rotation coords.
+        for i in range(lo, hi, 2):
+            x = d[i] - cx
+            y = d[i + 1] - cy
+            d[i] = x * c - y * s + cx
+            d[i + 1] = x * s + y * c + cy
 
     def copy(self):
         """Return a copy of object."""
-        return Line(self.points[0].copy(), self.points[1].copy())
+        buffer = VertexBuffer()
+        buffer.data = array('f', self.data)
+        return buffer
 
 
-class Triangle:
-    """A triangle in a 2D cartesian coordinate system.
+class Shape:
+    """Base class for shapes, which are views on a range of a VertexBuffer.
 
-    Each triangle is described by a set of three points.
+    Transformations on a shape only touch the vertices of the shape itself.
+    Subclasses set n_points, the number of vertices a shape consists of.
 
     Args:
-        p1 (obj:Point): First point of Triangle.
-        p2 (obj:Point): Second point of Triangle.
-        p3 (obj:Point): Third point of Triangle.
+        points (list): Point objects of the shape.
     """
-    def __init__(self, 
-                 p1=Point(), 
-                 p2=Point(), 
-                 p3=Point()):
-        self.points = [p1, p2, p3]
+    n_points = 0
+
+    def __init__(self, points):
+        self.buffer = VertexBuffer(points)
+        self.offset = 0
+
+    @classmethod
+    def view(cls, buffer, offset=0):
+        """Create shape as view on existing vertices in a buffer.
+
+        Args:
+            buffer (obj:VertexBuffer): Buffer holding the vertices.
+            offset (int): Index of first vertex of the shape.
+        """
+        shape = cls.__new__(cls)
+        shape.buffer = buffer
+        shape.offset = offset
+        return shape
+
+    @property
+    def points(self):
+        """List of the vertices of the shape, as new Point objects."""
+        return [self.buffer.point(self.offset + n) for n in range(self.n_points)]
 
     def add(self, p):
-        """Add value to all points in Triangle.
+        """Add value to all points in shape.
 
         Args:
-            p (obj:Point/float): Value to add to points in Triangle.
+            p (obj:Point/float): Value to add to points in shape.
                 Can be Point obj to add different values to x and y of points,
                 or a float to add same value to both x and y of points.
         """
-        for point in self.points:
-            point.add(p)
+        self.buffer.add(p, self.offset, self.n_points)
 
     def subtract(self, p):
-        """Subtract value from all points in Triangle.
+        """Subtract value from all points in shape.
 
         Args:
-            p (obj:Point/float): Value to subtract from points in Triangle.
+            p (obj:Point/float): Value to subtract from points in shape.
                 Can be Point obj to subtract different values from x and y of points,
                 or a float to subtract same value from both x and y of points.
         """
-        for point in self.points:
-            point.subtract(p)
+        self.buffer.subtract(p, self.offset, self.n_points)
 
     def multiply(self, p):
-        """Multiply all points in Triangle with value.
+        """Multiply all points in shape with value.
 
         Args:
-            p (obj:Point/float): Value to multiply points in Triangle with.
+            p (obj:Point/float): Value to multiply points in shape with.
                 Can be Point obj to multiply different values with x and y of points,
                 or a float to multiply same value with both x and y of points.
-        """   
-        for point in self.points:
-            point.multiply(p)
+        """
+        self.buffer.multiply(p, self.offset, self.n_points)
 
     def divide(self, p):
-        """Divide all points in Triangle by value.
+        """Divide all points in shape by value.
 
         Args:
-            p (obj:Point/float): Value to divide points in Triangle by.
+            p (obj:Point/float): Value to divide points in shape by.
                 Can be Point obj to divide x and y of points with different values,
                 or a float to divide both x and y of points by the same value.
         """
-        for point in self.points:
-            point.divide(p)
+        self.buffer.divide(p, self.offset, self.n_points)
 
     def rotate_rad(self, angle, cor=0):
-        """Rotate Triangle in positive counterclockwise direction.
+        """Rotate shape in positive counterclockwise direction.
 
         Rotation is done in radians, optionally around a specified
         center of rotation. If no center of rotation is specified,
-        the Triangle is rotated around origin (0,0).
+        the shape is rotated around origin (0,0).
 
         Args:
             angle (float): Rotation in radians.
             cor (obj:Point): Center of rotation (x,y)
         """
-        # Calculate trig functions only once beforehand.
-        c = math.cos(angle)
-        s = math.sin(angle)
-
-        for points in self.points:
-            points._rotate(c, s, cor)
+        self.buffer.rotate_rad(angle, cor, self.offset, self.n_points)
 
     def rotate_deg(self, angle, cor=0):
-        """Rotate Triangle in positive counterclockwise direction.
+        """Rotate shape in positive counterclockwise direction.
 
         Rotation is done in degrees, optionally around a specified
         center of rotation. If no center of rotation is specified,
-        the Triangle is rotated around origin (0,0).
+        the shape is rotated around origin (0,0).
 
         Args:
             angle (float): Rotation in degrees.
             cor (obj:Point): Center of rotation (x,y)
         """
-        # Convert degrees to radians
-        angle = angle * math.pi / 180
+        self.buffer.rotate_deg(angle, cor, self.offset, self.n_points)
 
-        # Calculate trig functions
-        c = math.cos(angle)
-        s = math.sin(angle)
+    def copy(self):
+        """Return a copy of object, with its own vertex buffer."""
+        return VertexBuffer().add_shape(self)
 
-        for points in self.points:
-            points._rotate(c, s, cor)
 
-    def copy(self):
-        """Return a copy of object."""
-        return Triangle(self.points[0].copy(),
-                        self.points[1].copy(),
-                        self.points[2].copy())
+class Line(Shape):
+    """A line in a 2D cartesian coordinate system.
+
+    Each line is described by a set of two points.
+
+    Args:
+        p1 (obj:Point): Start point of the line.
+        p2 (obj:Point): End point of the line.
+    """
+    n_points = 2
+
+    def __init__(self, p1=Point(), p2=Point()):
+        super().__init__([p1, p2])
 
 
-class Quad:
+class Triangle(Shape):
+    """A triangle in a 2D cartesian coordinate system.
+
+    Each triangle is described by a set of three points.
+
+    Args:
+        p1 (obj:Point): First point of Triangle.
+        p2 (obj:Point): Second point of Triangle.
+        p3 (obj:Point): Third point of Triangle.
+    """
+    n_points = 3
+
+    def __init__(self,
+                 p1=Point(),
+                 p2=Point(),
+                 p3=Point()):
+        super().__init__([p1, p2, p3])
+
+
+class Quad(Shape):
     """A quad in a 2D cartesian coordinate system.
 
     Each quad is described by a set of four points.
@@ -360,99 +493,72 @@ class Quad:
         p3 (obj:Point): Third point of Quad.
         p4 (obj:Point): Fourth point of Quad
     """
-    def __init__(self, 
-                 p1=Point(), 
-                 p2=Point(), 
+    n_points = 4
+
+    def __init__(self,
+                 p1=Point(),
+                 p2=Point(),
                  p3=Point(),
                  p4=Point()):
-        self.points = [p1, p2, p3, p4]
+        super().__init__([p1, p2, p3, p4])
 
-    def add(self, p):
-        """Add value to all points in Quad.
 
-        Args:
-            p (obj:Point/float): Value to add to points in Quad.
-                Can be Point obj to add different values to x and y of points,
-                or a float to add same value to both x and y of points.
-        """
-        for point in self.points:
-            point.add(p)
-
-    def subtract(self, p):
-        """Subtract value from all points in Quad.
+class RotatedMeshCache:
+    """Cache of rotated copies of a mesh, keyed by quantized angle.
 
-        Args:
-            p (obj:Point/float): Value to subtract from points in Quad.
-                Can be Point obj to subtract different values from x and y of points,
-                or a float to subtract same value from both x and y of points.
-        """
-        for point in self.points:
-            point.subtract(p)
+    Rotation angles are rounded to a fixed step, so that small changes
+    in angle reuse an already rotated mesh instead of rotating again.
+    The cache is bounded in size, least recently used meshes are evicted first.
 
-    def multiply(self, p):
-        """Multiply all points in Quad with value.
-
-        Args:
-            p (obj:Point/float): Value to multiply points in Quad with.
-                Can be Point obj to multiply different values with x and y of points,
-                or a float to multiply same value with both x and y of points.
-        """   
-        for point in self.points:
-            point.multiply(p)
-
-    def divide(self, p):
-        """Divide all points in Quad by value.
-
-        Args:
-            p (obj:Point/float): Value to divide points in Quad by.
-                Can be Point obj to divide x and y of points with different values,
-                or a float to divide both x and y of points by the same value.
-        """
-        for point in self.points:
-            point.divide(p)
-
-    def rotate_rad(self, angle, cor=0):
-        """Rotate Quad in positive counterclockwise direction.
-
-        Rotation is done in radians, optionally around a specified
-        center of rotation. If no center of rotation is specified,
-        the Quad is rotated around origin (0,0).
+    Args:
+        mesh (obj:VertexBuffer): Base mesh to rotate.
+        cor (obj:Point): Center of rotation (x,y).
+        step (float): Angle quantization step in degrees.
+        size (int): Maximum number of cached meshes.
+
+    Attributes:
+        hits (int): Number of lookups served from the cache.
+        misses (int): Number of lookups that required a rotation.
+    """
+    def __init__(self, mesh, cor=0, step=0.5, size=256):
+        self.mesh = mesh
+        self.cor = cor
+        self.step = step * math.pi / 180
+        # Number of steps in a full circle, used to wrap keys around.
+        self.steps = max(int(round(2 * math.pi / self.step)), 1)
+        self.size = max(size, 1)
+        self.hits = 0
+        self.misses = 0
+        self._meshes = OrderedDict()
+
+    def get(self, angle):
+        """Return mesh rotated by angle, rounded to the quantization step.
 
         Args:
             angle (float): Rotation in radians.
-            cor (obj:Point): Center of rotation (x,y)
-        """
-        # Calculate trig functions only once beforehand.
-        c = math.cos(angle)
-        s = math.sin(angle)
-
-        for points in self.points:
-            points._rotate(c, s, cor)
 
-    def rotate_deg(self, angle, cor=0):
-        """Rotate Quad in positive counterclockwise direction.
-
-        Rotation is done in degrees, optionally around a specified
-        center of rotation. If no center of rotation is specified,
-        the Quad is rotated around origin (0,0).
-
-        Args:
-            angle (float): Rotation in degrees.
-            cor (obj:Point): Center of rotation (x,y)
+        Returns:
+            obj:VertexBuffer: Rotated mesh. Must not be modified.
         """
-        # Convert degrees to radians
-        angle = angle * math.pi / 180
-
-        # Calculate trig functions
-        c = math.cos(angle)
-        s = math.sin(angle)
-
-        for points in self.points:
-            points._rotate(c, s, cor)
-
-    def copy(self):
-        """Return a copy of object."""
-        return Quad(self.points[0].copy(),
-                    self.points[1].copy(),
-                    self.points[2].copy(),
-                    self.points[3].copy())
+        key = int(round(angle / self.step)) % self.steps
+        mesh = self._meshes.get(key)
+        if mesh is not None:
+            self._meshes.move_to_end(key)
+            self.hits += 1
+            return mesh
+
+        self.misses += 1
+        mesh = self.mesh.copy()
+        mesh.rotate_rad(key * self.step, self.cor)
+        self._meshes[key] = mesh
+        if len(self._meshes) > self.size:
+            self._meshes.popitem(last=False)
+        return mesh
+
+    def clear(self):
+        """Remove all cached meshes, e.g. after the base mesh changed."""
+        self._meshes.clear()
+
+    def __len__(self):
+        """Number of cached meshes."""
+        return len(self._meshes)
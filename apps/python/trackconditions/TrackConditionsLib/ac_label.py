@@ -1,5 +1,6 @@
 import ac
 from TrackConditionsLib.ac_gl_utils import Point
+from TrackConditionsLib import api_stats
 
 class ACLabel:
     """Initialize Assetto Corsa text label.
@@ -16,10 +17,21 @@ class ACLabel:
         alignment (str): "left", "center", "right"
         prefix (str): Prefix before main text.
         postfix (str): Postfix after main text.
+
+    The label keeps track of the state last sent to Assetto Corsa.
+    Setters that would not change anything skip the call into the game.
     """
     def __init__(self, window_id, position=Point(), text=" ", font=None, italic=0, size=None, color=None, alignment='left', prefix="", postfix=""):
         # Create label
         self.id = ac.addLabel(window_id, "")
+        # State as last sent to AC. None means not sent yet.
+        self._text = None
+        self._position = None
+        self._alignment = None
+        self._font_size = None
+        self._font = None
+        self._color = None
+        self._visible = None
         # Set position
         self.set_position(position)
         # Set text
@@ -67,13 +79,26 @@ class ACLabel:
         self.set_font_size(font_size)
         self.set_position(position)
 
+    def fit_box(self, box):
+        """Set text label to the position of a box and fit label in its height.
+
+        Args:
+            box (obj:Box): Area of the label in pixels, see layout.
+        """
+        self.fit_height(Point(box.x, box.y), box.height)
+
     def set_position(self, position):
         """Set label position.
 
         Args:
             position (obj:Point): Point object with x,y coords.
         """
-        ac.setPosition(self.id, position.x, position.y)
+        position = (position.x, position.y)
+        if position == self._position:
+            api_stats.skipped['setPosition'] += 1
+            return
+        self._position = position
+        ac.setPosition(self.id, position[0], position[1])
 
     def set_prefix(self, prefix):
         """Set label prefix.
@@ -98,6 +123,10 @@ class ACLabel:
             text (str): Label text.
         """
         text = self.prefix + text + self.postfix
+        if text == self._text:
+            api_stats.skipped['setText'] += 1
+            return
+        self._text = text
         ac.setText(self.id, text)
 
     def set_alignment(self, alignment='left'):
@@ -107,6 +136,10 @@ class ACLabel:
             alignment (str): 'left', 'center', 'right'.
                 defaults to left.
         """
+        if alignment == self._alignment:
+            api_stats.skipped['setFontAlignment'] += 1
+            return
+        self._alignment = alignment
         ac.setFontAlignment(self.id, alignment)
 
     def set_font_size(self, size):
@@ -118,6 +151,10 @@ class ACLabel:
         Important: Fontsize in Assetto Corsa is done in pixels, not pt.
         Therefore vertically it scales linearly.
         """
+        if size == self._font_size:
+            api_stats.skipped['setFontSize'] += 1
+            return
+        self._font_size = size
         ac.setFontSize(self.id, size)
 
     def set_custom_font(self, font, italic=0):
@@ -127,6 +164,10 @@ class ACLabel:
             font (str): Name of the font, must be initialized.
             italic (0/1): Optional, italics yes/no.
         """
+        if (font, italic) == self._font:
+            api_stats.skipped['setCustomFont'] += 1
+            return
+        self._font = (font, italic)
         ac.setCustomFont(self.id, font, italic, 0)
 
     def set_color(self, color):
@@ -135,6 +176,11 @@ class ACLabel:
         Args:
             color (tuple): r,g,b,a on a 0-1 scale.
         """
+        color = tuple(color)
+        if color == self._color:
+            api_stats.skipped['setFontColor'] += 1
+            return
+        self._color = color
         ac.setFontColor(self.id, color[0], color[1], color[2], color[3])
 
 
@@ -146,7 +192,9 @@ class ACLabel:
 
         When hidden, the label doesn't get rendered and costs no performance.
         """
-        if visible:
-            ac.setVisible(self.id, 1)
-        else:
-            ac.setVisible(self.id, 0)
\ No newline at end of file
+        visible = 1 if visible else 0
+        if visible == self._visible:
+            api_stats.skipped['setVisible'] += 1
+            return
+        self._visible = visible
+        ac.setVisible(self.id, visible)
\ No newline at end of file
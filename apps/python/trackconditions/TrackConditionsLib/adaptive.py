@@ -0,0 +1,120 @@
+import math
+
+from TrackConditionsLib.filters import wrap_angle
+from TrackConditionsLib.sim_info import get_info
+
+# Sim status in which data changes, see Session.status.
+LIVE = 2
+
+
+class AdaptiveRate:
+    """Rate of a scheduler task, following how fast its signals change.
+
+    Each signal has a threshold: the change that is worth a new sample.
+    The rate needed is the fastest signal's change per second divided by its
+    threshold, kept between a minimum and maximum rate. A faster rate is applied
+    straight away. A slower one is approached gradually, halving the distance
+    every decay seconds, so a brief pause in change doesn't drop the rate.
+
+    Args:
+        task (obj:Task): Task whose rate to set.
+        signals (list): (threshold, is_angle) per signal. Angles are in radians
+            and their change is measured across the wrap around.
+        min_rate (float): Lowest rate in runs per second.
+        max_rate (float): Highest rate in runs per second.
+        decay (float): Seconds in which the rate halves towards a lower target.
+    """
+    def __init__(self, task, signals, min_rate, max_rate, decay=2.0):
+        self.task = task
+        self.signals = list(signals)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.decay = decay
+        self.idle = False
+        self._last = None
+        self.task.set_rate(max_rate)
+
+    def observe(self, values, dt):
+        """Adapt the rate to the latest values of the signals.
+
+        Args:
+            values (tuple): Value per signal, in the order of the signals.
+            dt (float): Seconds since the previous values.
+        """
+        last = self._last
+        self._last = values
+        if last is None or dt <= 0 or self.idle:
+            return
+
+        needed = 0.0
+        for value, previous, (threshold, is_angle) in zip(values, last, self.signals):
+            change = value - previous
+            if is_angle:
+                change = wrap_angle(change)
+            needed = max(needed, abs(change) / (threshold * dt))
+        target = min(max(needed, self.min_rate), self.max_rate)
+
+        rate = self.task.rate
+        if target < rate:
+            # Relax towards the target rather than dropping to it.
+            target = target + (rate - target) * math.exp(-dt * math.log(2) / self.decay)
+        self.task.set_rate(target)
+
+    def set_idle(self, idle, idle_rate):
+        """Switch between the idle rate and the adaptive rate.
+
+        Coming out of idle, the task runs at its maximum rate on the next tick.
+        """
+        self.idle = idle
+        if idle:
+            self.task.set_rate(idle_rate)
+        else:
+            self._last = None
+            self.task.set_rate(self.max_rate)
+            self.task.run_next_tick()
+
+
+class RateController:
+    """Adaptive rates of a set of tasks, dropped to an idle rate unless the sim is live.
+
+    The sim status is read from shared memory on every check, which is a
+    single read of one field, so resuming is noticed on the next frame.
+
+    Args:
+        idle_rate (float): Rate in runs per second of all tasks while paused,
+            in a replay or not in a session.
+
+    Attributes:
+        idle (bool): Whether the sim is not live, or the data is stale.
+        stale (bool): Whether the game stopped writing new data. Set by the app.
+    """
+    def __init__(self, idle_rate):
+        self.idle_rate = idle_rate
+        self.rates = []
+        self.idle = False
+        self.stale = False
+        self._status_reader = get_info().reader('graphics', ['status'])
+
+    def add(self, task, signals, min_rate, max_rate, decay=2.0):
+        """Adapt the rate of a task to its signals, see AdaptiveRate.
+
+        Returns:
+            obj:AdaptiveRate: Call its observe() with new values of the signals.
+        """
+        rate = AdaptiveRate(task, signals, min_rate, max_rate, decay)
+        rate.set_idle(self.idle, self.idle_rate)
+        self.rates.append(rate)
+        return rate
+
+    def check(self, dt=None):
+        """Check sim status, switching tasks to or from idle if it changed.
+
+        Args:
+            dt (float): Unused, allows calling from acUpdate like a task.
+        """
+        idle = self.stale or self._status_reader.read()[0] != LIVE
+        if idle == self.idle:
+            return
+        self.idle = idle
+        for rate in self.rates:
+            rate.set_idle(idle, self.idle_rate)
@@ -0,0 +1,12 @@
+from collections import Counter
+
+# Calling from python into Assetto Corsa is the most expensive thing this app does.
+# Retained-mode objects (labels, drawables, app window) remember what they last
+# sent to the game and skip calls that would not change anything.
+# Skipped calls are counted per ac function name.
+skipped = Counter()
+
+
+def reset():
+    """Reset the skipped call counters."""
+    skipped.clear()
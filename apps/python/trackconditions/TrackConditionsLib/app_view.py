@@ -0,0 +1,142 @@
+from TrackConditionsLib.app_window import AppWindow, EVERY_FRAME
+from TrackConditionsLib.ac_label import ACLabel
+from TrackConditionsLib.vector_text import VectorText
+from TrackConditionsLib.drawables import WindIndicator, HistoryGraph
+from TrackConditionsLib.layout import Layout
+from TrackConditionsLib.color_palette import Colors
+
+# Text and value postfix of the labels, in the order of the label rows.
+LABELS = [("GRIP:", " %"), ("WIND:", " km/h"), ("ROAD:", " C"), ("AIR:", " C")]
+
+# Draw order of the elements, from back to front.
+Z_GRAPH = 0
+Z_ARROW = 1
+Z_TEXT = 2
+
+
+class AppView:
+    """A window of the app with the elements of its layout.
+
+    Which elements the window has follows from its layout description,
+    see layout.describe(). Views don't read any data themselves: the wind
+    indicator follows the shared wind model, the history graph subscribes to
+    the session and label values are handed in by the app. So any number of
+    views are fed by one Session, without sampling or computing anything twice.
+
+    Args:
+        cfg (obj:Config): App configuration.
+        session (obj:Session): Shared session data.
+        wind (obj:WindModel): Shared wind angle and color.
+        kind (str): 'main', 'arrow' or 'strip'.
+        name (str): Window name. Defaults to the app name.
+
+    Attributes:
+        window (obj:AppWindow): The window.
+        layout (obj:Layout): Places the elements in the window.
+        wind_indicator (obj:WindIndicator): None if the layout has none.
+        history_graph (obj:HistoryGraph): None if not enabled or not in the layout.
+        labels (list): Text labels, in the order of the label rows.
+        values (list): Value labels, in the order of the label rows.
+        forecast (obj:ACLabel): Forecast row, None if not enabled or not in the layout.
+        tailwind (obj:ACLabel): Tailwind overlay, None if not enabled or not in the layout.
+    """
+    def __init__(self, cfg, session, wind, kind='main', name=None):
+        self.cfg = cfg
+        self.kind = kind
+
+        # Set up layout, which places all elements according to the window size
+        self.layout = Layout(cfg, kind)
+        boxes = self.layout.boxes
+
+        self.window = AppWindow(cfg, kind, name)
+        self.layout.bind('window', self.window.set_box)
+
+        self.wind_indicator = None
+        if 'wind_indicator' in boxes:
+            self.wind_indicator = WindIndicator(cfg, wind, kind)
+            # Follows the wind model on every frame the window is drawn.
+            self.window.add_drawable(self.wind_indicator, Z_ARROW, EVERY_FRAME)
+            self.layout.bind('wind_indicator', self.wind_indicator.set_box)
+
+        self.history_graph = None
+        if cfg.history_enabled and 'history_graph' in boxes:
+            self.history_graph = HistoryGraph(cfg, session, kind)
+            # Fed by the session, only drawn once it has a line.
+            self.window.add_drawable(self.history_graph, Z_GRAPH, visible=self.history_graph.visible)
+            self.layout.bind('history_graph', self.history_graph.set_box)
+            session.subscribe('conditions', self.history_graph.update)
+
+        # Text labels on the left, values right aligned.
+        self.labels = []
+        self.values = []
+        for n, (text, postfix) in enumerate(LABELS):
+            if 'label_text_{}'.format(n) not in boxes:
+                continue
+            label = self.new_label(text=text)
+            self.layout.bind('label_text_{}'.format(n), label.fit_box)
+            self.labels.append(label)
+
+            value = self.new_label(postfix=postfix)
+            value.set_alignment('right')
+            self.layout.bind('label_value_{}'.format(n), value.fit_box)
+            self.values.append(value)
+
+        self.forecast = None
+        if cfg.forecast_enabled and 'forecast' in boxes:
+            self.forecast = ACLabel(self.window.id, prefix="FORECAST: ")
+            self.forecast.set_custom_font('ACRoboto300')
+            self.layout.bind('forecast', self.forecast.fit_box)
+
+        self.tailwind = None
+        if cfg.grid_enabled and 'tailwind' in boxes:
+            self.tailwind = ACLabel(self.window.id, prefix="TAILWIND: ")
+            self.tailwind.set_custom_font('ACRoboto300')
+            self.layout.bind('tailwind', self.tailwind.fit_box)
+
+    def new_label(self, text=" ", postfix=""):
+        """Create a text label for the window.
+
+        Depending on config, either a text label of the game,
+        or vector text drawn together with the other graphics.
+
+        Args:
+            text (str): Label text.
+            postfix (str): Postfix after main text.
+        """
+        if self.cfg.vector_text:
+            label = VectorText(text=text, postfix=postfix)
+            self.window.add_drawable(label, Z_TEXT)
+        else:
+            label = ACLabel(self.window.id, text=text, font='ACRoboto300', postfix=postfix)
+        return label
+
+    def set_values(self, texts):
+        """Set the text of the value labels, in the order of the label rows."""
+        for label, text in zip(self.values, texts):
+            label.set_text(text)
+
+    def set_stale(self, stale):
+        """Grey out the values and forecast while the data is stale."""
+        color = Colors.grey if stale else Colors.white
+        for label in self.values:
+            label.set_color(color)
+        if self.forecast is not None:
+            self.forecast.set_color(color)
+
+    def set_forecast(self, text):
+        """Set the text of the forecast row, if the window has one."""
+        if self.forecast is not None:
+            self.forecast.set_text(text)
+
+    def set_tailwind(self, text):
+        """Set the text of the tailwind overlay, if the window has one."""
+        if self.tailwind is not None:
+            self.tailwind.set_text(text)
+
+    def draw(self, dt=0):
+        """Update and draw the window. Call on its render callback.
+
+        Args:
+            dt (float): Time in seconds since the previous frame.
+        """
+        self.window.draw(dt)
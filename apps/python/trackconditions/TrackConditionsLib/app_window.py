@@ -1,21 +1,79 @@
 import ac
 
+from TrackConditionsLib import api_stats
+from TrackConditionsLib.draw_list import DrawList
+from TrackConditionsLib.layout import compute_boxes
+from TrackConditionsLib.scheduler import Task, SKIP
+
+# Update rate of drawables that are updated on every draw of their window.
+EVERY_FRAME = float('inf')
+
+
+class Registration:
+    """A drawable in the registry of an app window, see AppWindow.add_drawable.
+
+    Attributes:
+        drawable (object): The drawable.
+        z (int): Draw order, higher is drawn on top.
+        order (int): Number of drawables added before, orders equal z.
+        task (obj:Task): Runs the drawable's update, None if the window doesn't.
+        every_frame (bool): Whether update runs on every draw instead of a task.
+        visible (callable): Visibility predicate, None if always visible.
+        shown (bool): Visible on the last draw, or for now if never drawn.
+        hidden (bool): Hidden with set_visible, which skips the predicate as well.
+        hidden_at (float): Window time at which it was hidden with set_visible.
+        skipped (float): Seconds its update missed while hidden or culled,
+            passed on with the next update, so filters catch up at once.
+    """
+    def __init__(self, drawable, z, order, rate, visible):
+        self.drawable = drawable
+        self.z = z
+        self.order = order
+        self.every_frame = rate == EVERY_FRAME
+        self.task = None
+        if rate is not None and not self.every_frame:
+            # Looked up on every run, so the update method can be wrapped later on.
+            self.task = Task(lambda dt: drawable.update(dt), rate, SKIP)
+        self.visible = visible
+        self.shown = True
+        self.hidden = False
+        self.hidden_at = 0.0
+        self.skipped = 0.0
+
+    @property
+    def updated(self):
+        """Whether the window runs the drawable's update."""
+        return self.every_frame or self.task is not None
+
+
 class AppWindow:
-    """ Main window of the app.
+    """ Window of the app.
     
     Args:
     cfg (obj:Config): Config object used to set
         attributes for the app window.
+    kind (str): Layout of the window, see layout.describe().
+    name (str): Window name. Defaults to the app name.
+
+    Window properties are only sent to Assetto Corsa when they change.
+
+    Drawables are kept in a registry. Each declares a z-order, the rate at
+    which the window runs its update, and optionally a visibility predicate.
+    Drawables that are hidden, by set_visible or their predicate, are neither
+    updated nor drawn. Hidden by set_visible, they cost nothing per frame.
+    The time their update missed is added to the dt of the first update
+    after they are shown again.
     """
-    def __init__(self, cfg):
+    def __init__(self, cfg, kind='main', name=None):
         # Config data
         self.cfg = cfg
         
         # Set up app window
-        self.id = ac.newApp(self.cfg.app_name)
+        self.id = ac.newApp(name if name is not None else self.cfg.app_name)
 
         # Set app dimensions
-        ac.setSize(self.id, self.cfg.app_width, self.cfg.app_height)
+        self._size = None
+        self.set_box(compute_boxes(cfg, kind)['window'])
 
         # Load and set background texture
         self.bg_texture_path = cfg.app_dir + "/img/bg.png"
@@ -31,33 +89,134 @@ class AppWindow:
         # Move app icon off-screen
         ac.setIconPosition(self.id, 0, -10000)
 
-        # Initialize empty list of drawable objects.
-        self.drawables = []
+        # Registry of drawables, and the registrations checked on every draw,
+        # in draw order. Rebuilt when drawables are added, removed or hidden.
+        self.registry = {}
+        self.active = []
+        self._added = 0
+        self.reorder = False
+        # Seconds of draws since the window was created.
+        self.time = 0.0
+
+        # Drawables are compiled into a merged draw list,
+        # which is rebuilt when any of them changed.
+        self.draw_list = DrawList()
+        self.recompile = True
+
+    def set_size(self, width, height):
+        """ Set app window dimensions in pixels. """
+        size = (width, height)
+        if size == self._size:
+            api_stats.skipped['setSize'] += 1
+            return
+        self._size = size
+        ac.setSize(self.id, width, height)
+
+    def set_box(self, box):
+        """ Set app window dimensions to a box of the layout. """
+        self.set_size(box.width, box.height)
 
-    def add_drawable(self, obj):
-        """ Add drawable object to list of drawables"""
-        if obj not in self.drawables:
-            self.drawables.append(obj)
+    def add_drawable(self, obj, z=0, rate=None, visible=None):
+        """ Add drawable object to the registry, or update its registration.
+
+        Args:
+            obj (object): Drawable, with draw_items() or draw().
+            z (int): Draw order, higher is drawn on top. Drawables with
+                equal z are drawn in the order they were added.
+            rate (float): Calls per second of obj.update(dt) by the window,
+                EVERY_FRAME for every draw. None if it is updated elsewhere.
+            visible (callable): Called without arguments on every draw,
+                the drawable is skipped while it returns False. Optional.
+        """
+        previous = self.registry.get(obj)
+        order = previous.order if previous is not None else self._added
+        self._added += 1
+        self.registry[obj] = Registration(obj, z, order, rate, visible)
+        self.reorder = True
 
     def remove_drawable(self, obj):
-        """ Remove drawable object from list of drawables"""
-        if obj in self.drawables:
-            self.drawables.remove(obj)
+        """ Remove drawable object from the registry """
+        if self.registry.pop(obj, None) is not None:
+            self.reorder = True
 
-    def draw(self):
-        """ Draw graphics elements on the app window.
+    def set_visible(self, obj, visible):
+        """ Show or hide a registered drawable.
 
         Args:
-            deltaT (float): Time delta since last tick in seconds.
-                Assetto Corsa passes this argument automatically.
+            obj (object): Registered drawable.
+            visible (bool): Whether to draw it, if its predicate allows.
+        """
+        registration = self.registry[obj]
+        if registration.hidden == (not visible):
+            return
+        registration.hidden = not visible
+        if registration.hidden:
+            registration.hidden_at = self.time
+        elif registration.updated:
+            registration.skipped += self.time - registration.hidden_at
+        self.reorder = True
+
+    @property
+    def drawables(self):
+        """ Registered drawables in draw order """
+        return [registration.drawable for registration in self._ordered()]
+
+    def _ordered(self):
+        """ Registrations sorted in draw order """
+        return sorted(self.registry.values(), key=lambda registration: (registration.z, registration.order))
+
+    def draw(self, dt=0):
+        """ Update and draw the drawables on the app window.
 
-        This method calls the draw method on each object in the list of drawables.
+        Args:
+            dt (float): Time in seconds since the previous draw.
+
+        Drawables are compiled into a draw list, grouped by primitive and color.
+        Drawables without draw_items() get their own draw method called.
         This method should be called on render callback of Assetto Corsa.
         """
         # When the user moves the window, the opacity is reset to default.
         # Therefore, opacity needs to be set to 0 every frame.
+        # This can't be retained: detecting a move takes an api call as well.
         ac.setBackgroundOpacity(self.id, 0)
+        self.time += dt
+
+        if self.reorder:
+            self.reorder = False
+            self.active = [registration for registration in self._ordered() if not registration.hidden]
+            self.recompile = True
+
+        # GL drawing is immediate mode, so vertices are issued every frame.
+        # The draw list only needs to be rebuilt if any geometry changed,
+        # or a drawable was shown or culled.
+        for registration in self.active:
+            drawable = registration.drawable
+            if registration.visible is not None:
+                shown = bool(registration.visible())
+                if shown != registration.shown:
+                    registration.shown = shown
+                    self.recompile = True
+                if not shown:
+                    if registration.updated:
+                        registration.skipped += dt
+                    continue
+
+            update_dt = dt
+            if registration.skipped:
+                update_dt += registration.skipped
+                registration.skipped = 0.0
+            if registration.every_frame:
+                drawable.update(update_dt)
+            elif registration.task is not None:
+                registration.task.advance(update_dt)
+
+            if getattr(drawable, 'dirty', False):
+                drawable.dirty = False
+                self.recompile = True
 
-        for drawable in self.drawables:
-            drawable.draw()
+        if self.recompile:
+            self.recompile = False
+            self.draw_list.compile(
+                [registration.drawable for registration in self.active if registration.shown])
 
+        self.draw_list.draw()
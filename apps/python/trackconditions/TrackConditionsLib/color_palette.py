@@ -6,4 +6,5 @@ class Colors:
     blue = (0.16, 1, 1, 1)
     grey = (0.35, 0.35, 0.35, 1)
     light_grey = (0.6, 0.6, 0.6, 1)
-    yellow = (1, 0.8, 0, 1)
\ No newline at end of file
+    yellow = (1, 0.8, 0, 1)
+    white = (1, 1, 1, 1)
\ No newline at end of file
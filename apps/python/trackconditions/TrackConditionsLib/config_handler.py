@@ -1,128 +1,242 @@
+import io
 import os
 import configparser
 
+# Configurable options as (section, option, type).
+# Default values are in config_defaults.ini.
+OPTIONS = (
+    ('GENERAL', 'app_height', int),
+    ('GENERAL', 'wind_mesh_step', float),
+    ('GENERAL', 'wind_mesh_cache_size', int),
+    ('GENERAL', 'vector_text', bool),
+    ('RECORDER', 'recorder_enabled', bool),
+    ('RECORDER', 'recorder_flush_interval', float),
+    ('HISTORY', 'history_enabled', bool),
+    ('HISTORY', 'history_minutes', float),
+    ('HISTORY', 'history_points', int),
+    ('PROFILER', 'profiler_enabled', bool),
+    ('PROFILER', 'profiler_interval', float),
+    ('SAMPLING', 'background_sampling', bool),
+    ('SAMPLING', 'sampling_rate', float),
+    ('SAMPLING', 'stale_after', float),
+    ('GRID', 'grid_enabled', bool),
+    ('GRID', 'grid_rate', float),
+    ('GRID', 'grid_tailwind_angle', float),
+    ('GRID', 'grid_max_names', int),
+    ('SMOOTHING', 'smoothing_enabled', bool),
+    ('SMOOTHING', 'data_rate', float),
+    ('SMOOTHING', 'heading_smoothing', float),
+    ('SMOOTHING', 'wind_smoothing', float),
+    ('ADAPTIVE', 'adaptive_enabled', bool),
+    ('ADAPTIVE', 'idle_rate', float),
+    ('ADAPTIVE', 'car_min_rate', float),
+    ('ADAPTIVE', 'conditions_min_rate', float),
+    ('WINDOWS', 'arrow_window', bool),
+    ('WINDOWS', 'arrow_window_height', int),
+    ('WINDOWS', 'strip_window', bool),
+    ('WINDOWS', 'strip_window_height', int),
+    ('FORECAST', 'forecast_enabled', bool),
+    ('FORECAST', 'forecast_laps', int),
+    ('FORECAST', 'forecast_time_constant', float),
+)
+
+# Parsed defaults per defaults file, as {(section, option): value}.
+# Defaults don't change while the game runs, so they are only parsed once.
+_defaults = {}
+
 class Config:
-    """App configuration. Load config upon intialization."""
+    """App configuration. Load config upon intialization.
+
+    Call poll() periodically to pick up changes made to the config file while
+    the game runs, e.g. by Content Manager. Functions added with add_listener()
+    are called with the names of the options that changed.
+    """
     def __init__(self):
         # Set up config paths
         self.app_dir = os.path.dirname(os.path.dirname(__file__))
         self.cfg_file_path = os.path.join(self.app_dir, "config.ini")
         self.defaults_file_path = os.path.join(self.app_dir, "config_defaults.ini")
 
-        # Set app attributes that are non-configurable by user, 
+        # Set app attributes that are non-configurable by user,
         # which therefore don't appear in the config file.
         self.app_name = "TrackConditions"
         self.app_aspect_ratio = 2.35
         self.app_padding = 0.1 # Fraction of app height
+        self.history_aspect = 0.6 # History graph height as fraction of app height
+
+        # Functions called with the set of changed option names after a reload.
+        self.listeners = []
+
+        # Config file contents and modification stamp as last read or written.
+        self._text = None
+        self._stamp = None
 
         # Load config
         self.update_cfg = False
         self.load()
 
     def load(self):
-        """Initialize config parser and load config"""
-        # Load config file parser
-        self.cfg_parser = configparser.ConfigParser()
-        self.cfg_parser.read(self.cfg_file_path)
-        # Load config defaults file parser
-        self.defaults_parser = configparser.ConfigParser(inline_comment_prefixes=";")
-        self.defaults_parser.read(self.defaults_file_path)
-
-        # Loop over sections in defaults. If any are missing in cfg, add them.
-        for section in self.defaults_parser.sections():
-            if not self.cfg_parser.has_section(section):
-                self.cfg_parser.add_section(section)
-                
-        # Load attributes from config.
-        # If option is missing, get option from defaults and replace. 
-        self.getint('GENERAL', 'app_height')
-
-        # Generate attributes derived from config options
-        self.app_width = self.app_height * self.app_aspect_ratio
-        self.app_scale = self.app_height / 500
-        self.app_padding_px = self.app_padding * self.app_height
+        """Load config file, using defaults for missing or invalid options."""
+        self.defaults = load_defaults(self.defaults_file_path)
+        self._stamp = self._file_stamp()
+        self._text = self._read_file()
+        self.cfg_parser = self._parse(self._text)
+
+        for section, option, kind in OPTIONS:
+            self.__setattr__(option, self.get(section, option, kind))
 
         # If update_cfg has been triggered (set to True), run save to update file.
         if self.update_cfg:
             self.save()
-        
 
-    def save(self):
-        """Save config file"""
-        with open(self.cfg_file_path, 'w') as cfgfile:
-            self.cfg_parser.write(cfgfile)
+    def add_listener(self, listener):
+        """Add function to call when options change on reload.
 
+        Args:
+            listener (callable): Called as listener(changed),
+                with changed the set of names of changed options.
+        """
+        self.listeners.append(listener)
 
-    def getfloat(self, section, option):
-        """Get float variable from config.
+    def poll(self, dt=None):
+        """Reload config file if it changed on disk since it was last read or written.
 
-        If missing from config, grab from defaults and save it to config.
+        Only a stat call if the file didn't change, cheap enough to run
+        every second. Options that got a new value are set and listeners
+        are called with the changed option names.
 
         Args:
-            section (str): Section in config file
-            options (str): Option with specified section
+            dt (float): Unused, allows polling as a scheduler task.
+
+        Returns:
+            set: Names of changed options.
         """
+        stamp = self._file_stamp()
+        if stamp == self._stamp:
+            return set()
         try:
-            value = self.cfg_parser.getfloat(section, option)
-        except:
-            value = self.defaults_parser.getfloat(section, option)
-            self.cfg_parser.set(section, option, str(value))
-            self.update_cfg = True
-        self.__setattr__(option, value)
-
+            text = self._read_file()
+            parser = self._parse(text)
+        except (OSError, configparser.Error):
+            # File may be halfway being written, try again on the next poll.
+            return set()
+        self._stamp = stamp
+        if text == self._text:
+            return set()
+        self._text = text
+        self.cfg_parser = parser
+
+        changed = set()
+        for section, option, kind in OPTIONS:
+            value = self.get(section, option, kind)
+            if value != getattr(self, option):
+                self.__setattr__(option, value)
+                changed.add(option)
+        if changed:
+            for listener in self.listeners:
+                listener(changed)
+        return changed
 
-    def getbool(self, section, option):
-        """Get boolean variable from config.
-
-        If missing from config, grab from defaults and save it to config.
+    def save(self):
+        """Save config file, if that changes its contents.
 
-        Args:
-            section (str): Section in config file
-            options (str): Option with specified section
-        """        
-        try:
-            value = self.cfg_parser.getboolean(section, option)
-        except:
-            value = self.defaults_parser.getboolean(section, option)
-            self.cfg_parser.set(section, option, str(value))
-            self.update_cfg = True
-        self.__setattr__(option, value)
+        The config is written to a temporary file that then replaces the
+        config file, so the file is never left partially written.
+        """
+        buffer = io.StringIO()
+        self.cfg_parser.write(buffer)
+        text = buffer.getvalue()
+        self.update_cfg = False
+        if text == self._text:
+            return
 
+        temp_path = self.cfg_file_path + ".tmp"
+        with open(temp_path, 'w') as cfgfile:
+            cfgfile.write(text)
+        os.replace(temp_path, self.cfg_file_path)
+        self._text = text
+        self._stamp = self._file_stamp()
 
-    def getint(self, section, option):
-        """Get integer variable from config.
+    def get(self, section, option, kind):
+        """Get variable of a type from config.
 
-        If missing from config, grab from defaults and save it to config.
+        If missing or invalid in config, grab from defaults and save it to config.
 
         Args:
             section (str): Section in config file
-            options (str): Option with specified section
-        """        
+            option (str): Option with specified section
+            kind (type): int, float, bool or str
+
+        Returns:
+            Value of the option.
+        """
         try:
-            value = self.cfg_parser.getint(section, option)
-        except:
-            try:
-                value = int(self.cfg_parser.getfloat(section, option))
-            except:
-                value = self.defaults_parser.getint(section, option)
+            return parse_value(kind, self.cfg_parser.get(section, option))
+        except (configparser.Error, ValueError):
+            value = self.defaults[(section, option)]
             self.cfg_parser.set(section, option, str(value))
             self.update_cfg = True
-        self.__setattr__(option, value)
+            return value
+
+    def _parse(self, text):
+        """Parse config file contents, adding sections missing compared to defaults."""
+        parser = configparser.ConfigParser()
+        parser.read_string(text, self.cfg_file_path)
+        for section, option, kind in OPTIONS:
+            if not parser.has_section(section):
+                parser.add_section(section)
+        return parser
+
+    def _read_file(self):
+        """Contents of config file, empty if there is none."""
+        try:
+            with open(self.cfg_file_path) as cfgfile:
+                return cfgfile.read()
+        except FileNotFoundError:
+            return ""
 
+    def _file_stamp(self):
+        """Modification time and size of config file, None if there is none."""
+        try:
+            stat = os.stat(self.cfg_file_path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
 
-    def getstr(self, section, option):
-        """Get string variable from config.
 
-        If missing from config, grab from defaults and save it to config.
+def parse_value(kind, text):
+    """Convert config text to a value of a type.
 
-        Args:
-            section (str): Section in config file
-            options (str): Option with specified section
-        """
-        try: 
-            value = self.cfg_parser.get(section, option)
-        except:
-            value = self.defaults_parser.get(section, option)
-            self.cfg_parser.set(section, option, str(value))
-            self.update_cfg = True
-        self.__setattr__(option, value)
+    Integers may be written as floats, which are truncated.
+
+    Args:
+        kind (type): int, float, bool or str
+        text (str): Text from the config file.
+
+    Raises:
+        ValueError: If the text is not a valid value of the type.
+    """
+    text = text.strip()
+    if kind is bool:
+        try:
+            return configparser.ConfigParser.BOOLEAN_STATES[text.lower()]
+        except KeyError:
+            raise ValueError("Not a boolean: {}".format(text))
+    if kind is int:
+        return int(float(text))
+    return kind(text)
+
+
+def load_defaults(path):
+    """Parse defaults file once, returning {(section, option): value}.
+
+    Args:
+        path (str): Path of config_defaults.ini.
+    """
+    if path not in _defaults:
+        parser = configparser.ConfigParser(inline_comment_prefixes=";")
+        parser.read(path)
+        _defaults[path] = dict(
+            ((section, option), parse_value(kind, parser.get(section, option)))
+            for section, option, kind in OPTIONS)
+    return _defaults[path]
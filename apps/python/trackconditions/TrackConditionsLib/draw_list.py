@@ -0,0 +1,72 @@
+import ac
+import acsys
+
+# Primitives where several shapes can share one glBegin/glEnd block.
+MERGEABLE = (acsys.GL.Lines, acsys.GL.Triangles, acsys.GL.Quads)
+
+
+class DrawList:
+    """Merged list of GL draw calls, compiled from a list of drawables.
+
+    Drawables that implement draw_items() provide their geometry as
+    (primitive, color, vertex data) tuples, where vertex data is a flat
+    sequence of x,y coordinates. Consecutive items with the same primitive and
+    color are merged into a single glBegin/glEnd block, so the number of GL
+    blocks per frame depends on the number of color changes in draw order,
+    not the number of shapes. Items are never merged past an item of another
+    color, which keeps everything drawn later on top.
+
+    Drawables without draw_items() are drawn by calling their draw() method,
+    in between the merged blocks in the order they were registered.
+    """
+    def __init__(self):
+        # Compiled entries are either (primitive, color, vertex pairs)
+        # or a bound draw method of a drawable that can't be merged.
+        self.entries = []
+
+    def compile(self, drawables):
+        """Rebuild the draw list from a list of drawables.
+
+        Args:
+            drawables (list): Drawable objects in draw order.
+        """
+        entries = []
+        for drawable in drawables:
+            draw_items = getattr(drawable, 'draw_items', None)
+            if draw_items is None:
+                entries.append(drawable.draw)
+                continue
+
+            for primitive, color, data in draw_items():
+                color = tuple(color)
+                it = iter(data)
+                pairs = list(zip(it, it))
+                if primitive not in MERGEABLE:
+                    # Strips can't be joined without connecting them.
+                    entries.append((primitive, color, pairs))
+                    continue
+                # Only join the entry right before, so draw order is kept.
+                last = entries[-1] if entries else None
+                if isinstance(last, tuple) and last[0] == primitive and last[1] == color:
+                    last[2].extend(pairs)
+                else:
+                    entries.append((primitive, color, pairs))
+
+        self.entries = entries
+
+    def draw(self):
+        """Issue the compiled GL calls."""
+        glColor4f = ac.glColor4f
+        glBegin = ac.glBegin
+        glVertex2f = ac.glVertex2f
+        glEnd = ac.glEnd
+        for entry in self.entries:
+            if callable(entry):
+                entry()
+                continue
+            primitive, color, pairs = entry
+            glColor4f(color[0], color[1], color[2], color[3])
+            glBegin(primitive)
+            for x, y in pairs:
+                glVertex2f(x, y)
+            glEnd()
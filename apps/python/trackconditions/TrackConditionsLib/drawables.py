@@ -1,13 +1,118 @@
 import ac
 import acsys
 import math
+from array import array
 
 from TrackConditionsLib.ac_gl_utils import Point
 from TrackConditionsLib.ac_gl_utils import Line
 from TrackConditionsLib.ac_gl_utils import Triangle
 from TrackConditionsLib.ac_gl_utils import Quad
+from TrackConditionsLib.ac_gl_utils import VertexBuffer
+from TrackConditionsLib.ac_gl_utils import RotatedMeshCache
 
 from TrackConditionsLib.color_palette import Colors
+from TrackConditionsLib.layout import compute_boxes
+from TrackConditionsLib.filters import AngleFilter, wrap_angle
+
+
+class WindModel:
+    """ Wind angle relative to the focused car, and the color it is shown in.
+
+    Smooths heading and wind direction, and extrapolates the heading with the
+    yaw rate, so the angle moves every frame between data samples. Computed
+    once per frame and shared by the wind indicators of all windows.
+
+    Args:
+        cfg (obj:Config)
+        session (obj:Session)
+
+    Attributes:
+        angle (float): Wind direction relative to the heading, in radians.
+            0 while there is no wind or in a replay.
+        color (tuple): r,g,b,a on a 0-1 scale, green for headwind to red for tailwind.
+        stale (bool): Whether the data is stale, which greys out the arrow.
+    """
+    def __init__(self, cfg, session):
+        self.cfg = cfg
+        self.session = session
+
+        self.angle = 0
+        self.color = Colors.grey
+        self.stale = False
+
+        # Heading and wind direction are smoothed, and the heading is extrapolated
+        # with the yaw rate, so the arrow moves every frame between data samples.
+        self.heading_filter = AngleFilter(0, 0)
+        self.wind_filter = AngleFilter(0, 0, estimate_rate=False)
+        self.configure_filters()
+        self.car_id = None
+
+    def configure_filters(self):
+        """ Apply smoothing settings from config to the angle filters. """
+        if self.cfg.smoothing_enabled:
+            # Extrapolate at most two car data samples ahead, at the lowest rate.
+            car_rate = min(self.cfg.car_min_rate, self.cfg.data_rate) if self.cfg.adaptive_enabled else self.cfg.data_rate
+            max_extrapolation = 2 / car_rate
+            self.heading_filter.time_constant = self.cfg.heading_smoothing
+            self.heading_filter.max_extrapolation = max_extrapolation
+            self.wind_filter.time_constant = self.cfg.wind_smoothing
+            self.wind_filter.max_extrapolation = max_extrapolation
+        else:
+            for angle_filter in (self.heading_filter, self.wind_filter):
+                angle_filter.time_constant = 0
+                angle_filter.max_extrapolation = 0
+
+    def add_sample(self, dt):
+        """ Feed new session data to the angle filters.
+
+        Args:
+            dt (float): Time in seconds since the previous sample.
+        """
+        car = self.session.focused_car
+        # Don't smooth from the heading of one car to that of another.
+        if car.id != self.car_id:
+            self.car_id = car.id
+            self.heading_filter.reset()
+        self.heading_filter.add(car.heading, dt, car.yaw_rate)
+        self.wind_filter.add(self.session.wind_dir, dt)
+
+    def update(self, dt=0):
+        """ Move the angle forward in time and recompute it and the color.
+
+        Args:
+            dt (float): Time in seconds since the previous update.
+        """
+        self.heading_filter.advance(dt)
+        self.wind_filter.advance(dt)
+
+        # If there is no significant wind or session status is replay,
+        # Then draw greyed out straight wind indicator.
+        if (self.session.wind_speed < 0.1) or (self.session.status == 1):
+            self.angle = 0
+            color = Colors.grey
+        else:
+            # Filtered angles are unwrapped, so wrap their difference.
+            self.angle = wrap_angle(self.wind_filter.predict() - self.heading_filter.predict())
+
+            # Arrow coloring from green (headwind) to yellow (sidewind) to red (tailwind).
+            # self.angle can take on values between [-pi, +pi]
+            # needs to be remapped from [-pi, 0, pi] to [1, 0, 1] in a linear way
+            color_shift = 1 - abs((abs(self.angle)/math.pi - 1))
+
+            if color_shift < 0.5:
+                # From north to east/west shift color from red to yellow.
+                green_value = 2 * color_shift
+                # r,g,b,a tuple
+                color = (1, green_value, 0, 1)
+            else:
+                # From east/west to south shift color from yellow to green.
+                red_value = 1 - (color_shift - 0.5) * 2
+                # r,g,b,a tuple
+                color = (red_value, 1, 0, 1)
+
+        if self.stale:
+            color = Colors.grey
+        self.color = color
 
 
 class WindIndicator:
@@ -15,33 +120,31 @@ class WindIndicator:
     
     Args:
         cfg (obj:Config)
-        session (obj:Session)
-        color (tuple): r,g,b,a on a 0-1 scale.
+        wind (obj:WindModel): Angle and color to show, shared between windows.
+        kind (str): Layout of the window the arrow is in, see layout.describe().
 
     General layout I follow is using the following methods:
     - update: For updating the render queue if needed for a complex drawable object
     - draw: For drawing the object on the app window.
+    - draw_items: For handing the geometry to the app window's batched draw list.
+
+    Drawables set the dirty attribute when their color or geometry changed
+    since the last draw. The app window clears it after compiling its draw list.
     
-    If using the drawables list in the app window object, it will call .draw() on all object in the drawables list.
+    Registered with an app window, the window runs update at the rate given on
+    registration, and draws the object while it is visible. See AppWindow.add_drawable.
     """
-    def __init__(self, cfg, session):
+    def __init__(self, cfg, wind, kind='main'):
         self.cfg = cfg
-        self.session = session
+        self.wind = wind
 
         self.color = Colors.grey
         self.angle = 0
-        
-        # Center of rotation coordinates
-        self.cor = Point(
-            self.cfg.app_width - (self.cfg.app_height / 2),
-            self.cfg.app_height / 2)
-
-        # Radius of the arrow, used to scale it.
-        self.radius = self.cfg.app_height * (0.5 - (self.cfg.app_padding * 1.5))
+        self.dirty = True
 
         # Building the base arrow which gets rotated with every update.
         # First, arrow is built around center x,y 0,0.
-        # Next, the arrow is scaled to the specified radius
+        # Next, the arrow is scaled to the radius of its box in the layout.
         # Finally, it is moved in position by addition of the CoR coords to it.
 
         # Arrow is made up of head and shaft.
@@ -99,60 +202,278 @@ class WindIndicator:
             self.arrow_head_center
         ]
 
-        self.base_shape = []
-        for quad in _base_shape:
-            new_quad = quad.copy()
-            new_quad.multiply(self.radius / 21)
-            new_quad.add(self.cor)
-            self.base_shape.append(new_quad)
+        # All quads are stored in a single vertex buffer,
+        # so the whole arrow is transformed in one pass.
+        self.base_mesh = VertexBuffer()
+        self.base_shape = [self.base_mesh.add_shape(quad) for quad in _base_shape]
+        # Unscaled arrow, to place the base mesh again after a resize.
+        self.unit_mesh = self.base_mesh.copy()
 
-        # Render queue contains the shape that gets rendered
-        self.render_queue = self.base_shape.copy()
+        # Rotated arrows are cached per quantized angle,
+        # because the angle barely changes between updates.
+        self.mesh_cache = RotatedMeshCache(
+            self.base_mesh, Point(),
+            self.cfg.wind_mesh_step, self.cfg.wind_mesh_cache_size)
 
+        # Scale and move the arrow into place
+        self.box = None
+        self.set_box(compute_boxes(cfg, kind)['wind_indicator'])
 
-    def update(self):
-        """ Updating the data for the drawable object. """
-        # If there is no significant wind or session status is replay,
-        # Then draw greyed out straight wind indicator.
-        if (self.session.wind_speed < 0.1) or (self.session.status == 1):
-            self.angle = 0
-            self.color = Colors.grey
-        else:
-            self.angle = self.session.wind_dir - self.session.focused_car.heading
+    def set_box(self, box):
+        """ Fit the arrow in a square box of the layout.
 
-            # Arrow coloring from green (headwind) to yellow (sidewind) to red (tailwind).
-            # self.angle can take on values between [-2pi, +2pi]
-            # needs to be remapped from [-2pi, 0, 2pi] to [0, 1, 0] in a linear way
-            color_shift = 1 - abs((abs(self.angle)/math.pi - 1))
+        The base mesh is rescaled in place and the rotated meshes are dropped.
+        They are rotated again one by one when their angle comes up,
+        so a resize costs a single rotation in the frame it happens.
 
-            if color_shift < 0.5:
-                # From north to east/west shift color from red to yellow.
-                green_value = 2 * color_shift
-                # r,g,b,a tuple
-                self.color = (1, green_value, 0, 1)
-            else:
-                # From east/west to south shift color from yellow to green.
-                red_value = 1 - (color_shift - 0.5) * 2
-                # r,g,b,a tuple
-                self.color = (red_value, 1, 0, 1)
+        Args:
+            box (obj:Box): Area of the arrow in pixels.
+        """
+        if box == self.box:
+            return
+        self.box = box
+
+        # Center of rotation coordinates
+        self.cor = Point(box.x + box.width / 2, box.y + box.height / 2)
+        # Radius of the arrow, used to scale it.
+        self.radius = box.width / 2
 
-        _render_queue = []
-        for quad in self.base_shape:
-            new_quad = quad.copy()
-            new_quad.rotate_rad(self.angle, self.cor)
-            _render_queue.append(new_quad)
+        self.base_mesh.data[:] = self.unit_mesh.data
+        self.base_mesh.multiply(self.radius / 21)
+        self.base_mesh.add(self.cor)
 
-        self.render_queue = _render_queue
+        self.mesh_cache.cor = self.cor
+        self.mesh_cache.clear()
+
+        # Render mesh contains the vertices that get rendered
+        self.render_mesh = self.mesh_cache.get(self.angle)
+        self.dirty = True
+
+    def update(self, dt=0):
+        """ Follow the angle and color of the wind model.
+
+        Costs a comparison if they didn't change, e.g. while the sim is paused.
+
+        Args:
+            dt (float): Unused, the model is moved forward in time once for all windows.
+        """
+        wind = self.wind
+        if wind.angle == self.angle and wind.color == self.color:
+            return
+        self.angle = wind.angle
+        render_mesh = self.mesh_cache.get(self.angle)
+
+        # Only flag a change if the arrow looks different than before.
+        if (render_mesh is not self.render_mesh) or (wind.color != self.color):
+            self.render_mesh = render_mesh
+            self.color = wind.color
+            self.dirty = True
+
+    def draw_items(self):
+        """ Geometry of the model as (primitive, color, vertex data) tuples. """
+        return [(acsys.GL.Quads, self.color, self.render_mesh.data)]
 
     def draw(self):
         """ Draw the model. """
         set_color(self.color)
-        for quad in self.render_queue:
+        # Vertex data is a flat list of x,y pairs, 4 vertices per quad.
+        d = self.render_mesh.data
+        for i in range(0, len(d), 8):
             ac.glBegin(acsys.GL.Quads)
-            ac.glVertex2f(quad.points[0].x, quad.points[0].y)
-            ac.glVertex2f(quad.points[1].x, quad.points[1].y)
-            ac.glVertex2f(quad.points[2].x, quad.points[2].y)
-            ac.glVertex2f(quad.points[3].x, quad.points[3].y)
+            ac.glVertex2f(d[i], d[i + 1])
+            ac.glVertex2f(d[i + 2], d[i + 3])
+            ac.glVertex2f(d[i + 4], d[i + 5])
+            ac.glVertex2f(d[i + 6], d[i + 7])
+            ac.glEnd()
+
+
+class HistorySeries:
+    """History of a single value, as a ring buffer of graph points.
+
+    The ring buffer is mirrored: every point is stored twice, P points apart.
+    The points from oldest to newest are then always one contiguous slice,
+    so appending a point is two writes and an offset shift, and drawing
+    never has to reorder or rebuild the polyline.
+
+    Args:
+        points (int): Number of points P in the history.
+        color (tuple): r,g,b,a on a 0-1 scale.
+        min_span (float): Minimum value range the graph height covers.
+    """
+    def __init__(self, points, color, min_span):
+        self.points = points
+        self.color = color
+        self.min_span = min_span
+
+        # Raw values and their screen y coordinates, both mirrored.
+        self.values = array('f', [0.0]) * (2 * points)
+        self.ys = array('f', [0.0]) * (2 * points)
+        self._ys_view = memoryview(self.ys)
+
+        # Index of the oldest point and the number of points.
+        self.head = 0
+        self.count = 0
+
+        # Value range mapped onto the graph height. Only ever grows,
+        # so that the screen coordinates rarely need recomputing.
+        self.lo = None
+        self.hi = None
+        self.top = 0
+        self.height = 1
+
+    def set_area(self, top, height):
+        """Set vertical screen area of the graph, in pixels."""
+        self.top = top
+        self.height = height
+        self._rescale()
+
+    def append(self, value):
+        """Add newest point, dropping the oldest if the history is full."""
+        if self.lo is None:
+            self.lo = value - self.min_span / 2
+            self.hi = value + self.min_span / 2
+            rescale = True
+        else:
+            rescale = value < self.lo or value > self.hi
+            self.lo = min(self.lo, value)
+            self.hi = max(self.hi, value)
+
+        if self.count < self.points:
+            index = self.head + self.count
+            self.count += 1
+        else:
+            index = self.head
+            self.head = (self.head + 1) % self.points
+        index %= self.points
+
+        y = self._to_y(value)
+        self.values[index] = self.values[index + self.points] = value
+        self.ys[index] = self.ys[index + self.points] = y
+
+        if rescale:
+            self._rescale()
+
+    def visible_ys(self):
+        """Screen y coordinates from oldest to newest point."""
+        return self._ys_view[self.head:self.head + self.count]
+
+    def _to_y(self, value):
+        """Map value to screen y, with higher values drawn higher up."""
+        return self.top + self.height * (self.hi - value) / (self.hi - self.lo)
+
+    def _rescale(self):
+        """Recompute all screen coordinates, after the range or area changed."""
+        if self.lo is None:
+            return
+        ys = self.ys
+        values = self.values
+        for i in range(2 * self.points):
+            ys[i] = self._to_y(values[i])
+
+
+class HistoryGraph:
+    """Scrolling graph of the track grip and road temperature history.
+
+    The history spans a fixed period, divided into a fixed number of points.
+    Each point is the average of the samples during its part of the period.
+    The number of vertices drawn only depends on the number of points,
+    so the cost of a frame is the same for any length of history.
+
+    Args:
+        cfg (obj:Config)
+        session (obj:Session)
+        kind (str): Layout of the window the graph is in, see layout.describe().
+    """
+    def __init__(self, cfg, session, kind='main'):
+        self.cfg = cfg
+        self.session = session
+        self.dirty = True
+
+        self.points = max(self.cfg.history_points, 2)
+        # Seconds of history covered by a single point.
+        self.interval = self.cfg.history_minutes * 60 / self.points
+
+        self.grip = HistorySeries(self.points, Colors.blue, 1)
+        self.road_temp = HistorySeries(self.points, Colors.yellow, 4)
+
+        # Graph area, below the main part of the app.
+        self.box = None
+        self.set_box(compute_boxes(cfg, kind)['history_graph'])
+
+        # Samples of the point that is being collected.
+        self.elapsed = 0
+        self.samples = 0
+        self.grip_sum = 0
+        self.road_temp_sum = 0
+
+    def set_box(self, box):
+        """ Fit the graph in a box of the layout.
+
+        Args:
+            box (obj:Box): Area of the graph in pixels.
+        """
+        if box == self.box:
+            return
+        self.box = box
+        self.left = box.x
+        self.right = box.x + box.width
+        self.top = box.y
+        self.height = box.height
+
+        # Newest point on the right edge, points spaced evenly to the left.
+        dx = (self.right - self.left) / (self.points - 1)
+        self.xs = [self.left + n * dx for n in range(self.points)]
+
+        for series in (self.grip, self.road_temp):
+            series.set_area(self.top, self.height)
+        self.dirty = True
+
+    def update(self, dt):
+        """ Add a sample of the session data.
+
+        Args:
+            dt (float): Time in seconds since the previous update.
+        """
+        # No accurate data in replay mode.
+        if self.session.status != 1:
+            self.samples += 1
+            self.grip_sum += self.session.track_grip
+            self.road_temp_sum += self.session.road_temp
+
+        self.elapsed += dt
+        if self.elapsed < self.interval:
+            return
+        # After a long dt, e.g. a pause, every interval it spanned gets a point,
+        # up to a full graph, so the time axis stays right.
+        intervals = min(int(self.elapsed / self.interval), self.points)
+        self.elapsed %= self.interval
+
+        if self.samples:
+            grip = self.grip_sum / self.samples
+            road_temp = self.road_temp_sum / self.samples
+            for n in range(intervals):
+                self.grip.append(grip)
+                self.road_temp.append(road_temp)
+            self.dirty = True
+        self.samples = 0
+        self.grip_sum = 0
+        self.road_temp_sum = 0
+
+    def visible(self):
+        """ Whether there is a line to draw, which takes two points. """
+        return self.grip.count >= 2
+
+    def draw(self):
+        """ Draw the graph lines. """
+        glVertex2f = ac.glVertex2f
+        for series in (self.grip, self.road_temp):
+            n = series.count
+            if n < 2:
+                continue
+            set_color(series.color)
+            ac.glBegin(acsys.GL.LineStrip)
+            for x, y in zip(self.xs[self.points - n:], series.visible_ys()):
+                glVertex2f(x, y)
             ac.glEnd()
 
 
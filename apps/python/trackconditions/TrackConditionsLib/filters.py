@@ -0,0 +1,167 @@
+import math
+
+
+def wrap_angle(angle):
+    """Wrap angle in radians to the range [-pi, pi)."""
+    return (angle + math.pi) % (2 * math.pi) - math.pi
+
+
+class AngleFilter:
+    """Smooths an angle and predicts it between measurements.
+
+    The filtered angle is unwrapped: it keeps counting past 2pi instead of
+    jumping back to 0, so smoothing never averages across the wrap around.
+    Measurements are blended in with an exponential filter, after moving the
+    previous value forward by the angular rate.
+
+    Between measurements, predict() extrapolates with the angular rate,
+    so the angle can be shown at a higher rate than it is measured.
+    The rate is either measured as well, or estimated from the measurements.
+
+    Args:
+        time_constant (float): Seconds for the filter to move 63% of the way
+            to a new measurement. 0 to follow measurements directly.
+        max_extrapolation (float): Maximum seconds to extrapolate beyond the
+            last measurement, which limits the error when measurements stop.
+        estimate_rate (bool): Estimate the rate from the measurements,
+            if it is not measured. Otherwise it is taken as 0.
+
+    Attributes:
+        value (float): Filtered angle at the last measurement, unwrapped.
+        rate (float): Angular rate in radians per second.
+        age (float): Seconds since the last measurement.
+    """
+    def __init__(self, time_constant, max_extrapolation=0.1, estimate_rate=True):
+        self.time_constant = time_constant
+        self.max_extrapolation = max_extrapolation
+        self.estimate_rate = estimate_rate
+        self.reset()
+
+    def reset(self):
+        """Forget all measurements, e.g. after switching to another car."""
+        self.value = None
+        self.rate = 0.0
+        self.age = 0.0
+        self._last = None
+
+    def add(self, angle, dt, rate=None):
+        """Add a measurement.
+
+        Args:
+            angle (float): Measured angle in radians.
+            dt (float): Seconds since the previous measurement.
+            rate (float): Measured angular rate in radians per second. Optional.
+        """
+        self.age = 0.0
+        if self.value is None:
+            self.value = angle
+            self._last = angle
+            self.rate = rate if rate is not None else 0.0
+            return
+
+        if self.time_constant > 0 and dt > 0:
+            alpha = 1 - math.exp(-dt / self.time_constant)
+        else:
+            alpha = 1.0
+
+        if rate is None and self.estimate_rate and dt > 0:
+            measured_rate = wrap_angle(angle - self._last) / dt
+            rate = self.rate + alpha * (measured_rate - self.rate)
+        self._last = angle
+
+        predicted = self.value + self.rate * dt
+        self.value = predicted + alpha * wrap_angle(angle - predicted)
+        self.rate = rate if rate is not None else 0.0
+
+    def advance(self, dt):
+        """Let dt seconds pass without a measurement."""
+        self.age += dt
+
+    def predict(self):
+        """Filtered angle extrapolated to now, unwrapped. 0 if nothing was measured."""
+        if self.value is None:
+            return 0.0
+        return self.value + self.rate * min(self.age, self.max_extrapolation)
+
+
+class TrendFilter:
+    """Linear trend of a signal, fitted to its recent history.
+
+    A least squares line through all measurements, with weights that fade
+    out exponentially with their age. The fit only keeps five weighted sums,
+    updated in constant time per measurement, so memory and cost per
+    measurement don't grow with the length of the history. Time is counted
+    back from the latest measurement, which keeps the sums bounded however
+    long the signal runs.
+
+    Args:
+        time_constant (float): Seconds in which the weight of a measurement
+            drops to 37%. Longer follows slower trends, and is less noisy.
+
+    Attributes:
+        level (float): Value of the fitted line at the latest measurement.
+        slope (float): Change of the fitted line per second.
+        span (float): Spread in seconds of the measurement times, weighted.
+            The slope is 0 until the measurements span some time.
+    """
+    def __init__(self, time_constant):
+        self.time_constant = time_constant
+        self.reset()
+
+    def reset(self):
+        """Forget all measurements."""
+        self.level = 0.0
+        self.slope = 0.0
+        self.span = 0.0
+        # Weighted sums of 1, t, t^2, y and t*y, with t relative to the latest measurement.
+        self._s0 = 0.0
+        self._st = 0.0
+        self._stt = 0.0
+        self._sy = 0.0
+        self._sty = 0.0
+
+    def add(self, value, dt):
+        """Add a measurement.
+
+        Args:
+            value (float): Measured value.
+            dt (float): Seconds since the previous measurement.
+        """
+        if self._s0 > 0 and dt > 0:
+            decay = math.exp(-dt / self.time_constant)
+            s0 = self._s0
+            st = self._st
+            sy = self._sy
+            # Move the time origin to the new measurement, t -> t - dt.
+            self._stt = (self._stt - 2 * dt * st + dt * dt * s0) * decay
+            self._st = (st - dt * s0) * decay
+            self._sty = (self._sty - dt * sy) * decay
+            self._s0 = s0 * decay
+            self._sy = sy * decay
+        # The new measurement is at t = 0, so only adds to the sums of 1 and y.
+        self._s0 += 1
+        self._sy += value
+
+        s0 = self._s0
+        st = self._st
+        variance = self._stt / s0 - (st / s0) ** 2
+        self.span = math.sqrt(max(variance, 0.0))
+        # A line through measurements at (nearly) one moment has no slope.
+        if self.span > 1e-3 * self.time_constant:
+            self.slope = (s0 * self._sty - st * self._sy) / (s0 * self._stt - st * st)
+        else:
+            self.slope = 0.0
+        self.level = (self._sy - self.slope * st) / s0
+
+    def predict(self, horizon, damping=None):
+        """Value of the trend a number of seconds after the latest measurement.
+
+        Args:
+            horizon (float): Seconds ahead.
+            damping (float): Seconds in which the trend flattens out, following
+                the fitted line at first and levelling off far ahead.
+                None to follow the fitted line all the way.
+        """
+        if damping:
+            horizon = damping * (1 - math.exp(-horizon / damping))
+        return self.level + self.slope * horizon
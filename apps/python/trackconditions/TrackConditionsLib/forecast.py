@@ -0,0 +1,84 @@
+from TrackConditionsLib.filters import TrendFilter
+
+# Fraction of the forecast time constant the samples need to span,
+# before their trend is taken as a forecast.
+MIN_SPAN = 0.1
+
+# Seconds over which the trend levels off, as multiple of the time constant.
+# Conditions tend to settle, e.g. a track that warms up, so a straight line
+# overshoots far ahead.
+DAMPING = 2
+
+
+class Forecast:
+    """Forecast of the track grip and road temperature, from their recent trend.
+
+    Each follows a trend filter, which is updated in constant time per session
+    update and keeps no history, so a session of any length costs the same
+    memory and time per update. The trend is extrapolated to the end of the
+    session and to a number of laps ahead at the last lap time, levelling off
+    the further ahead it goes.
+
+    Subscribe update() to the 'conditions' topic of the session.
+
+    Args:
+        cfg (obj:Config)
+        session (obj:Session)
+    """
+    def __init__(self, cfg, session):
+        self.cfg = cfg
+        self.session = session
+        self.grip = TrendFilter(cfg.forecast_time_constant)
+        self.road_temp = TrendFilter(cfg.forecast_time_constant)
+
+        # Seconds since the last sample was added.
+        self.elapsed = 0.0
+
+    def configure(self):
+        """Apply forecast settings from config, keeping the trend so far."""
+        for trend in (self.grip, self.road_temp):
+            trend.time_constant = self.cfg.forecast_time_constant
+
+    def update(self, dt):
+        """ Add a sample of the session data.
+
+        Args:
+            dt (float): Time in seconds since the previous update.
+        """
+        self.elapsed += dt
+        # No accurate data in replay mode.
+        if self.session.status == 1:
+            return
+        self.grip.add(self.session.track_grip, self.elapsed)
+        self.road_temp.add(self.session.road_temp, self.elapsed)
+        self.elapsed = 0.0
+
+    @property
+    def ready(self):
+        """Whether the samples span enough time for a trend."""
+        return self.grip.span >= MIN_SPAN * self.cfg.forecast_time_constant
+
+    def horizons(self):
+        """Moments to forecast, as (name, seconds from now).
+
+        The end of the session if it has a time limit,
+        and the next laps once a lap time is known.
+        """
+        horizons = []
+        if self.session.session_time_left > 0:
+            horizons.append(("end", self.session.session_time_left))
+        if self.session.lap_time > 0:
+            laps = self.cfg.forecast_laps
+            horizons.append(("{} lap{}".format(laps, "s" if laps > 1 else ""),
+                             laps * self.session.lap_time))
+        return horizons
+
+    def predict(self, horizon):
+        """Forecast a number of seconds ahead.
+
+        Returns:
+            tuple: (track grip in %, road temperature in degrees Celsius)
+        """
+        damping = DAMPING * self.cfg.forecast_time_constant
+        grip = min(max(self.grip.predict(horizon, damping), 0.0), 100.0)
+        return grip, self.road_temp.predict(horizon, damping)
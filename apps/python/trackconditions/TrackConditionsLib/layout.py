@@ -0,0 +1,123 @@
+from collections import namedtuple
+
+# Screen area of an app element in pixels, relative to the app window.
+Box = namedtuple('Box', ['x', 'y', 'width', 'height'])
+
+# Height of a text row, as fraction of app height.
+ROW = 0.2
+
+# Width of a label and its value in the numbers strip, as fraction of its height.
+STRIP_ITEM = 4.6
+
+# Config option holding the height in pixels of each kind of window.
+HEIGHTS = {
+    'main': 'app_height',
+    'arrow': 'arrow_window_height',
+    'strip': 'strip_window_height',
+}
+
+def describe(cfg, kind='main'):
+    """Layout description of all elements of a window.
+
+    Everything is expressed in units of window height, so that the whole
+    window scales with a single number. The main window stacks its sections
+    from top to bottom: the main part, the history graph, the forecast and
+    the tailwind overlay. The arrow window only has the wind indicator, the numbers strip
+    only has the labels and their values, in a single row.
+
+    Args:
+        cfg (obj:Config): App configuration.
+        kind (str): 'main', 'arrow' or 'strip'.
+
+    Returns:
+        dict: Element name to (x, y, width, height) in units of window height.
+    """
+    pad = cfg.app_padding
+    if kind == 'arrow':
+        return {
+            'window': (0, 0, 1, 1),
+            'wind_indicator': (pad, pad, 1 - 2 * pad, 1 - 2 * pad),
+        }
+    if kind == 'strip':
+        elements = {'window': (0, 0, 4 * STRIP_ITEM + 2 * pad, 1)}
+        for n in range(4):
+            x = 2 * pad + STRIP_ITEM * n
+            elements['label_text_{}'.format(n)] = (x, 0, 0, 1)
+            elements['label_value_{}'.format(n)] = (x + STRIP_ITEM - 2 * pad, 0, 0, 1)
+        return elements
+
+    width = cfg.app_aspect_ratio
+    history = cfg.history_aspect if cfg.history_enabled else 0
+    forecast = ROW if cfg.forecast_enabled else 0
+    grid = ROW if cfg.grid_enabled else 0
+
+    elements = {
+        'window': (0, 0, width, 1 + history + forecast + grid),
+        # Wind indicator is a square on the right of the main part.
+        'wind_indicator': (width - 1 + 1.5 * pad, 1.5 * pad, 1 - 3 * pad, 1 - 3 * pad),
+        'history_graph': (pad, 1, width - 2 * pad, history - pad),
+        'forecast': (pad, 1 + history, width - 2 * pad, 0.8 * forecast),
+        'tailwind': (pad, 1 + history + forecast, width - 2 * pad, 0.8 * grid),
+    }
+    # Text labels on the left, values right aligned to the left of the wind indicator.
+    for n in range(4):
+        elements['label_text_{}'.format(n)] = (pad, pad + ROW * n, 0, ROW)
+        elements['label_value_{}'.format(n)] = (width - 1 - pad, pad + ROW * n, 0, ROW)
+    return elements
+
+def compute_boxes(cfg, kind='main'):
+    """Boxes in pixels of all elements of a window, for its current height.
+
+    Args:
+        cfg (obj:Config): App configuration.
+        kind (str): 'main', 'arrow' or 'strip'.
+
+    Returns:
+        dict: Element name to Box.
+    """
+    scale = getattr(cfg, HEIGHTS[kind])
+    return dict(
+        (name, Box(x * scale, y * scale, width * scale, height * scale))
+        for name, (x, y, width, height) in describe(cfg, kind).items())
+
+class Layout:
+    """Places the elements of a window according to the layout description.
+
+    Elements are bound to a function that applies their box. After the app size
+    changed, update() recomputes all boxes, which is cheap, and calls the
+    functions of only those elements whose box changed. Elements keep their
+    objects and only recompute their geometry.
+
+    Args:
+        cfg (obj:Config): App configuration.
+        kind (str): 'main', 'arrow' or 'strip'.
+    """
+    def __init__(self, cfg, kind='main'):
+        self.cfg = cfg
+        self.kind = kind
+        self.boxes = compute_boxes(cfg, kind)
+        self.bindings = {}
+
+    def bind(self, name, apply):
+        """Bind an element to a function applying its box, and apply it now.
+
+        Args:
+            name (str): Element name in the layout description.
+            apply (callable): Called as apply(box) with a Box.
+        """
+        self.bindings.setdefault(name, []).append(apply)
+        apply(self.boxes[name])
+
+    def update(self):
+        """Recompute boxes, applying those that changed.
+
+        Returns:
+            set: Names of the elements whose box changed.
+        """
+        boxes = compute_boxes(self.cfg, self.kind)
+        changed = set(name for name, box in boxes.items() if box != self.boxes.get(name))
+        self.boxes = boxes
+        for name in changed:
+            for apply in self.bindings.get(name, ()):
+                apply(boxes[name])
+        return changed
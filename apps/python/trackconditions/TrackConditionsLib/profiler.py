@@ -0,0 +1,161 @@
+import math
+import time
+from array import array
+from collections import OrderedDict
+
+
+class Histogram:
+    """Latency histogram with fixed, logarithmically spaced buckets.
+
+    Adding a sample increments a counter in place, nothing grows per sample.
+    Percentiles are reported as the upper edge of the bucket they fall in,
+    which with the default of 20 buckets per decade is within 12%.
+
+    Args:
+        min_us (float): Upper edge of the first bucket in microseconds.
+        max_us (float): Lower edge of the last bucket in microseconds.
+        per_decade (int): Number of buckets per factor 10.
+    """
+    def __init__(self, min_us=1, max_us=1e6, per_decade=20):
+        self.min_us = min_us
+        self.per_decade = per_decade
+        self.scale = per_decade / math.log(10)
+        self.size = int(math.ceil(math.log10(max_us / min_us) * per_decade)) + 2
+        self.counts = array('l', [0]) * self.size
+        self.count = 0
+        self.max = 0.0
+
+    def add(self, seconds):
+        """Add a sample.
+
+        Args:
+            seconds (float): Measured latency in seconds.
+        """
+        us = seconds * 1e6
+        if us > self.min_us:
+            index = min(int(math.log(us / self.min_us) * self.scale) + 1, self.size - 1)
+        else:
+            index = 0
+        self.counts[index] += 1
+        self.count += 1
+        if us > self.max:
+            self.max = us
+
+    def percentile(self, pct):
+        """Latency in microseconds below which pct percent of the samples fall."""
+        if not self.count:
+            return 0.0
+        rank = pct / 100 * self.count
+        total = 0
+        for index, count in enumerate(self.counts):
+            total += count
+            if total >= rank:
+                return min(self.min_us * 10 ** (index / self.per_decade), self.max)
+        return self.max
+
+    def reset(self):
+        """Remove all samples."""
+        for index in range(self.size):
+            self.counts[index] = 0
+        self.count = 0
+        self.max = 0.0
+
+
+class Profiler:
+    """Optional timing of app stages, reported periodically to a file.
+
+    Stages are timed by wrapping functions or methods. When the profiler is
+    disabled nothing gets wrapped, so it costs nothing at all.
+
+    Args:
+        path (str): File the reports are appended to.
+        enabled (bool): Whether to time stages.
+    """
+    def __init__(self, path, enabled=False):
+        self.path = path
+        self.enabled = enabled
+        self.stages = OrderedDict()
+        # Tasks whose effective rate is reported, with their run count at the last report.
+        self.tasks = OrderedDict()
+
+    def stage(self, name):
+        """Return histogram of a stage, creating it if needed."""
+        if name not in self.stages:
+            self.stages[name] = Histogram()
+        return self.stages[name]
+
+    def wrap(self, func, name):
+        """Return func timed as stage name, or func itself if disabled.
+
+        Args:
+            func (callable): Function to time.
+            name (str): Stage name.
+        """
+        if not self.enabled:
+            return func
+        add = self.stage(name).add
+        perf_counter = time.perf_counter
+
+        def timed(*args):
+            start = perf_counter()
+            result = func(*args)
+            add(perf_counter() - start)
+            return result
+        return timed
+
+    def add_task(self, task, name):
+        """Report the effective rate of a scheduler task, if enabled.
+
+        Args:
+            task (obj:Task): Task to report.
+            name (str): Name in the report.
+        """
+        if self.enabled:
+            self.tasks[name] = [task, task.runs]
+
+    def instrument(self, obj, method, name):
+        """Time a method of an object as stage name, if enabled.
+
+        Args:
+            obj (object): Object whose method to time.
+            method (str): Name of the method.
+            name (str): Stage name.
+        """
+        if self.enabled:
+            setattr(obj, method, self.wrap(getattr(obj, method), name))
+
+    def report(self, dt=None):
+        """Append statistics of all stages since the previous report to the file.
+
+        Durations and rates are in game time, the time the scheduler runs
+        tasks on, which differs from wall time while paused or after a hitch.
+
+        Args:
+            dt (float): Seconds of game time since the previous report,
+                as passed by the scheduler. Task rates are left out if None.
+        """
+        now = time.time()
+        if dt is None:
+            lines = [time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now))]
+        else:
+            lines = ["{}  last {:.0f} s game time".format(
+                time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now)), dt)]
+        lines.append("{:<22}{:>8}{:>10}{:>10}{:>10}{:>10}".format(
+            "stage", "count", "p50 us", "p95 us", "p99 us", "max us"))
+        for name, histogram in self.stages.items():
+            lines.append("{:<22}{:>8}{:>10.1f}{:>10.1f}{:>10.1f}{:>10.1f}".format(
+                name, histogram.count, histogram.percentile(50), histogram.percentile(95),
+                histogram.percentile(99), histogram.max))
+            histogram.reset()
+
+        if self.tasks and dt:
+            lines.append("{:<22}{:>8}{:>10}".format("task", "runs/s", "rate"))
+            for name, entry in self.tasks.items():
+                task, runs = entry
+                lines.append("{:<22}{:>8.2f}{:>10.2f}".format(
+                    name, (task.runs - runs) / dt, task.rate))
+        for entry in self.tasks.values():
+            entry[1] = entry[0].runs
+
+        with open(self.path, 'a') as f:
+            f.write("\n".join(lines) + "\n\n")
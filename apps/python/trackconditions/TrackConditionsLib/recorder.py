@@ -0,0 +1,164 @@
+import os
+import sys
+import time
+import struct
+import threading
+from array import array
+
+# Identifies recording files, followed by a format version byte.
+MAGIC = b'TCREC'
+VERSION = 1
+
+# Values stored per sample, each as a 64-bit float.
+FIELDS = ('time', 'status', 'wind_dir', 'wind_speed',
+          'air_temp', 'road_temp', 'track_grip', 'heading')
+ROW = len(FIELDS)
+
+
+class ConditionsRecorder:
+    """Record session data samples to a binary file.
+
+    Samples are written into a preallocated ring buffer on the calling thread,
+    which only stores floats in place and never allocates. A background thread
+    drains the buffer to disk in large sequential writes, every flush interval
+    or as soon as the buffer is half full.
+
+    If the writer thread falls behind so far that the ring buffer is full,
+    new samples are dropped and counted, rather than blocking the caller.
+
+    Args:
+        path (str): File to record to. Folders are created if needed.
+        capacity (int): Number of samples the ring buffer holds.
+        flush_interval (float): Seconds between background flushes.
+        clock (callable): Returns the timestamp of a sample in seconds.
+            Defaults to time.time.
+
+    Attributes:
+        written (int): Number of samples recorded.
+        flushed (int): Number of samples written to disk.
+        dropped (int): Number of samples dropped because the buffer was full.
+    """
+    def __init__(self, path, capacity=2048, flush_interval=5.0, clock=time.time):
+        self.path = path
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self.clock = clock
+
+        self.written = 0
+        self.flushed = 0
+        self.dropped = 0
+
+        # Flat buffer, one row of len(FIELDS) floats per sample.
+        self.buffer = array('d', [0.0]) * (capacity * ROW)
+        self._view = memoryview(self.buffer)
+
+        folder = os.path.dirname(path)
+        if folder and not os.path.isdir(folder):
+            os.makedirs(folder)
+        self.file = open(path, 'wb')
+        self.file.write(_header())
+
+        self._stopped = False
+        self._wake = threading.Event()
+        self._wake_at = max(capacity // 2, 1)
+        self._thread = threading.Thread(target=self._run, name="ConditionsRecorder")
+        # Never keep the game from shutting down.
+        self._thread.daemon = True
+        self._thread.start()
+
+    def record(self, session):
+        """Store a sample of the session data.
+
+        Args:
+            session (obj:Session): Session to take a sample of.
+        """
+        if self.written - self.flushed >= self.capacity:
+            self.dropped += 1
+            return
+        buf = self.buffer
+        i = (self.written % self.capacity) * ROW
+        buf[i] = self.clock()
+        buf[i + 1] = session.status
+        buf[i + 2] = session.wind_dir
+        buf[i + 3] = session.wind_speed
+        buf[i + 4] = session.air_temp
+        buf[i + 5] = session.road_temp
+        buf[i + 6] = session.track_grip
+        buf[i + 7] = session.focused_car.heading
+        # Publish the sample only after it is complete.
+        self.written += 1
+        if self.written - self.flushed == self._wake_at:
+            self._wake.set()
+
+    def _run(self):
+        """Background thread, flush periodically until stopped, then close the file.
+
+        All writes happen on this thread, so there is never more than one flush at a time.
+        """
+        while not self._stopped:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+        # Samples recorded during the last flush.
+        self.flush()
+        self.file.close()
+        self._view.release()
+
+    def flush(self):
+        """Write all recorded samples that are not on disk yet."""
+        start = self.flushed
+        end = self.written
+        while start < end:
+            # At most two writes: up to the end of the ring buffer, then from its start.
+            a = start % self.capacity
+            b = min(a + end - start, self.capacity)
+            self.file.write(self._view[a * ROW:b * ROW])
+            start += b - a
+        self.file.flush()
+        self.flushed = end
+
+    def close(self):
+        """Stop recording. The background thread writes the remaining samples and closes the file.
+
+        Waits up to two flush intervals for the thread. If writing takes longer,
+        the thread finishes on its own.
+        """
+        if self._stopped:
+            return
+        self._stopped = True
+        self._wake.set()
+        self._thread.join(2 * self.flush_interval)
+
+
+def _header():
+    """File header: magic, version, byte order and field names."""
+    names = ','.join(FIELDS).encode('ascii')
+    byteorder = b'<' if sys.byteorder == 'little' else b'>'
+    return MAGIC + struct.pack('<BcH', VERSION, byteorder, len(names)) + names
+
+
+def load_recording(path):
+    """Load a recording made by ConditionsRecorder.
+
+    Args:
+        path (str): Recording file.
+
+    Returns:
+        tuple: (field names, flat array('d') with one row of values per sample)
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError("Not a conditions recording: {}".format(path))
+        version, byteorder, length = struct.unpack('<BcH', f.read(4))
+        if version != VERSION:
+            raise ValueError("Unsupported recording version: {}".format(version))
+        fields = tuple(f.read(length).decode('ascii').split(','))
+        data = array('d')
+        payload = f.read()
+    # Ignore a partially written last sample.
+    row_size = data.itemsize * len(fields)
+    data.frombytes(payload[:len(payload) - len(payload) % row_size])
+    native = b'<' if sys.byteorder == 'little' else b'>'
+    if byteorder != native:
+        data.byteswap()
+    return fields, data
@@ -0,0 +1,137 @@
+import time
+
+# Policies for a task that fell behind by more than one period, e.g. after a stall.
+SKIP = 'skip'          # Run once and drop the missed runs.
+CATCH_UP = 'catch_up'  # Run the missed runs, a limited number per tick.
+
+# Callbacks of Assetto Corsa that tasks can run on.
+ON_UPDATE = 'update'   # acUpdate, runs even if the app is hidden.
+ON_RENDER = 'render'   # Render callback, only runs if the app is visible.
+
+
+class Task:
+    """Periodic task run by the Scheduler.
+
+    The task function is called with the time in seconds since its previous run.
+
+    Args:
+        func (callable): Function to run, called as func(dt).
+        rate (float): Runs per second.
+        policy (str): SKIP or CATCH_UP.
+        budget (float): Time budget of a run in seconds. Optional.
+            Runs that take longer are counted as overruns. With CATCH_UP,
+            no more missed runs are done in a tick once the budget is spent.
+        max_catch_up (int): Maximum number of runs per tick with CATCH_UP.
+            Missed runs beyond this are dropped.
+
+    Attributes:
+        runs (int): Number of runs.
+        skipped (int): Number of runs dropped after falling behind.
+        overruns (int): Number of runs that took longer than the budget.
+    """
+    def __init__(self, func, rate, policy=SKIP, budget=None, max_catch_up=4):
+        self.func = func
+        self.policy = policy
+        self.budget = budget
+        self.max_catch_up = max_catch_up
+        self.set_rate(rate)
+
+        # Time accumulated towards the next run, and since the last run.
+        self.timer = 0
+        self.elapsed = 0
+
+        self.runs = 0
+        self.skipped = 0
+        self.overruns = 0
+
+    def set_rate(self, rate):
+        """Change the number of runs per second."""
+        self.rate = rate
+        self.period = 1 / rate
+
+    def run_next_tick(self):
+        """Make the task due, so it runs on the next tick regardless of its rate."""
+        self.timer = max(self.timer, self.period)
+
+    def advance(self, dt):
+        """Advance the task by dt seconds, running it if it's due."""
+        self.timer += dt
+        self.elapsed += dt
+        if self.timer < self.period:
+            return
+
+        if self.policy == CATCH_UP:
+            start = time.perf_counter()
+            runs = 0
+            while self.timer >= self.period and runs < self.max_catch_up:
+                self.timer -= self.period
+                self._run(self.period)
+                runs += 1
+                if self.budget is not None and time.perf_counter() - start > self.budget:
+                    break
+            # Keep at most max_catch_up periods of backlog for the next ticks.
+            backlog = self.max_catch_up * self.period
+            if self.timer > backlog:
+                self.skipped += int((self.timer - backlog) / self.period)
+                self.timer = backlog
+            self.elapsed = self.timer
+        else:
+            self.skipped += int(self.timer / self.period) - 1
+            self.timer %= self.period
+            self._run(self.elapsed)
+            self.elapsed = self.timer
+
+    def _run(self, dt):
+        """Run the task function, keeping track of budget overruns."""
+        self.runs += 1
+        if self.budget is None:
+            self.func(dt)
+            return
+        start = time.perf_counter()
+        self.func(dt)
+        if time.perf_counter() - start > self.budget:
+            self.overruns += 1
+
+
+class Scheduler:
+    """Runs periodic tasks at their own rates, on acUpdate or the render callback.
+
+    Call tick() from acUpdate with ON_UPDATE, and from the render callback
+    with ON_RENDER. Tasks run in the order they were added.
+    """
+    def __init__(self):
+        self.tasks = {ON_UPDATE: [], ON_RENDER: []}
+
+    def add(self, func, rate, policy=SKIP, budget=None, on=ON_UPDATE, max_catch_up=4):
+        """Add a periodic task.
+
+        Args:
+            func (callable): Function to run, called as func(dt).
+            rate (float): Runs per second.
+            policy (str): SKIP or CATCH_UP.
+            budget (float): Time budget of a run in seconds. Optional.
+            on (str): ON_UPDATE or ON_RENDER.
+            max_catch_up (int): Maximum number of runs per tick with CATCH_UP.
+
+        Returns:
+            obj:Task: The added task.
+        """
+        task = Task(func, rate, policy, budget, max_catch_up)
+        self.tasks[on].append(task)
+        return task
+
+    def remove(self, task):
+        """Remove a task."""
+        for tasks in self.tasks.values():
+            if task in tasks:
+                tasks.remove(task)
+
+    def tick(self, on, dt):
+        """Advance all tasks of a callback by dt seconds.
+
+        Args:
+            on (str): ON_UPDATE or ON_RENDER.
+            dt (float): Time delta since last tick in seconds.
+        """
+        for task in self.tasks[on]:
+            task.advance(dt)
@@ -1,6 +1,10 @@
+import os
+import sys
 import mmap
+import struct
 import functools
 import ctypes
+from collections import namedtuple
 from ctypes import c_int32, c_float, c_wchar
 
 AC_STATUS = c_int32
@@ -176,38 +180,321 @@ class SPageFileStatic(ctypes.Structure):
 		
     ]
 
+class TaggedBackend:
+    """Map pages as tagged shared memory, as published by Assetto Corsa.
+
+    Tagged shared memory only exists on Windows.
+    """
+    def map(self, tagname, size):
+        return mmap.mmap(0, size, tagname)
+
+    def close(self):
+        pass
+
+class AnonymousBackend:
+    """Map pages as anonymous zero-filled memory, private to this process.
+
+    Used on platforms without tagged shared memory, so that the app can be
+    imported and exercised outside of Assetto Corsa.
+    """
+    def map(self, tagname, size):
+        return mmap.mmap(-1, size)
+
+    def close(self):
+        pass
+
+class FileBackend:
+    """Map pages from files named after their tag, e.g. /dev/shm/acpmf_physics.
+
+    Files are created and zero-filled if missing or too small, so that a reader
+    and a writer can be started in any order. Page layouts follow the ctypes
+    structures of the running platform, so the size of c_wchar fields differs
+    between Windows and other platforms.
+
+    Args:
+        directory (str): Folder holding the page files.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        self._files = []
+
+    def map(self, tagname, size):
+        path = os.path.join(self.directory, tagname)
+        if not os.path.exists(path):
+            open(path, 'wb').close()
+        f = open(path, 'r+b')
+        if os.path.getsize(path) < size:
+            f.truncate(size)
+        self._files.append(f)
+        return mmap.mmap(f.fileno(), size)
+
+    def close(self):
+        for f in self._files:
+            f.close()
+        self._files = []
+
+# Environment variable to map pages from files in a folder, instead of the game.
+SHM_DIR_ENV = "TRACKCONDITIONS_SHM_DIR"
+
+def default_backend():
+    """Pick the backend for the current platform and environment."""
+    directory = os.environ.get(SHM_DIR_ENV)
+    if directory:
+        return FileBackend(directory)
+    if sys.platform == "win32":
+        return TaggedBackend()
+    return AnonymousBackend()
+
+def _struct_code(ctype):
+    """Return struct format code and item count for a numeric ctypes type."""
+    count = 1
+    while hasattr(ctype, '_length_'):
+        count *= ctype._length_
+        ctype = ctype._type_
+    code = getattr(ctype, '_type_', None)
+    if code not in ('i', 'f'):
+        raise ValueError("Only int and float fields can be read, not {}".format(ctype.__name__))
+    return code, count
+
+class FieldReader:
+    """Read a fixed set of fields from a shared memory page in one go.
+
+    Byte offsets of the fields are computed once from the structure layout,
+    after which every read is a single struct.unpack_from call over the page,
+    instead of one ctypes attribute access per field.
+
+    Array fields are returned as flat tuples, e.g. tyreContactPoint gives
+    12 floats: x, y, z for each of the four wheels.
+
+    Args:
+        structure (ctypes.Structure): Structure class describing the page.
+        buffer (memoryview): Memory of the page.
+        fields (list): Names of the fields to read.
+    """
+    def __init__(self, structure, buffer, fields):
+        self.buffer = buffer
+        self.fields = list(fields)
+        self.result = namedtuple(structure.__name__ + 'Fields', self.fields)
+
+        # Sort fields by offset to build one format string with padding
+        # for the bytes in between. The result order is restored afterwards.
+        types = dict(structure._fields_)
+        layout = sorted(
+            (getattr(structure, name).offset, name) for name in self.fields)
+        fmt = '<'
+        position = 0
+        # Per field in requested order: (index of first value, number of values)
+        spans = {}
+        index = 0
+        for offset, name in layout:
+            code, count = _struct_code(types[name])
+            if offset > position:
+                fmt += '{}x'.format(offset - position)
+            fmt += '{}{}'.format(count, code)
+            spans[name] = (index, count)
+            index += count
+            position = offset + getattr(structure, name).size
+        self.struct = struct.Struct(fmt)
+
+        # Fast path when all fields are scalars in offset order.
+        self._direct = (
+            [name for offset, name in layout] == self.fields and
+            index == len(self.fields))
+        self._spans = [spans[name] for name in self.fields]
+
+    def read(self):
+        """Read all fields.
+
+        Returns:
+            tuple: Field values, in the order the fields were requested.
+        """
+        values = self.struct.unpack_from(self.buffer)
+        if self._direct:
+            return values
+        return tuple(
+            values[i] if n == 1 else values[i:i + n] for i, n in self._spans)
+
+    def read_named(self):
+        """Read all fields into a namedtuple, with the field names as attributes.
+
+        Slower than read(), because of the namedtuple construction.
+        """
+        return self.result._make(self.read())
+
+class SnapshotReader(FieldReader):
+    """FieldReader that reads a page consistently, together with its packetId.
+
+    The game writes a page while the app may be reading it. The packetId is
+    read in the same unpack as the fields and once more right after it. If it
+    changed in between, the game wrote the page during the read, and the read
+    is repeated. Only the physics and graphics pages have a packetId.
+
+    This catches a write that finishes during the read, not one that is still
+    going on when the packetId is checked again: the game only bumps the
+    packetId after writing the fields. So a read is consistent with high
+    probability, not guaranteed. If the page changed during every attempt,
+    the last read is returned anyway, counted in exhausted and flagged by
+    consistent. Callers should then treat it as no new data.
+
+    read() returns the packetId first, followed by the requested fields.
+
+    Args:
+        structure (ctypes.Structure): Structure class describing the page.
+        buffer (memoryview): Memory of the page.
+        fields (list): Names of the fields to read, besides packetId.
+        attempts (int): Maximum number of reads. The last one is returned,
+            even if the page changed during it.
+
+    Attributes:
+        retries (int): Number of reads repeated because the page changed.
+        exhausted (int): Number of reads returned after the page changed
+            during every attempt.
+        consistent (bool): Whether the packetId held during the last read.
+    """
+    def __init__(self, structure, buffer, fields, attempts=3):
+        FieldReader.__init__(self, structure, buffer, ['packetId'] + list(fields))
+        self.attempts = attempts
+        self.retries = 0
+        self.exhausted = 0
+        self.consistent = True
+        self._packet_id = struct.Struct('<i')
+        self._packet_offset = structure.packetId.offset
+
+    def read(self):
+        """Read packetId and all fields, repeating the read if the packetId changed.
+
+        Returns:
+            tuple: packetId, then the field values in the order they were requested.
+        """
+        for attempt in range(self.attempts):
+            values = FieldReader.read(self)
+            if self._packet_id.unpack_from(self.buffer, self._packet_offset)[0] == values[0]:
+                self.consistent = True
+                return values
+            self.retries += 1
+        # Out of attempts, the fields may be from two versions of the page.
+        self.consistent = False
+        self.exhausted += 1
+        return values
+
+# Structure and tag name of each page.
+PAGES = {
+    'physics': (SPageFilePhysics, "acpmf_physics"),
+    'graphics': (SPageFileGraphic, "acpmf_graphics"),
+    'static': (SPageFileStatic, "acpmf_static"),
+}
+
 class SimInfo:
-    def __init__(self):
-        self._acpmf_physics = mmap.mmap(0, ctypes.sizeof(SPageFilePhysics), "acpmf_physics")
-        self._acpmf_graphics = mmap.mmap(0, ctypes.sizeof(SPageFileGraphic), "acpmf_graphics")
-        self._acpmf_static = mmap.mmap(0, ctypes.sizeof(SPageFileStatic), "acpmf_static")
-        self.physics = SPageFilePhysics.from_buffer(self._acpmf_physics)
-        self.graphics = SPageFileGraphic.from_buffer(self._acpmf_graphics)
-        self.static = SPageFileStatic.from_buffer(self._acpmf_static)
+    """Access to the physics, graphics and static shared memory pages.
+
+    Pages are mapped on first use, by reader() or by reading the physics,
+    graphics or static structure, so a page that is never read is never mapped.
+
+    Args:
+        backend (obj): Maps the pages, see TaggedBackend, FileBackend and
+            AnonymousBackend. Optional, defaults to default_backend().
+    """
+    def __init__(self, backend=None):
+        self.backend = backend if backend is not None else default_backend()
+        self._memory = {}
+        self._structures = {}
+        self._views = {}
+
+    def memory(self, page):
+        """Mapped memory of a page, mapping it if it isn't yet.
+
+        Args:
+            page (str): 'physics', 'graphics' or 'static'.
+        """
+        if page not in self._memory:
+            structure, tagname = PAGES[page]
+            self._memory[page] = self.backend.map(tagname, ctypes.sizeof(structure))
+        return self._memory[page]
+
+    def mapped(self):
+        """Names of the pages mapped so far."""
+        return sorted(self._memory)
+
+    def structure(self, page):
+        """ctypes structure over the memory of a page, mapping it if it isn't yet.
+
+        Args:
+            page (str): 'physics', 'graphics' or 'static'.
+        """
+        if page not in self._structures:
+            self._structures[page] = PAGES[page][0].from_buffer(self.memory(page))
+        return self._structures[page]
+
+    @property
+    def physics(self):
+        return self.structure('physics')
+
+    @property
+    def graphics(self):
+        return self.structure('graphics')
+
+    @property
+    def static(self):
+        return self.structure('static')
+
+    def reader(self, page, fields, coherent=False):
+        """Create a FieldReader for a set of fields of a page.
+
+        Args:
+            page (str): 'physics', 'graphics' or 'static'.
+            fields (list): Names of the fields to read.
+            coherent (bool): Create a SnapshotReader, which also reads packetId
+                and repeats reads during which the game wrote the page.
+        """
+        if page not in self._views:
+            self._views[page] = memoryview(self.memory(page))
+        if coherent:
+            return SnapshotReader(PAGES[page][0], self._views[page], fields)
+        return FieldReader(PAGES[page][0], self._views[page], fields)
 
     def close(self):
-        self._acpmf_physics.close()
-        self._acpmf_graphics.close()
-        self._acpmf_static.close()
+        """Close the mapped pages. Readers and structures can't be used after."""
+        # A mapping can't be closed while structures still point into it.
+        self._structures = {}
+        for view in self._views.values():
+            view.release()
+        self._views = {}
+        for memory in self._memory.values():
+            memory.close()
+        self._memory = {}
+        self.backend.close()
 
     def __del__(self):
         self.close()
 
-info = SimInfo()
+# Instance shared by all parts of the app, see get_info().
+_info = None
+
+def get_info():
+    """SimInfo shared by all parts of the app, created on first use.
+
+    Creating it maps nothing, pages are mapped once they are read.
+    """
+    global _info
+    if _info is None:
+        _info = SimInfo()
+    return _info
 
 def demo():
     import time
 
+    info = get_info()
     for _ in range(400):
         print(info.static.track, info.graphics.tyreCompound, info.graphics.currentTime,
               info.physics.rpms, info.graphics.currentTime, info.static.maxRpm, list(info.physics.tyreWear))
         time.sleep(0.1)
 
 def do_test():
-    for struct in info.static, info.graphics, info.physics:
-        print(struct.__class__.__name__)
-        for field, type_spec in struct._fields_:
-            value = getattr(struct, field)
+    info = get_info()
+    for page in info.static, info.graphics, info.physics:
+        print(page.__class__.__name__)
+        for field, type_spec in page._fields_:
+            value = getattr(page, field)
             if not isinstance(value, (str, float, int)):
                 value = list(value)
             print(" {} -> {} {}".format(field, type(value), value))
@@ -0,0 +1,216 @@
+import acsys
+from array import array
+
+from TrackConditionsLib.color_palette import Colors
+
+# Stroke font on a grid of 4 units wide and 6 units high, y pointing down.
+# Each glyph is a list of strokes from (x1, y1) to (x2, y2).
+# Digits follow seven segment displays, letters cover the app's labels and units.
+_A, _B, _C, _D, _E, _F, _G = (
+    (0, 0, 4, 0), (4, 0, 4, 3), (4, 3, 4, 6), (0, 6, 4, 6),
+    (0, 3, 0, 6), (0, 0, 0, 3), (0, 3, 4, 3))
+
+GLYPHS = {
+    '0': [_A, _B, _C, _D, _E, _F],
+    '1': [_B, _C],
+    '2': [_A, _B, _G, _E, _D],
+    '3': [_A, _B, _G, _C, _D],
+    '4': [_F, _G, _B, _C],
+    '5': [_A, _F, _G, _C, _D],
+    '6': [_A, _F, _G, _E, _D, _C],
+    '7': [_A, _B, _C],
+    '8': [_A, _B, _C, _D, _E, _F, _G],
+    '9': [_A, _B, _F, _G, _C, _D],
+    '-': [(1, 3, 3, 3)],
+    '.': [(2, 5.6, 2, 6)],
+    ':': [(2, 1.6, 2, 2), (2, 5.6, 2, 6)],
+    '/': [(0, 6, 4, 0)],
+    '%': [(0, 6, 4, 0), (0.4, 0.4, 0.4, 0.8), (3.6, 5.2, 3.6, 5.6)],
+    'A': [(0, 6, 2, 0), (2, 0, 4, 6), (0.8, 3.6, 3.2, 3.6)],
+    'C': [(4, 0, 0, 0), _F, _E, _D],
+    'D': [(0, 0, 0, 6), (0, 0, 3, 0), (3, 0, 4, 1.5), (4, 1.5, 4, 4.5), (4, 4.5, 3, 6), (3, 6, 0, 6)],
+    'G': [_A, _F, _E, _D, _C, (2, 3, 4, 3)],
+    'I': [(2, 0, 2, 6), (1, 0, 3, 0), (1, 6, 3, 6)],
+    'N': [(0, 6, 0, 0), (0, 0, 4, 6), (4, 6, 4, 0)],
+    'O': [_A, _B, _C, _D, _E, _F],
+    'P': [(0, 6, 0, 0), _A, _B, _G],
+    'R': [(0, 6, 0, 0), _A, _B, _G, (1.5, 3, 4, 6)],
+    'W': [(0, 0, 1, 6), (1, 6, 2, 2), (2, 2, 3, 6), (3, 6, 4, 0)],
+    'h': [(0, 0, 0, 6), (0, 3, 4, 3), (4, 3, 4, 6)],
+    'k': [(0, 0, 0, 6), (0, 4, 3, 2), (1.2, 3.2, 3, 6)],
+    'm': [(0, 2, 0, 6), (0, 2, 4, 2), (2, 2, 2, 6), (4, 2, 4, 6)],
+}
+
+# Horizontal distance between characters, and stroke width, in grid units.
+ADVANCE = 6
+STROKE = 0.8
+
+# Glyph sets per cap height in pixels, shared by all VectorText objects.
+_glyph_sets = {}
+
+
+class GlyphSet:
+    """Quad meshes of all glyphs, scaled to a cap height and placed at 0,0.
+
+    Args:
+        height (float): Height of capitals in pixels.
+
+    Attributes:
+        meshes (dict): Character to flat x,y vertex data, 4 vertices per quad.
+        advance (float): Distance between characters in pixels.
+    """
+    def __init__(self, height):
+        scale = height / 6
+        half = STROKE * scale / 2
+        self.advance = ADVANCE * scale
+        self.meshes = {}
+        for char, strokes in GLYPHS.items():
+            data = array('f')
+            for x1, y1, x2, y2 in strokes:
+                data.extend(_stroke_quad(x1 * scale, y1 * scale, x2 * scale, y2 * scale, half))
+            self.meshes[char] = data
+
+
+def glyph_set(height):
+    """Return the cached glyph set of a cap height, creating it if needed."""
+    key = round(height, 1)
+    if key not in _glyph_sets:
+        _glyph_sets[key] = GlyphSet(key)
+    return _glyph_sets[key]
+
+
+def _stroke_quad(x1, y1, x2, y2, half):
+    """Quad covering a stroke of width 2 * half, with square ends."""
+    dx = x2 - x1
+    dy = y2 - y1
+    length = (dx * dx + dy * dy) ** 0.5
+    # Dots are strokes of zero length, drawn as squares.
+    if length == 0:
+        dx, dy, length = 1, 0, 1
+    # Unit vector along the stroke and its normal, scaled to half width.
+    ux = dx / length * half
+    uy = dy / length * half
+    nx, ny = -uy, ux
+    x1 -= ux
+    y1 -= uy
+    x2 += ux
+    y2 += uy
+    return (x1 + nx, y1 + ny, x2 + nx, y2 + ny,
+            x2 - nx, y2 - ny, x1 - nx, y1 - ny)
+
+
+class VectorText:
+    """Text drawn with GL quads, as alternative to an ACLabel.
+
+    Drawn as part of the app window's draw list, so text is batched with the
+    other geometry of the same color. Characters without a glyph take up space
+    but are not drawn.
+
+    Each character is placed by copying its glyph mesh from the glyph set of
+    the current size. Placed glyphs are cached per character and slot, so a
+    changed value only swaps the vertex ranges of the characters that changed.
+    Slots count from the aligned side, which keeps units in place for right
+    aligned values.
+
+    Has the methods of ACLabel used by the app, so either can be used.
+
+    Args:
+        text (str): Text to draw.
+        color (tuple): r,g,b,a on a 0-1 scale.
+        alignment (str): "left" or "right" of the position.
+        prefix (str): Prefix before main text.
+        postfix (str): Postfix after main text.
+    """
+    def __init__(self, text=" ", color=Colors.white, alignment='left', prefix="", postfix=""):
+        self.color = color
+        self.alignment = alignment
+        self.prefix = prefix
+        self.postfix = postfix
+        self.dirty = True
+
+        self.text = None
+        self.x = 0
+        self.y = 0
+        self.glyphs = glyph_set(1)
+        self.data = array('f')
+        # Placed glyph meshes by (character, slot).
+        self._placed = {}
+
+        self.set_text(text)
+
+    def fit_box(self, box):
+        """Set position and size to fit in a box of the layout.
+
+        Capitals are half the box height, centered vertically.
+
+        Args:
+            box (obj:Box): Area of the text in pixels, see layout.
+        """
+        self.x = box.x
+        self.y = box.y + box.height / 4
+        self.glyphs = glyph_set(box.height / 2)
+        self._relayout()
+
+    def set_color(self, color):
+        """Set color.
+
+        Args:
+            color (tuple): r,g,b,a on a 0-1 scale.
+        """
+        color = tuple(color)
+        if color != self.color:
+            self.color = color
+            self.dirty = True
+
+    def set_alignment(self, alignment='left'):
+        """Set alignment, "left" or "right" of the position."""
+        if alignment != self.alignment:
+            self.alignment = alignment
+            self._relayout()
+
+    def set_text(self, text):
+        """Set text, making use of set pre/postfixes.
+
+        Args:
+            text (str): Text to draw.
+        """
+        text = self.prefix + text + self.postfix
+        if text == self.text:
+            return
+        self.text = text
+        self._build()
+
+    def _relayout(self):
+        """Drop placed glyphs after position, size or alignment changed."""
+        self._placed = {}
+        if self.text is not None:
+            self._build()
+
+    def _build(self):
+        """Concatenate placed glyph meshes of the text into the vertex data."""
+        n = len(self.text)
+        data = array('f')
+        for i, char in enumerate(self.text):
+            slot = i if self.alignment == 'left' else i - n
+            mesh = self._placed.get((char, slot))
+            if mesh is None:
+                mesh = self._place(char, slot)
+            data.extend(mesh)
+        self.data = data
+        self.dirty = True
+
+    def _place(self, char, slot):
+        """Copy glyph mesh of a character to the screen position of a slot."""
+        glyph = self.glyphs.meshes.get(char)
+        mesh = array('f', glyph) if glyph is not None else array('f')
+        x = self.x + slot * self.glyphs.advance
+        y = self.y
+        for i in range(0, len(mesh), 2):
+            mesh[i] += x
+            mesh[i + 1] += y
+        self._placed[(char, slot)] = mesh
+        return mesh
+
+    def draw_items(self):
+        """ Geometry of the text as (primitive, color, vertex data) tuples. """
+        return [(acsys.GL.Quads, self.color, self.data)]
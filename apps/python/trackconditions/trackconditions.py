@@ -1,35 +1,63 @@
 import ac
+import os
+import sys
+import math
+import time
+
+# The shared memory library depends on ctypes, which is not included in
+# AC's python version. Point to the ctypes module for the platform
+# architecture in the app's dll folder, before the library is imported.
+# A pointer size above 32 bits means a 64 bit python.
+sysdir = os.path.join(os.path.dirname(__file__), 'dll',
+                      'stdlib64' if sys.maxsize > 2 ** 32 else 'stdlib')
+# Python looks in sys.path for modules to load, insert new dir first in line.
+if sysdir not in sys.path:
+    sys.path.insert(0, sysdir)
+    os.environ['PATH'] = os.environ['PATH'] + ";."
 
 from TrackConditionsLib.color_palette import Colors
 from TrackConditionsLib.config_handler import Config
-from TrackConditionsLib.ac_data import Session, Car
-from TrackConditionsLib.drawables import WindIndicator
-from TrackConditionsLib.app_window import AppWindow
-from TrackConditionsLib.ac_label import ACLabel
-from TrackConditionsLib.ac_gl_utils import Point
+from TrackConditionsLib.ac_data import Session, Car, SessionSampler, Grid
+from TrackConditionsLib.drawables import WindModel
+from TrackConditionsLib.app_view import AppView
+from TrackConditionsLib.recorder import ConditionsRecorder
+from TrackConditionsLib.scheduler import Scheduler, SKIP, ON_UPDATE, ON_RENDER
+from TrackConditionsLib.profiler import Profiler
+from TrackConditionsLib.adaptive import RateController
+from TrackConditionsLib.forecast import Forecast
 
 # Initialize general object variables
 cfg = None
 session = None
+wind = None
+recorder = None
+grid = None
+forecast = None
+
+# App windows, all fed by the same session, the main window first
+views = []
 app_window = None
 wind_indicator = None
 
-# Timers
-timer_30_hz = 0
-PERIOD_30_HZ = 1 / 30
-timer_1_hz = 0
-PERIOD_1_HZ = 1
+# Seconds of game time since acMain, summed from acUpdate
+app_time = 0.0
+
+# Whether acUpdate started a frame whose shared render work wasn't done yet
+frame_pending = False
 
-# Text labels
-label_grip_text = None
-label_wind_text = None
-label_road_text = None
-label_air_text = None
+# Periodic tasks, by name for tasks whose rate is configurable
+scheduler = None
+tasks = {}
 
-label_grip_val = None
-label_wind_val = None
-label_road_val = None
-label_air_val = None
+# Adaptive rates of the data tasks
+rates = None
+car_rate = None
+conditions_rate = None
+arrow_frozen = False
+profiler = None
+
+# Conditions update shown by the labels, to skip unchanged ones
+labels_shown = None
 
 def acMain(ac_version):
     """Run upon startup of Assetto Corsa.
@@ -42,54 +70,106 @@ def acMain(ac_version):
     global cfg
     cfg = Config()
 
-    # Initialize session data object
+    # Set up scheduler for periodic tasks
+    global scheduler
+    scheduler = Scheduler()
+
+    # Set up profiler, which only times stages if enabled
+    global profiler
+    profiler = Profiler(os.path.join(cfg.app_dir, "profile.log"), cfg.profiler_enabled)
+
+    # Initialize session data object.
+    # Shared memory can be sampled on a background thread.
     global session
-    session = Session(cfg)
+    sampler = SessionSampler()
+    if cfg.background_sampling:
+        sampler.start(cfg.sampling_rate)
+    session = Session(cfg, sampler)
 
-    # Set up app window
-    global app_window
-    app_window = AppWindow(cfg)
-    ac.addRenderCallback(app_window.id, app_render)
+    # Track relative wind of the whole grid if enabled
+    global grid
+    if cfg.grid_enabled:
+        grid = Grid(cfg, session)
 
-    # Set up wind indicator object and add to list of drawables
-    global wind_indicator
-    wind_indicator = WindIndicator(cfg, session)
-    app_window.add_drawable(wind_indicator)
+    # Start recording session conditions if enabled
+    global recorder
+    if cfg.recorder_enabled:
+        recorder = ConditionsRecorder(
+            os.path.join(cfg.app_dir, "recordings",
+                         time.strftime("%Y%m%d_%H%M%S") + ".tcrec"),
+            flush_interval=cfg.recorder_flush_interval, clock=app_clock)
+
+    # Forecast grip and road temperature if enabled
+    global forecast
+    if cfg.forecast_enabled:
+        forecast = Forecast(cfg, session)
+
+    # Angle of the wind arrow, computed once per frame for all windows
+    global wind
+    wind = WindModel(cfg, session)
 
     # Initialize font
     ac.initFont(0, 'ACRoboto300', 0, 0)
 
-    # Add text labels
-    global label_grip_text, label_wind_text, label_road_text, label_air_text
-    label_grip_text = ACLabel(app_window.id, text="GRIP:")
-    label_wind_text = ACLabel(app_window.id, text="WIND:")
-    label_road_text = ACLabel(app_window.id, text="ROAD:")
-    label_air_text = ACLabel(app_window.id, text="AIR:")
-
-    text_labels_list = [label_grip_text, label_wind_text, label_road_text, label_air_text]
-    for n, label in enumerate(text_labels_list):
-        label.set_custom_font('ACRoboto300')
-        label.fit_height(
-            Point(cfg.app_padding_px,
-                  cfg.app_padding_px + (100 * n * cfg.app_scale)),
-            100 * cfg.app_scale
-        )
-
-    global label_grip_val, label_wind_val, label_road_val, label_air_val
-    label_grip_val = ACLabel(app_window.id, postfix=" %")
-    label_wind_val = ACLabel(app_window.id, postfix=" km/h")
-    label_road_val = ACLabel(app_window.id, postfix=" C")
-    label_air_val = ACLabel(app_window.id, postfix=" C")
-
-    data_labels_list = [label_grip_val, label_wind_val, label_road_val, label_air_val]
-    for n, label in enumerate(data_labels_list):
-        label.set_custom_font('ACRoboto300')
-        label.set_alignment('right')
-        label.fit_height(
-            Point(cfg.app_height * (cfg.app_aspect_ratio - 1 - cfg.app_padding),
-                  cfg.app_padding_px + (100 * n * cfg.app_scale)),
-            100 * cfg.app_scale
-        )
+    # Set up the main window, and the extra windows if enabled.
+    # Each window draws on its own render callback.
+    global app_window, wind_indicator
+    views.append(AppView(cfg, session, wind))
+    ac.addRenderCallback(views[0].window.id, app_render)
+    app_window = views[0].window
+    wind_indicator = views[0].wind_indicator
+    for kind, enabled in (('arrow', cfg.arrow_window), ('strip', cfg.strip_window)):
+        if enabled:
+            view = AppView(cfg, session, wind, kind, "{} {}".format(cfg.app_name, kind.title()))
+            ac.addRenderCallback(view.window.id, render_callback(view))
+            views.append(view)
+
+    # Everything that follows the data is called after each update of it
+    if forecast is not None:
+        session.subscribe('conditions', forecast.update)
+    session.subscribe('car', wind.add_sample)
+
+    # Time the stages of the app, if profiling is enabled
+    profiler.instrument(session, 'update_conditions', 'Session.update_conditions')
+    profiler.instrument(session, 'update_car', 'Session.update_car')
+    profiler.instrument(session.focused_car, 'update', 'Car.update')
+    profiler.instrument(wind, 'update', 'WindModel.update')
+    profiler.instrument(wind_indicator, 'update', 'WindIndicator.update')
+    profiler.instrument(app_window, 'draw', 'AppWindow.draw')
+
+    # Register periodic tasks.
+    # Data is collected on acUpdate, so it continues while the app is hidden.
+    # Anything that only affects what is shown runs on the render callback.
+    # After a stall, tasks run once instead of catching up on missed runs.
+    # The wind arrow is updated every frame instead, see render.
+    tasks['conditions'] = scheduler.add(update_conditions, cfg.data_rate, SKIP, budget=0.002, on=ON_UPDATE)
+    tasks['car'] = scheduler.add(update_car, cfg.data_rate, SKIP, budget=0.001, on=ON_UPDATE)
+
+    # Data task rates follow how fast their data changes,
+    # and drop to an idle rate when the sim is paused or in a replay.
+    global rates, car_rate, conditions_rate
+    rates = RateController(cfg.idle_rate if cfg.adaptive_enabled else cfg.data_rate)
+    conditions_rate = rates.add(tasks['conditions'], CONDITIONS_SIGNALS, cfg.conditions_min_rate, cfg.data_rate)
+    car_rate = rates.add(tasks['car'], CAR_SIGNALS, cfg.car_min_rate, cfg.data_rate)
+    configure_rates()
+
+    # Recording runs at a fixed rate of its own, after the data tasks,
+    # so the number of samples doesn't depend on the adaptive rates.
+    if recorder is not None:
+        tasks['recorder'] = scheduler.add(record_conditions, RECORDER_RATE, SKIP, budget=0.001, on=ON_UPDATE)
+    profiler.add_task(tasks['conditions'], 'conditions')
+    profiler.add_task(tasks['car'], 'car')
+    scheduler.add(profiler.wrap(update_labels, 'labels'), 1, SKIP, budget=0.001, on=ON_RENDER)
+    if grid is not None:
+        profiler.instrument(grid, 'update', 'Grid.update')
+        tasks['grid'] = scheduler.add(grid.update, cfg.grid_rate, SKIP, budget=0.002, on=ON_RENDER)
+        tasks['tailwind'] = scheduler.add(update_tailwind_overlay, cfg.grid_rate, SKIP, budget=0.001, on=ON_RENDER)
+    if profiler.enabled:
+        tasks['profiler'] = scheduler.add(profiler.report, 1 / cfg.profiler_interval, SKIP, on=ON_UPDATE)
+
+    # Pick up config changes made while the game runs, e.g. in Content Manager.
+    cfg.add_listener(apply_config)
+    scheduler.add(cfg.poll, 1, SKIP, on=ON_UPDATE)
 
 def acUpdate(deltaT):
     """Run every physics tick of Assetto Corsa.
@@ -100,11 +180,21 @@ def acUpdate(deltaT):
 
     Important: Function gets called regardless of app being visible.
     """
-    pass
+    global frame_pending, app_time
+    app_time += deltaT
+    check_stale()
+    rates.check()
+    scheduler.tick(ON_UPDATE, deltaT)
+    frame_pending = True
+
+
+def app_clock():
+    """Seconds of game time since the app started, as timestamp of recorded samples."""
+    return app_time
 
 
 def app_render(deltaT):
-    """Run every rendered frame of Assetto Corsa.
+    """Run every rendered frame of Assetto Corsa, for the main window.
 
     Args:
         deltaT (float): Time delta since last tick in seconds.
@@ -112,44 +202,267 @@ def app_render(deltaT):
 
     Important: Function only gets called if the app is visible.
     """
-    global timer_30_hz, timer_1_hz
-    # Update timers
-    timer_30_hz += deltaT
-    timer_1_hz += deltaT
-
-    # Run on 1hz
-    if timer_1_hz > PERIOD_1_HZ:
-        timer_1_hz -= PERIOD_1_HZ
-
-        # Update text labels.
-        # If replay, display empty text labels
-        if session.status == 1:
-            label_grip_val.set_text("-")
-            label_wind_val.set_text("-")
-            label_road_val.set_text("-")
-            label_air_val.set_text("-")
-        else:
-            label_grip_val.set_text("{:.1f}".format(session.track_grip))
-            label_wind_val.set_text("{:.0f}".format(session.wind_speed))
-            label_road_val.set_text("{:.0f}".format(session.road_temp))
-            label_air_val.set_text("{:.0f}".format(session.air_temp))
-
-    # Run on 30hz
-    if timer_30_hz > PERIOD_30_HZ:
-        timer_30_hz -= PERIOD_30_HZ
-
-        # Update AC data
-        session.update()
-
-        # Update WindIndicator model
-        wind_indicator.update()
+    render(views[0], deltaT)
+
+
+def render_callback(view):
+    """Render callback of an extra window, see app_render."""
+    def callback(deltaT):
+        render(view, deltaT)
+    return callback
+
+
+def render(view, deltaT):
+    """Draw a window, after the render work shared by all windows.
+
+    The shared work is done once per frame, by the first window that is drawn.
+    If no window is visible, it isn't done at all.
+
+    Args:
+        view (obj:AppView): Window to draw.
+        deltaT (float): Time delta since last tick in seconds.
+    """
+    global frame_pending, arrow_frozen
+    if frame_pending:
+        frame_pending = False
+        scheduler.tick(ON_RENDER, deltaT)
+
+        # Move wind arrow every frame, in between data samples.
+        # While the sim isn't live the arrow stands still, after one last update.
+        if not (rates.idle and arrow_frozen):
+            update_wind(deltaT)
+            arrow_frozen = rates.idle
 
     # Draw graphics on app window
-    app_window.draw()
+    view.draw(deltaT)
+
+
+# Samples per second of the conditions recorder.
+RECORDER_RATE = 30
+
+# Signals of the data tasks as (change worth a new sample, is angle).
+CONDITIONS_SIGNALS = [
+    (math.radians(1), True),    # Wind direction
+    (0.2, False),               # Wind speed, km/h
+    (0.1, False),               # Air temperature, C
+    (0.1, False),               # Road temperature, C
+    (0.01, False),              # Track grip, %
+]
+CAR_SIGNALS = [
+    (math.radians(1), True),    # Heading
+]
+
+
+def update_conditions(dt):
+    """Update session conditions and everything that collects them.
+
+    Args:
+        dt (float): Time since the previous update in seconds.
+    """
+    global arrow_frozen
+    status = session.status
+    session.update_conditions()
+    if session.status != status:
+        # The arrow is drawn differently in a replay, also while it stands still.
+        arrow_frozen = False
+    session.publish('conditions', dt)
+    # Also after an update without new data, so the rate can relax.
+    observe_conditions(dt)
+
+
+def update_car(dt):
+    """Update focused car data and everything that follows it.
+
+    Args:
+        dt (float): Time since the previous update in seconds.
+    """
+    session.update_car()
+    session.publish('car', dt)
+    observe_car(dt)
+
+
+def observe_conditions(dt):
+    """Adapt the rate of the conditions task to the latest conditions."""
+    conditions_rate.observe(
+        (session.wind_dir, session.wind_speed, session.air_temp,
+         session.road_temp, session.track_grip), dt)
+
+
+def record_conditions(dt):
+    """Record the latest conditions and heading.
+
+    Args:
+        dt (float): Time since the previous sample in seconds.
+    """
+    recorder.record(session)
+
+
+def observe_car(dt):
+    """Adapt the rate of the car task to the latest heading."""
+    car_rate.observe((session.focused_car.heading,), dt)
+
+
+def configure_rates():
+    """Apply adaptive rate settings from config."""
+    rates.idle_rate = cfg.idle_rate if cfg.adaptive_enabled else cfg.data_rate
+    for rate, min_rate in ((conditions_rate, cfg.conditions_min_rate), (car_rate, cfg.car_min_rate)):
+        rate.max_rate = cfg.data_rate
+        # Without adaptive rates, tasks run at the data rate.
+        rate.min_rate = min(min_rate, cfg.data_rate) if cfg.adaptive_enabled else cfg.data_rate
+        # While recording, every sample should be a fresh read.
+        if recorder is not None:
+            rate.min_rate = max(rate.min_rate, min(RECORDER_RATE, cfg.data_rate))
+        rate.set_idle(rates.idle, rates.idle_rate)
+
+
+def update_wind(dt):
+    """Update the wind arrow angle shared by all windows.
+
+    Args:
+        dt (float): Time since the previous update in seconds.
+    """
+    wind.update(dt)
+
+
+def check_stale():
+    """Grey out the display if the data is stale, and idle the data tasks.
+
+    Runs on every acUpdate, so a hidden app goes idle as well.
+    """
+    global arrow_frozen
+    stale = session.age > cfg.stale_after
+    if stale == wind.stale:
+        return
+    # Stale data doesn't need reading at the full rate either.
+    rates.stale = stale
+    wind.stale = stale
+    # Recolor the arrow, also if it stands still.
+    arrow_frozen = False
+    for view in views:
+        view.set_stale(stale)
+
+
+def update_labels(dt):
+    """Update text labels.
+
+    Nothing is formatted if there were no new conditions since the last update.
+
+    Args:
+        dt (float): Time since the previous update in seconds.
+    """
+    global labels_shown
+    shown = session.published['conditions']
+    if shown == labels_shown:
+        return
+    labels_shown = shown
+
+    # If replay, display empty text labels
+    if session.status == 1:
+        texts = ["-"] * 4
+    else:
+        texts = [
+            "{:.1f}".format(session.track_grip),
+            "{:.0f}".format(session.wind_speed),
+            "{:.0f}".format(session.road_temp),
+            "{:.0f}".format(session.air_temp),
+        ]
+    # Text is formatted once and set on the labels of all windows.
+    for view in views:
+        view.set_values(texts)
+
+    if forecast is not None:
+        update_forecast()
+
+
+def update_forecast():
+    """Update the forecast row with the grip and road temperature ahead."""
+    horizons = forecast.horizons()
+    if session.status == 1 or not forecast.ready or not horizons:
+        text = "-"
+    else:
+        parts = []
+        for name, horizon in horizons:
+            grip, road_temp = forecast.predict(horizon)
+            parts.append("{} {:.1f}% {:.0f}C".format(name, grip, road_temp))
+        text = "   ".join(parts)
+    for view in views:
+        view.set_forecast(text)
+
+
+def update_tailwind_overlay(dt):
+    """Update tailwind overlay with the cars of the grid in a tailwind.
+
+    Args:
+        dt (float): Time since the previous update in seconds.
+    """
+    if session.status == 1:
+        set_tailwind("-")
+        return
+    tailwind = grid.tailwind
+    text = "{}/{}".format(len(tailwind), grid.num_cars)
+    names = [ac.getDriverName(car_id) for car_id in tailwind[:cfg.grid_max_names]]
+    if names:
+        text += "  " + ", ".join(names)
+    if len(tailwind) > len(names):
+        text += " +{}".format(len(tailwind) - len(names))
+    set_tailwind(text)
+
+
+def set_tailwind(text):
+    """Set the text of the tailwind overlay of all windows that have one."""
+    for view in views:
+        view.set_tailwind(text)
+
+
+def apply_config(changed):
+    """Apply options that changed in the config file while running.
+
+    Options not handled here take effect after a restart of the game.
+
+    Args:
+        changed (set): Names of changed options.
+    """
+    if changed & {'background_sampling', 'sampling_rate'}:
+        session.sampler.stop()
+        if cfg.background_sampling:
+            session.sampler.start(cfg.sampling_rate)
+
+    if 'grid_rate' in changed and grid is not None:
+        tasks['grid'].set_rate(cfg.grid_rate)
+        tasks['tailwind'].set_rate(cfg.grid_rate)
+
+    if changed & {'data_rate', 'adaptive_enabled', 'idle_rate', 'car_min_rate', 'conditions_min_rate'}:
+        configure_rates()
+
+    if changed & {'smoothing_enabled', 'data_rate', 'heading_smoothing', 'wind_smoothing',
+                  'adaptive_enabled', 'car_min_rate'}:
+        wind.configure_filters()
+
+    if 'forecast_time_constant' in changed and forecast is not None:
+        forecast.configure()
+
+    if 'profiler_interval' in changed and profiler.enabled:
+        tasks['profiler'].set_rate(1 / cfg.profiler_interval)
+
+    # Elements are moved and scaled in place, only those whose box changed.
+    if changed & {'app_height', 'arrow_window_height', 'strip_window_height'}:
+        for view in views:
+            view.layout.update()
 
 
 def acShutdown():
     """Run on shutdown of Assetto Corsa"""
-    # Update config if necessary
+    # Stop background sampling
+    session.sampler.stop()
+
+    # Write remaining recorded conditions to disk
+    if recorder is not None:
+        recorder.close()
+
+    # Write last profiling statistics
+    if profiler.enabled:
+        profiler.report(tasks['profiler'].elapsed)
+
+    # Update config if necessary. Only writes if anything changed.
     if cfg.update_cfg:
         cfg.save()
\ No newline at end of file
@@ -0,0 +1,51 @@
+"""Shared fixtures: the fake `ac` modules of the benchmark harness.
+
+The app modules import `ac` and `acsys` when they are imported, so they are
+imported inside tests, after the fake_ac fixture installed the fakes. The
+fixture removes the fakes and all imported app modules again afterwards,
+so no test sees the state of another.
+"""
+import importlib
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOOLS_DIR = os.path.join(ROOT, "tools")
+if TOOLS_DIR not in sys.path:
+    sys.path.insert(0, TOOLS_DIR)
+from ac_harness import APP_DIR, FakeAC
+
+
+def _drop_app_modules():
+    for name in list(sys.modules):
+        if name == "trackconditions" or name.startswith("TrackConditionsLib"):
+            del sys.modules[name]
+
+
+@pytest.fixture
+def fake_ac():
+    """Install fresh fake `ac` and `acsys` modules for one test."""
+    saved_modules = dict((name, sys.modules.get(name)) for name in ("ac", "acsys"))
+    saved_path = list(sys.path)
+    fake = FakeAC()
+    fake.install()
+    _drop_app_modules()
+    sys.path.insert(0, APP_DIR)
+    yield fake
+    _drop_app_modules()
+    sys.path[:] = saved_path
+    for name, module in saved_modules.items():
+        if module is None:
+            sys.modules.pop(name, None)
+        else:
+            sys.modules[name] = module
+
+
+@pytest.fixture
+def lib(fake_ac):
+    """Import a module of TrackConditionsLib by name, with the fake modules installed."""
+    def import_lib(name):
+        return importlib.import_module("TrackConditionsLib." + name)
+    return import_lib
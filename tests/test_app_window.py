@@ -0,0 +1,61 @@
+"""Updates of drawables in the registry of an app window."""
+import types
+
+import pytest
+
+
+@pytest.fixture
+def app_window(lib):
+    return lib("app_window")
+
+
+@pytest.fixture
+def window(app_window):
+    cfg = types.SimpleNamespace(
+        app_name="test", app_dir=".", app_height=100, app_padding=0.1, app_aspect_ratio=2.35,
+        history_enabled=False, history_aspect=0.6, grid_enabled=False, forecast_enabled=False)
+    return app_window.AppWindow(cfg)
+
+
+class Filter:
+    """Drawable that sums the time passed to its updates."""
+    def __init__(self):
+        self.time = 0.0
+        self.shown = True
+
+    def update(self, dt):
+        self.time += dt
+
+    def draw(self):
+        pass
+
+    def visible(self):
+        return self.shown
+
+
+@pytest.mark.parametrize("rate", ["every_frame", 10])
+def test_culled_drawable_catches_up_when_shown(app_window, window, rate):
+    rate = app_window.EVERY_FRAME if rate == "every_frame" else rate
+    drawable = Filter()
+    window.add_drawable(drawable, rate=rate, visible=drawable.visible)
+    for _ in range(30):
+        window.draw(0.1)
+    drawable.shown = False
+    for _ in range(20):
+        window.draw(0.1)
+    assert drawable.time == pytest.approx(3.0)
+    drawable.shown = True
+    window.draw(0.1)
+    assert drawable.time == pytest.approx(5.1)
+
+
+def test_hidden_drawable_catches_up_when_shown(app_window, window):
+    drawable = Filter()
+    window.add_drawable(drawable, rate=app_window.EVERY_FRAME)
+    window.draw(0.1)
+    window.set_visible(drawable, False)
+    for _ in range(20):
+        window.draw(0.1)
+    window.set_visible(drawable, True)
+    window.draw(0.1)
+    assert drawable.time == pytest.approx(2.2)
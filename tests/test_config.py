@@ -0,0 +1,88 @@
+"""Reloading and saving the config file."""
+import builtins
+import configparser
+import importlib
+import os
+import sys
+
+import pytest
+
+from ac_harness import copy_app
+
+
+@pytest.fixture
+def config_handler(fake_ac):
+    """config_handler imported from a scratch copy of the app.
+
+    Config reads and writes config.ini next to the app, so it runs on a copy.
+    """
+    sys.path.insert(0, copy_app())
+    return importlib.import_module("TrackConditionsLib.config_handler")
+
+
+def edit(cfg, section, option, value):
+    """Change an option in the config file, as Content Manager would."""
+    parser = configparser.ConfigParser()
+    parser.read(cfg.cfg_file_path)
+    parser.set(section, option, value)
+    with open(cfg.cfg_file_path, 'w') as f:
+        parser.write(f)
+    # Make sure the change shows in the modification time.
+    stat = os.stat(cfg.cfg_file_path)
+    os.utime(cfg.cfg_file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+def test_poll_returns_changed_options(config_handler):
+    cfg = config_handler.Config()
+    calls = []
+    cfg.add_listener(calls.append)
+    assert cfg.poll() == set()
+
+    edit(cfg, 'GENERAL', 'app_height', str(cfg.app_height + 50))
+    edit(cfg, 'GRID', 'grid_rate', str(cfg.grid_rate))
+    assert cfg.poll() == {'app_height'}
+    assert cfg.app_height == 150
+    assert calls == [{'app_height'}]
+
+    # Nothing changed since.
+    assert cfg.poll() == set()
+    assert len(calls) == 1
+
+
+def test_save_skips_unchanged_file(config_handler):
+    cfg = config_handler.Config()
+    past = 10 ** 18
+    os.utime(cfg.cfg_file_path, ns=(past, past))
+    cfg.save()
+    assert os.stat(cfg.cfg_file_path).st_mtime_ns == past
+    assert not os.path.exists(cfg.cfg_file_path + ".tmp")
+
+
+def test_failed_save_keeps_old_file(config_handler, monkeypatch):
+    cfg = config_handler.Config()
+    with open(cfg.cfg_file_path) as f:
+        before = f.read()
+
+    class FailingFile:
+        """File that fails halfway through writing."""
+        def __init__(self, path, mode):
+            self.file = builtins.open(path, mode)
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *args):
+            self.file.close()
+
+        def write(self, text):
+            self.file.write(text[:len(text) // 2])
+            raise OSError("Disk full")
+
+    monkeypatch.setattr(config_handler, "open", FailingFile, raising=False)
+    cfg.cfg_parser.set('GENERAL', 'app_height', '300')
+    with pytest.raises(OSError):
+        cfg.save()
+    monkeypatch.undo()
+
+    with open(cfg.cfg_file_path) as f:
+        assert f.read() == before
@@ -0,0 +1,72 @@
+"""Draw order of the batched GL draw list.
+
+Runs against the fake `ac` and `acsys` modules of the benchmark harness.
+
+Usage:
+    python -m pytest tests
+"""
+import pytest
+
+from ac_harness import GL
+
+RED = (1, 0, 0, 1)
+GREEN = (0, 1, 0, 1)
+
+
+class Shape:
+    """Drawable with fixed draw items."""
+    def __init__(self, *items):
+        self.items = items
+
+    def draw_items(self):
+        return self.items
+
+
+class Custom:
+    """Drawable that draws itself."""
+    def draw(self):
+        pass
+
+
+def colors(draw_list):
+    """Color of each compiled GL block, or 'draw' for unmerged drawables."""
+    return [entry if callable(entry) else entry[1] for entry in draw_list.entries]
+
+
+@pytest.fixture
+def DrawList(lib):
+    return lib("draw_list").DrawList
+
+
+def test_interleaved_colors_keep_draw_order(DrawList):
+    draw_list = DrawList()
+    draw_list.compile([
+        Shape((GL.Quads, RED, [0, 0, 1, 0, 1, 1, 0, 1])),
+        Shape((GL.Quads, GREEN, [0, 0, 2, 0, 2, 2, 0, 2])),
+        Shape((GL.Quads, RED, [0, 0, 3, 0, 3, 3, 0, 3])),
+    ])
+    # Red on top of green stays a block of its own after green.
+    assert colors(draw_list) == [RED, GREEN, RED]
+    assert draw_list.entries[2][2] == [(0, 0), (3, 0), (3, 3), (0, 3)]
+
+
+def test_consecutive_items_are_merged(DrawList):
+    draw_list = DrawList()
+    draw_list.compile([
+        Shape((GL.Quads, RED, [0, 0, 1, 0, 1, 1, 0, 1])),
+        Shape((GL.Quads, RED, [0, 0, 2, 0, 2, 2, 0, 2]),
+              (GL.Quads, GREEN, [0, 0, 3, 0, 3, 3, 0, 3])),
+    ])
+    assert colors(draw_list) == [RED, GREEN]
+    assert len(draw_list.entries[0][2]) == 8
+
+
+def test_no_merge_across_unmergeable_drawable(DrawList):
+    custom = Custom()
+    draw_list = DrawList()
+    draw_list.compile([
+        Shape((GL.Quads, RED, [0, 0, 1, 0, 1, 1, 0, 1])),
+        custom,
+        Shape((GL.Quads, RED, [0, 0, 2, 0, 2, 2, 0, 2])),
+    ])
+    assert colors(draw_list) == [RED, custom.draw, RED]
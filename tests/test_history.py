@@ -0,0 +1,94 @@
+"""History graph points and the trend filter of the forecast."""
+import types
+
+import pytest
+
+
+@pytest.fixture
+def drawables(lib):
+    return lib("drawables")
+
+
+@pytest.fixture
+def filters(lib):
+    return lib("filters")
+
+
+def history_cfg(points=10, minutes=1):
+    """Config with the options the history graph and its layout use."""
+    return types.SimpleNamespace(
+        history_points=points, history_minutes=minutes, history_enabled=True,
+        history_aspect=0.6, app_padding=0.1, app_aspect_ratio=2.35, app_height=100,
+        grid_enabled=False, forecast_enabled=False)
+
+
+def values(series):
+    """Values of a history series from oldest to newest."""
+    return list(series.values[series.head:series.head + series.count])
+
+
+def test_series_wraps_oldest_to_newest(drawables):
+    series = drawables.HistorySeries(4, (1, 1, 1, 1), 1)
+    series.set_area(0, 100)
+    for n in range(10):
+        series.append(n)
+        assert values(series) == list(range(max(0, n - 3), n + 1))
+    # Screen coordinates follow the same order, higher values higher up.
+    ys = list(series.visible_ys())
+    assert ys == sorted(ys, reverse=True)
+
+
+def test_series_wrap_follows_trend(drawables, filters):
+    # Points appended from a trend filter come out in the order they went in.
+    trend = filters.TrendFilter(60)
+    series = drawables.HistorySeries(5, (1, 1, 1, 1), 1)
+    expected = []
+    for n in range(12):
+        trend.add(30 + 0.1 * n, 1.0)
+        series.append(trend.level)
+        expected.append(trend.level)
+    assert values(series) == pytest.approx(expected[-5:], abs=1e-4)
+
+
+def test_graph_adds_missed_points_after_long_dt(drawables):
+    session = types.SimpleNamespace(status=2, track_grip=98.0, road_temp=30.0)
+    graph = drawables.HistoryGraph(history_cfg(points=10, minutes=1), session)
+    # One point every 6 seconds.
+    graph.update(6.0)
+    assert graph.grip.count == 1
+
+    # A 20 second stall spans three intervals: three points in one update.
+    session.track_grip = 99.0
+    graph.update(20.0)
+    assert graph.grip.count == 4
+    assert values(graph.grip) == [98.0, 99.0, 99.0, 99.0]
+    assert graph.elapsed == pytest.approx(2.0)
+
+    # The next point is due after the rest of its interval, not on every update.
+    graph.update(1.0)
+    assert graph.grip.count == 4
+    graph.update(3.0)
+    assert graph.grip.count == 5
+
+    # Never more than a full graph of points.
+    graph.update(600.0)
+    assert graph.grip.count == 10
+
+
+def test_trend_filter_fits_a_line(filters):
+    trend = filters.TrendFilter(600)
+    for n in range(1, 3601):
+        trend.add(30 + 0.002 * n, 1.0)
+    assert trend.slope == pytest.approx(0.002)
+    assert trend.level == pytest.approx(30 + 0.002 * 3600)
+    assert trend.predict(100) == pytest.approx(30 + 0.002 * 3700)
+    # Damped, the trend levels off far ahead.
+    assert trend.predict(10 ** 6, 1200) == pytest.approx(trend.level + 0.002 * 1200, rel=1e-3)
+
+
+def test_trend_filter_has_no_slope_from_one_moment(filters):
+    trend = filters.TrendFilter(600)
+    trend.add(30, 0)
+    trend.add(31, 0)
+    assert trend.slope == 0
+    assert trend.level == pytest.approx(30.5)
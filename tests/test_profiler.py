@@ -0,0 +1,31 @@
+"""Profiler reports in game time."""
+import types
+
+import pytest
+
+
+@pytest.fixture
+def profiler_module(lib):
+    return lib("profiler")
+
+
+def test_task_rates_use_game_time(profiler_module, tmp_path):
+    path = str(tmp_path / "profile.log")
+    profiler = profiler_module.Profiler(path, enabled=True)
+    task = types.SimpleNamespace(runs=0, rate=2.0)
+    profiler.add_task(task, 'car')
+
+    # 20 runs in 10 s of game time, however long it took on the wall clock.
+    task.runs = 20
+    profiler.report(10.0)
+    with open(path) as f:
+        report = f.read()
+    assert "last 10 s game time" in report
+    assert "car                       2.00      2.00" in report
+
+    # Without the game time, there is no rate to report.
+    task.runs = 30
+    profiler.report()
+    with open(path) as f:
+        last = f.read().split("\n\n")[-2]
+    assert "runs/s" not in last
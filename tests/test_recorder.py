@@ -0,0 +1,91 @@
+"""Recordings written by ConditionsRecorder load back unchanged."""
+import threading
+import time
+
+import pytest
+
+
+@pytest.fixture
+def recorder_module(lib):
+    return lib("recorder")
+
+
+class Car:
+    heading = 0.0
+
+
+class Session:
+    """Session data with a different value per field and sample."""
+    def __init__(self):
+        self.focused_car = Car()
+        self.set(0)
+
+    def set(self, n):
+        self.status = 2
+        self.wind_dir = n + 0.1
+        self.wind_speed = n + 0.2
+        self.air_temp = n + 0.3
+        self.road_temp = n + 0.4
+        self.track_grip = n + 0.5
+        self.focused_car.heading = n + 0.6
+
+
+def wait_for_flush(recorder, timeout=2.0):
+    """Wake the writer thread and wait until it wrote all recorded samples."""
+    recorder._wake.set()
+    deadline = time.perf_counter() + timeout
+    while recorder.flushed < recorder.written:
+        assert time.perf_counter() < deadline, "writer thread didn't flush"
+        time.sleep(0.001)
+
+
+def test_recording_loads_back_in_order_across_wrap(recorder_module, tmp_path):
+    game_time = [0.0]
+    path = str(tmp_path / "recordings" / "session.tcrec")
+    # Batches of 5 samples in a buffer of 8, so flushes wrap around its end.
+    recorder = recorder_module.ConditionsRecorder(
+        path, capacity=8, flush_interval=60, clock=lambda: game_time[0])
+
+    flush_threads = []
+    flush = recorder.flush
+
+    def tracked_flush():
+        flush_threads.append(threading.current_thread())
+        flush()
+    recorder.flush = tracked_flush
+
+    session = Session()
+    samples = 0
+    for batch in range(5):
+        for n in range(5):
+            samples += 1
+            game_time[0] = samples / 30
+            session.set(samples)
+            recorder.record(session)
+        wait_for_flush(recorder)
+    recorder.close()
+
+    assert recorder.dropped == 0
+    assert flush_threads
+    assert all(thread is recorder._thread for thread in flush_threads)
+
+    fields, data = recorder_module.load_recording(path)
+    assert fields == recorder_module.FIELDS
+    rows = [tuple(data[i:i + len(fields)]) for i in range(0, len(data), len(fields))]
+    assert len(rows) == samples
+    for n, row in enumerate(rows, 1):
+        # Timestamps are the game time of the clock, not wall time.
+        assert row == pytest.approx((n / 30, 2, n + 0.1, n + 0.2, n + 0.3, n + 0.4, n + 0.5, n + 0.6))
+
+
+def test_close_writes_remaining_samples(recorder_module, tmp_path):
+    path = str(tmp_path / "session.tcrec")
+    recorder = recorder_module.ConditionsRecorder(path, capacity=64, flush_interval=60, clock=lambda: 1.0)
+    session = Session()
+    for n in range(3):
+        recorder.record(session)
+    recorder.close()
+    assert not recorder._thread.is_alive()
+    assert recorder.file.closed
+    fields, data = recorder_module.load_recording(path)
+    assert len(data) == 3 * len(fields)
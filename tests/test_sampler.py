@@ -0,0 +1,63 @@
+"""Starting and stopping the background thread of SessionSampler."""
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def ac_data(lib, tmp_path):
+    sim_info = lib("sim_info")
+    sim_info._info = sim_info.SimInfo(sim_info.FileBackend(str(tmp_path)))
+    yield lib("ac_data")
+    sim_info._info.close()
+
+
+def test_thread_slow_to_stop_exits_after_restart(ac_data):
+    sampler = ac_data.SessionSampler()
+    read = sampler.sample
+    busy = threading.Event()
+    release = threading.Event()
+    slow_threads = []
+
+    def slow_sample():
+        # The first thread hangs in its first read until released.
+        if not slow_threads:
+            slow_threads.append(threading.current_thread())
+            busy.set()
+            release.wait(5)
+            return "stale"
+        return read()
+    sampler.sample = slow_sample
+
+    sampler.start(1000)
+    assert busy.wait(2)
+    sampler.stop()
+    old = slow_threads[0]
+    assert old.is_alive()
+
+    sampler.start(1000)
+    release.set()
+    old.join(2)
+    assert not old.is_alive()
+    # The old thread dropped the snapshot it read after being stopped.
+    assert sampler.snapshot != "stale"
+    assert sampler._thread.is_alive()
+    assert [t for t in threading.enumerate() if t.name == "SessionSampler"] == [sampler._thread]
+    sampler.stop()
+
+
+def test_inconsistent_read_keeps_previous_snapshot(ac_data):
+    sampler = ac_data.SessionSampler()
+    previous = sampler.snapshot
+    reader = sampler._graphics_reader
+    read = reader.read
+
+    def torn_read():
+        values = read()
+        reader.consistent = False
+        return values
+    reader.read = torn_read
+    assert sampler.latest() is previous
+
+    reader.read = read
+    assert sampler.latest() is not previous
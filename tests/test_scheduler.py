@@ -0,0 +1,108 @@
+"""Run counts and dispatch of the periodic task scheduler."""
+import sys
+
+import pytest
+
+from ac_harness import load_app
+from shm_writer import PageWriter
+
+
+@pytest.fixture
+def scheduler(lib):
+    return lib("scheduler")
+
+
+def recorder():
+    """Task function that appends the dt of every run to a list."""
+    calls = []
+    return calls, calls.append
+
+
+def test_skip_runs_once_after_long_dt(scheduler):
+    calls, func = recorder()
+    task = scheduler.Task(func, 10, scheduler.SKIP)
+    task.advance(0.55)
+    assert calls == [pytest.approx(0.55)]
+    assert task.runs == 1
+    assert task.skipped == 4
+    # The remainder counts towards the next run.
+    task.advance(0.05)
+    assert task.runs == 2
+
+
+def test_catch_up_runs_missed_runs_up_to_limit(scheduler):
+    calls, func = recorder()
+    task = scheduler.Task(func, 10, scheduler.CATCH_UP, max_catch_up=4)
+    task.advance(0.55)
+    # Four runs of one period now, at most four periods kept as backlog.
+    assert calls == [pytest.approx(0.1)] * 4
+    assert task.skipped == 0
+    task.advance(0.0)
+    assert task.runs == 5
+
+    task = scheduler.Task(func, 10, scheduler.CATCH_UP, max_catch_up=2)
+    task.advance(1.05)
+    assert task.runs == 2
+    assert task.skipped == 6
+    assert task.timer == pytest.approx(0.2)
+
+
+def test_tasks_run_on_their_callback(scheduler):
+    sched = scheduler.Scheduler()
+    update_calls, on_update = recorder()
+    render_calls, on_render = recorder()
+    sched.add(on_update, 10, on=scheduler.ON_UPDATE)
+    sched.add(on_render, 10, on=scheduler.ON_RENDER)
+
+    sched.tick(scheduler.ON_UPDATE, 0.1)
+    assert len(update_calls) == 1
+    assert render_calls == []
+
+    sched.tick(scheduler.ON_RENDER, 0.1)
+    assert len(update_calls) == 1
+    assert len(render_calls) == 1
+
+
+def test_run_next_tick(scheduler):
+    calls, func = recorder()
+    task = scheduler.Task(func, 1)
+    task.advance(0.1)
+    assert calls == []
+    task.run_next_tick()
+    task.advance(0.1)
+    # Runs with the time since its previous run, not a whole period.
+    assert calls == [pytest.approx(0.2)]
+    task.advance(0.1)
+    assert len(calls) == 1
+
+
+def test_hidden_app_only_runs_update_tasks(fake_ac):
+    app = load_app()
+    app.acMain("1.16")
+    render_tasks = app.scheduler.tasks[app.ON_RENDER]
+    for n in range(120):
+        app.acUpdate(1 / 60)
+    assert render_tasks
+    assert all(task.runs == 0 for task in render_tasks)
+    assert app.tasks["car"].runs > 0
+    app.acShutdown()
+
+
+def test_hidden_app_goes_idle_when_data_is_stale(fake_ac):
+    app = load_app()
+    writer = PageWriter(sys.modules["TrackConditionsLib.sim_info"].get_info())
+    writer.write_scenario(fake_ac.scenario, fake_ac.clock())
+    app.acMain("1.16")
+    for n in range(60):
+        fake_ac.clock.advance(1 / 60)
+        writer.write_scenario(fake_ac.scenario, fake_ac.clock())
+        app.acUpdate(1 / 60)
+    assert not app.rates.idle
+
+    # The game stops writing, with no render callbacks to notice it.
+    for n in range(60 * (int(app.cfg.stale_after) + 2)):
+        app.acUpdate(1 / 60)
+    assert app.rates.stale
+    assert app.rates.idle
+    assert app.wind.stale
+    app.acShutdown()
@@ -0,0 +1,125 @@
+"""Field offsets of the shared memory readers, and consistent reads."""
+import ctypes
+import struct
+
+import pytest
+
+from shm_writer import PageWriter
+
+
+@pytest.fixture
+def sim_info(lib):
+    return lib("sim_info")
+
+
+@pytest.fixture
+def info(sim_info, tmp_path):
+    """SimInfo over page files in a temporary folder."""
+    info = sim_info.SimInfo(sim_info.FileBackend(str(tmp_path)))
+    yield info
+    info.close()
+
+
+def numeric_fields(structure):
+    """Names of the int and float fields of a structure, including arrays."""
+    names = []
+    for name, ctype in structure._fields_:
+        while hasattr(ctype, '_length_'):
+            ctype = ctype._type_
+        if getattr(ctype, '_type_', None) in ('i', 'f'):
+            names.append(name)
+    return names
+
+
+def flat(value):
+    """ctypes value as a number or a flat tuple of numbers."""
+    if not hasattr(value, '_length_'):
+        return value
+    items = []
+    for item in value:
+        item = flat(item)
+        items.extend(item if isinstance(item, tuple) else [item])
+    return tuple(items)
+
+
+@pytest.mark.parametrize("page", ["physics", "graphics", "static"])
+def test_field_offsets_match_structure(sim_info, page):
+    structure = sim_info.PAGES[page][0]
+    # A distinct number in every 4 byte word of the page.
+    words = ctypes.sizeof(structure) // 4
+    buffer = bytearray(struct.pack('<{}i'.format(words), *range(1, words + 1)))
+    page_struct = structure.from_buffer(buffer)
+    names = numeric_fields(structure)
+
+    expected = tuple(flat(getattr(page_struct, name)) for name in names)
+    view = memoryview(buffer)
+    # All fields in one read, in reverse order to also check the reordering.
+    reader = sim_info.FieldReader(structure, view, list(reversed(names)))
+    assert reader.read() == tuple(reversed(expected))
+    # Every field on its own, which only pads up to its offset.
+    for name, value in zip(names, expected):
+        assert sim_info.FieldReader(structure, view, [name]).read() == (value,)
+    view.release()
+    del page_struct
+
+
+class WriteDuringRead:
+    """Struct of a reader that lets the writer write right after unpacking.
+
+    As if the game wrote the page while the app was reading it.
+
+    Args:
+        fmt (struct.Struct): Struct of the reader.
+        write (callable): Called after an unpack.
+        times (int): Number of unpacks followed by a write.
+    """
+    def __init__(self, fmt, write, times=1):
+        self.fmt = fmt
+        self.write = write
+        self.times = times
+
+    def unpack_from(self, buffer, offset=0):
+        values = self.fmt.unpack_from(buffer, offset)
+        if self.times > 0:
+            self.times -= 1
+            self.write()
+        return values
+
+
+def test_snapshot_reader_retries_write_during_read(info):
+    writer = PageWriter(info)
+    writer.set('physics', 'airTemp', 20.0)
+    writer.set('physics', 'roadTemp', 30.0)
+    writer.publish()
+
+    def write():
+        # The game writes the fields, then bumps packetId.
+        writer.set('physics', 'airTemp', 21.0)
+        writer.set('physics', 'roadTemp', 31.0)
+        writer.publish()
+
+    reader = info.reader('physics', ['airTemp', 'roadTemp'], coherent=True)
+    reader.struct = WriteDuringRead(reader.struct, write)
+    assert reader.read() == (2, 21.0, 31.0)
+    assert reader.retries == 1
+    assert reader.consistent
+    assert reader.exhausted == 0
+
+def test_snapshot_reader_flags_exhausted_attempts(info):
+    writer = PageWriter(info)
+    writer.publish()
+
+    def write():
+        writer.set('physics', 'airTemp', writer.packet_id)
+        writer.publish()
+
+    reader = info.reader('physics', ['airTemp'], coherent=True)
+    reader.struct = WriteDuringRead(reader.struct, write, times=reader.attempts)
+    reader.read()
+    assert reader.retries == reader.attempts
+    assert not reader.consistent
+    assert reader.exhausted == 1
+
+    # The next read is consistent again.
+    assert reader.read() == (writer.packet_id, writer.packet_id - 1)
+    assert reader.consistent
@@ -0,0 +1,47 @@
+"""The shared wind arrow through changes of the sim status."""
+import sys
+
+from ac_harness import load_app
+from shm_writer import PageWriter
+
+LIVE = 2
+REPLAY = 1
+
+
+def run_frames(fake, app, writer, seconds, fps=60):
+    """Write the scenario into shared memory and run the app, frame by frame."""
+    renders = list(fake.render_callbacks.values())
+    for _ in range(int(seconds * fps)):
+        fake.clock.advance(1 / fps)
+        writer.write_scenario(fake.scenario, fake.clock())
+        app.acUpdate(1 / fps)
+        for render in renders:
+            render(1 / fps)
+
+
+def test_arrow_follows_live_replay_live(fake_ac):
+    # Live for 5 seconds, then a replay of 5 seconds, then live again.
+    fake_ac.scenario.status = lambda t: REPLAY if 5 <= t < 10 else LIVE
+    app = load_app()
+    colors = sys.modules["TrackConditionsLib.color_palette"].Colors
+    writer = PageWriter(sys.modules["TrackConditionsLib.sim_info"].get_info())
+    writer.write_scenario(fake_ac.scenario, fake_ac.clock())
+    app.acMain("1.16")
+
+    run_frames(fake_ac, app, writer, 4.9)
+    assert app.session.status == LIVE
+    assert app.wind.color != colors.grey
+
+    # In a replay the arrow is grey and straight up, though the sim is idle.
+    run_frames(fake_ac, app, writer, 5)
+    assert app.rates.idle
+    assert app.session.status == REPLAY
+    assert app.wind.angle == 0
+    assert app.wind.color == colors.grey
+
+    run_frames(fake_ac, app, writer, 5)
+    assert not app.rates.idle
+    assert app.session.status == LIVE
+    assert app.wind.color != colors.grey
+    assert app.wind.angle != 0
+    app.acShutdown()
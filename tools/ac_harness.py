@@ -0,0 +1,309 @@
+"""Headless stand-in for the Assetto Corsa python API.
+
+Provides fake `ac` and `acsys` modules that record every call made by the app
+and return scripted values for the data getters. This makes it possible to
+import and drive trackconditions.py on plain CPython, outside of the game.
+
+Typical use:
+
+    fake = FakeAC()
+    fake.install()
+    app = load_app()
+    app.acMain("1.16")
+    app.acUpdate(1 / 60)
+    app.app_render(1 / 60)
+    app.acShutdown()
+"""
+import atexit
+import configparser
+import importlib
+import math
+import os
+import shutil
+import sys
+import tempfile
+import types
+from collections import Counter
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_DIR = os.path.join(REPO_DIR, "apps", "python", "trackconditions")
+
+
+class SimClock:
+    """Deterministic simulation clock.
+
+    The clock only advances when told to, so a run of the harness is fully
+    reproducible regardless of how fast the host machine is.
+
+    Args:
+        t (float): Start time in seconds.
+    """
+    def __init__(self, t=0.0):
+        self.t = t
+
+    def advance(self, dt):
+        """Advance the clock by dt seconds."""
+        self.t += dt
+
+    def __call__(self):
+        return self.t
+
+
+class Scenario:
+    """Scripted values returned by the fake data getters.
+
+    Every attribute is a function of simulation time in seconds.
+    Override any of them to script a different situation.
+
+    Attributes:
+        wind_direction (callable): Wind direction in compass degrees.
+        wind_speed (callable): Wind speed in km/h.
+        focused_car (callable): ID of the focused car.
+        status (callable): Sim status (0: OFF, 1: REPLAY, 2: LIVE, 3: PAUSE).
+        air_temp (callable): Ambient temperature in degrees Celsius.
+        road_temp (callable): Track temperature in degrees Celsius.
+        surface_grip (callable): Track grip, 0 to 1.
+        heading (callable): Heading of a car, in radians,
+            called as heading(t, car_id).
+        position (callable): World position (x, y, z) of a car,
+            called as position(t, car_id).
+        num_cars (callable): Number of cars in the session.
+        session_time_left (callable): Seconds left in the session.
+        lap_time (callable): Last lap time in seconds, 0 before the first lap.
+    """
+    # Distance between the front tyre contact points in meters.
+    track_width = 1.6
+
+    def __init__(self):
+        self.wind_direction = lambda t: (200 + 30 * math.sin(t / 120)) % 360
+        self.wind_speed = lambda t: 12 + 4 * math.sin(t / 45)
+        self.focused_car = lambda t: 0
+        self.status = lambda t: 2
+        # Slowly warming up session with a rubbering-in track.
+        self.air_temp = lambda t: 22 + 3 * (1 - math.exp(-t / 3600))
+        self.road_temp = lambda t: 30 + 8 * (1 - math.exp(-t / 2400))
+        self.surface_grip = lambda t: 0.94 + 0.05 * (1 - math.exp(-t / 1800))
+        # Car lapping a circle once every 90 seconds.
+        self.heading = lambda t, car_id: (2 * math.pi * t / 90 + car_id) % (2 * math.pi)
+        self.position = lambda t, car_id: (
+            500 * math.sin(2 * math.pi * t / 90 + car_id), 0.0,
+            -500 * math.cos(2 * math.pi * t / 90 + car_id))
+        self.num_cars = lambda t: 1
+        # Two hour session.
+        self.session_time_left = lambda t: max(7200 - t, 0)
+        self.lap_time = lambda t: 90 if t >= 90 else 0
+
+    def tyre_contact_point(self, t, car_id, wheel):
+        """World coordinates (x, y, z) of a tyre contact point.
+
+        Front contact points are placed so that Car.update recovers the
+        scripted heading. Rear wheels share the front axle position.
+        """
+        heading = self.heading(t, car_id)
+        x, y, z = self.position(t, car_id)
+        # Front axle runs from FL to FR, perpendicular to the heading.
+        half_x = 0.5 * self.track_width * math.cos(heading)
+        half_z = 0.5 * self.track_width * math.sin(heading)
+        if wheel in (WHEELS.FL, WHEELS.RL):
+            return (x - half_x, y, z - half_z)
+        return (x + half_x, y, z + half_z)
+
+
+class GL:
+    Lines = 0
+    LineStrip = 1
+    Triangles = 2
+    Quads = 3
+
+
+class CS:
+    LapTime = 1
+    Velocity = 6
+    WorldPosition = 25
+    TyreContactPoint = 35
+    TyreContactNormal = 36
+    TyreHeadingVector = 37
+
+
+class WHEELS:
+    FL = 0
+    FR = 1
+    RL = 2
+    RR = 3
+
+
+class FakeAC:
+    """Fake `ac` module which records calls and returns scripted values.
+
+    Args:
+        scenario (obj:Scenario): Scripted data values. Optional.
+        clock (obj:SimClock): Clock the scripted values are evaluated at. Optional.
+
+    Attributes:
+        calls (Counter): Number of calls per `ac` function name.
+        render_callbacks (dict): Window id to registered render callback.
+    """
+    def __init__(self, scenario=None, clock=None):
+        self.scenario = scenario if scenario is not None else Scenario()
+        self.clock = clock if clock is not None else SimClock()
+        self.calls = Counter()
+        self.render_callbacks = {}
+        self._next_id = 0
+
+        self.ac = _RecordingModule("ac", self)
+        self.acsys = types.ModuleType("acsys")
+        self.acsys.GL = GL
+        self.acsys.CS = CS
+        self.acsys.WHEELS = WHEELS
+
+        # Functions with a meaningful return value.
+        # Any other ac function is recorded and returns 0.
+        self.ac.newApp = self._new_id("newApp")
+        self.ac.addLabel = self._new_id("addLabel")
+        self.ac.addRenderCallback = self._add_render_callback
+        self.ac.getWindDirection = self._scripted("getWindDirection", self.scenario, "wind_direction")
+        self.ac.getWindSpeed = self._scripted("getWindSpeed", self.scenario, "wind_speed")
+        self.ac.getFocusedCar = self._scripted("getFocusedCar", self.scenario, "focused_car")
+        self.ac.getCarState = self._get_car_state
+        self.ac.getCarsCount = self._scripted("getCarsCount", self.scenario, "num_cars")
+        self.ac.getDriverName = self._get_driver_name
+
+    def install(self):
+        """Register the fake modules in sys.modules."""
+        sys.modules["ac"] = self.ac
+        sys.modules["acsys"] = self.acsys
+
+    def reset_calls(self):
+        """Clear the recorded call counters."""
+        self.calls.clear()
+
+    def _new_id(self, name):
+        def new_id(*args):
+            self.calls[name] += 1
+            self._next_id += 1
+            return self._next_id
+        return new_id
+
+    def _add_render_callback(self, window_id, callback):
+        self.calls["addRenderCallback"] += 1
+        self.render_callbacks[window_id] = callback
+        return 1
+
+    def _scripted(self, name, scenario, attr):
+        def scripted(*args):
+            self.calls[name] += 1
+            return getattr(scenario, attr)(self.clock())
+        return scripted
+
+    def _get_car_state(self, car_id, info, optional=None):
+        self.calls["getCarState"] += 1
+        if info == CS.TyreContactPoint:
+            return self.scenario.tyre_contact_point(self.clock(), car_id, optional)
+        if info == CS.WorldPosition:
+            return self.scenario.position(self.clock(), car_id)
+        return 0
+
+
+    def _get_driver_name(self, car_id):
+        self.calls["getDriverName"] += 1
+        return "Driver {}".format(car_id)
+
+
+class _RecordingModule(types.ModuleType):
+    """Module whose unknown attributes are recording no-op functions."""
+    def __init__(self, name, fake):
+        super().__init__(name)
+        self._fake = fake
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        calls = self._fake.calls
+
+        def record(*args):
+            calls[name] += 1
+            return 0
+        # Cache on the module so later lookups are plain attribute access.
+        setattr(self, name, record)
+        return record
+
+
+def copy_app(app_dir=None, config=None):
+    """Copy the app folder to a scratch folder, removed at exit.
+
+    Args:
+        app_dir (str): Folder to copy the app from. Defaults to the app in this repo.
+        config (dict): Config options to write to config.ini of the copy,
+            as {section: {option: value}}. Optional.
+
+    Returns:
+        str: Folder of the copy.
+    """
+    src = app_dir if app_dir is not None else APP_DIR
+    scratch = tempfile.mkdtemp(prefix="trackconditions_")
+    atexit.register(shutil.rmtree, scratch, True)
+    dst = os.path.join(scratch, "trackconditions")
+    shutil.copytree(src, dst, ignore=shutil.ignore_patterns("__pycache__", "config.ini", "dll", "recordings"))
+    if config:
+        parser = configparser.ConfigParser()
+        parser.read_dict(config)
+        with open(os.path.join(dst, "config.ini"), "w") as f:
+            parser.write(f)
+    return dst
+
+
+def import_app(dst):
+    """Import trackconditions.py from a copy of the app folder, see copy_app.
+
+    Returns:
+        module: The imported trackconditions module.
+    """
+    if "ac" not in sys.modules:
+        raise RuntimeError("Install the fake ac modules before loading the app.")
+    # Drop any previously imported copy of the app.
+    for name in list(sys.modules):
+        if name == "trackconditions" or name.startswith("TrackConditionsLib"):
+            del sys.modules[name]
+    sys.path.insert(0, dst)
+    return importlib.import_module("trackconditions")
+
+
+def load_app(app_dir=None, config=None):
+    """Import trackconditions.py from a scratch copy of the app folder.
+
+    The app writes config.ini next to itself, so it is run from a
+    temporary copy to keep the source tree clean.
+
+    Args:
+        app_dir (str): Folder to copy the app from. Defaults to the app in this repo.
+        config (dict): Config options to write to config.ini of the copy,
+            as {section: {option: value}}. Optional.
+
+    Returns:
+        module: The imported trackconditions module.
+    """
+    if "ac" not in sys.modules:
+        raise RuntimeError("Install the fake ac modules before loading the app.")
+    return import_app(copy_app(app_dir, config))
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = int(math.ceil(pct / 100 * len(sorted_values))) - 1
+    return sorted_values[min(max(rank, 0), len(sorted_values) - 1)]
+
+
+def latency_summary(samples):
+    """Summarize a list of latencies in seconds.
+
+    Returns:
+        dict: mean, p50, p90, p99, p99.9 and max, in microseconds.
+    """
+    values = sorted(samples)
+    summary = {"mean": 1e6 * sum(values) / max(len(values), 1)}
+    for pct in (50, 90, 99, 99.9):
+        summary["p{:g}".format(pct)] = 1e6 * percentile(values, pct)
+    summary["max"] = 1e6 * (values[-1] if values else 0.0)
+    return summary
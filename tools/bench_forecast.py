@@ -0,0 +1,106 @@
+"""Cost and accuracy of the grip and road temperature forecast over a long session.
+
+Drives the app with the forecast enabled through a scripted session of some
+hours, in which the track warms up and rubbers in. Every update of the
+forecast is timed, and once a minute its forecasts are compared with the
+scripted values at the end of the session and a number of laps ahead.
+Reports per hour of session: the number of updates, the cost per update and
+the mean forecast error, so a growing cost over time would show up directly.
+
+Usage:
+    python tools/bench_forecast.py --hours 4 --fps 10
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from ac_harness import FakeAC, load_app
+from shm_writer import PageWriter
+
+
+def timed(function, times):
+    """Wrap a function, appending the seconds each call takes to a list."""
+    perf_counter = time.perf_counter
+
+    def wrapper(*args):
+        start = perf_counter()
+        result = function(*args)
+        times.append(perf_counter() - start)
+        return result
+    return wrapper
+
+
+def run(hours, fps, laps):
+    """Run the app through a session and collect forecast cost and errors.
+
+    Returns:
+        list: Per hour a dict with the update times in seconds and the
+            absolute errors per horizon name, as {name: (grip errors, road errors)}.
+    """
+    fake = FakeAC()
+    scenario = fake.scenario
+    length = hours * 3600
+    scenario.session_time_left = lambda t: max(length - t, 0)
+    fake.install()
+    app = load_app(config={"FORECAST": {
+        "forecast_enabled": "True", "forecast_laps": str(laps)}})
+    writer = PageWriter(sys.modules["TrackConditionsLib.sim_info"].get_info())
+    writer.write_scenario(scenario, 0.0)
+    app.acMain("1.16")
+
+    results = [{"times": [], "errors": {}} for n in range(int(hours))]
+    subscribers = app.session.subscribers['conditions']
+    index = subscribers.index(app.forecast.update)
+
+    period = 1 / fps
+    frames = int(length * fps)
+    next_check = 60.0
+    for n in range(frames):
+        fake.clock.advance(period)
+        t = fake.clock()
+        result = results[min(int(t // 3600), len(results) - 1)]
+        subscribers[index] = timed(app.forecast.update, result["times"])
+        writer.write_scenario(scenario, t)
+        app.acUpdate(period)
+        app.app_render(period)
+
+        if t < next_check:
+            continue
+        next_check += 60
+        if not app.forecast.ready:
+            continue
+        for name, horizon in app.forecast.horizons():
+            grip, road_temp = app.forecast.predict(horizon)
+            grip_errors, road_errors = result["errors"].setdefault(name, ([], []))
+            grip_errors.append(abs(grip - 100 * scenario.surface_grip(t + horizon)))
+            road_errors.append(abs(road_temp - scenario.road_temp(t + horizon)))
+    app.acShutdown()
+    return results
+
+
+def mean(values):
+    return sum(values) / len(values) if values else float("nan")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hours", type=int, default=4, help="Session length in hours.")
+    parser.add_argument("--fps", type=float, default=10, help="Simulated frame rate.")
+    parser.add_argument("--laps", type=int, default=5, help="Laps ahead to forecast.")
+    args = parser.parse_args(argv)
+
+    results = run(args.hours, args.fps, args.laps)
+    print("{:>4} {:>8} {:>8} {:>8}   {:>8} {:>12} {:>12}".format(
+        "hour", "updates", "mean us", "max us", "horizon", "grip err %", "road err C"))
+    for hour, result in enumerate(results):
+        times = result["times"]
+        for name, (grip_errors, road_errors) in sorted(result["errors"].items()) or [("-", ([], []))]:
+            print("{:>4} {:>8} {:>8.2f} {:>8.1f}   {:>8} {:>12.3f} {:>12.2f}".format(
+                hour, len(times), 1e6 * mean(times), 1e6 * max(times), name,
+                mean(grip_errors), mean(road_errors)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Benchmark of the field-wide relative wind update on synthetic grids.
+
+Times Grid.update for grids of 1 to 100 cars, against updating one Car
+object per car and calculating its relative wind separately. Car positions
+and headings come from the harness scenario, with each car at its own point
+of the lap.
+
+Contact points are looked up from a precomputed table instead of evaluating
+the scenario on every ac.getCarState call, so the timings show the cost on the
+app side rather than that of the python fake. The cost of the calls into the
+game itself comes on top, two calls per car other than the player car.
+
+Usage:
+    python tools/bench_grid.py --updates 200 --rate 2 --fps 60
+"""
+import argparse
+import math
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from ac_harness import FakeAC, load_app
+from shm_writer import PageWriter
+
+SIZES = (1, 2, 5, 10, 20, 30, 50, 100)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--updates", type=int, default=200, help="Updates per measurement.")
+    parser.add_argument("--rate", type=float, default=2, help="Grid updates per second, as grid_rate.")
+    parser.add_argument("--fps", type=float, default=60, help="Render rate to spread the cost over.")
+    args = parser.parse_args(argv)
+
+    fake = FakeAC()
+    fake.install()
+    load_app(config={"GRID": {"grid_enabled": "True"}})
+    ac_data = sys.modules["TrackConditionsLib.ac_data"]
+    writer = PageWriter(sys.modules["TrackConditionsLib.sim_info"].get_info())
+    cfg = sys.modules["TrackConditionsLib.config_handler"].Config()
+    session = ac_data.Session(cfg)
+    fake.clock.advance(10.0)
+
+    print("{:>5} {:>12} {:>12} {:>9} {:>10} {:>13}".format(
+        "cars", "grid us", "per car us", "speedup", "tailwind", "us per frame"))
+    for n in SIZES:
+        fake.scenario.num_cars = lambda t, n=n: n
+        writer.write_scenario(fake.scenario, fake.clock())
+        session.update()
+        table = dict(
+            ((car_id, wheel), fake.scenario.tyre_contact_point(fake.clock(), car_id, wheel))
+            for car_id in range(n) for wheel in range(4))
+        fake.ac.getCarState = lambda car_id, info, wheel=None: table[car_id, wheel]
+        grid = ac_data.Grid(cfg, session)
+        cars = [ac_data.Car(cfg, car_id) for car_id in range(n)]
+
+        def per_car():
+            threshold = math.cos(math.radians(cfg.grid_tailwind_angle))
+            tailwind = []
+            for car in cars:
+                car.update()
+                if math.cos(session.wind_dir - car.heading) > threshold:
+                    tailwind.append(car.id)
+            return tailwind
+
+        t_grid = min(timeit.repeat(grid.update, number=args.updates, repeat=3)) / args.updates
+        t_cars = min(timeit.repeat(per_car, number=args.updates, repeat=3)) / args.updates
+        assert grid.tailwind == per_car(), "Grid and per car results disagree"
+        print("{:>5} {:>12.1f} {:>12.1f} {:>8.2f}x {:>10} {:>13.2f}".format(
+            n, 1e6 * t_grid, 1e6 * t_cars, t_cars / t_grid, len(grid.tailwind),
+            1e6 * t_grid * args.rate / args.fps))
+
+
+if __name__ == "__main__":
+    main()
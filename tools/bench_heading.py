@@ -0,0 +1,70 @@
+"""Benchmark and accuracy check of the car heading sources.
+
+Compares the two sources of front tyre contact points used by Car.update:
+one read of the physics shared memory page, and two ac.getCarState calls.
+Reports the cost per heading and the heading error of each source against
+the scripted heading, over a lap of the harness scenario.
+
+Shared memory holds 32-bit floats, so contact points far from the world
+origin lose precision. Use --offset to move the lap away from the origin,
+as on large tracks.
+
+Usage:
+    python tools/bench_heading.py --samples 2000 --offset 5000
+"""
+import argparse
+import math
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from ac_harness import FakeAC, Scenario, load_app
+from shm_writer import PageWriter
+
+
+def angle_error(a, b):
+    """Absolute difference between two angles in radians."""
+    return abs((a - b + math.pi) % (2 * math.pi) - math.pi)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", type=int, default=2000, help="Headings compared over a lap.")
+    parser.add_argument("--reads", type=int, default=100000, help="Reads per timing measurement.")
+    parser.add_argument("--offset", type=float, default=0.0, help="Meters to move the lap along x and z.")
+    args = parser.parse_args(argv)
+
+    scenario = Scenario()
+    circle = scenario.position
+    scenario.position = lambda t, car_id: tuple(
+        v + args.offset if i != 1 else v for i, v in enumerate(circle(t, car_id)))
+    fake = FakeAC(scenario)
+    fake.install()
+    load_app()
+    ac_data = sys.modules["TrackConditionsLib.ac_data"]
+    writer = PageWriter(sys.modules["TrackConditionsLib.sim_info"].get_info())
+    car = ac_data.Car(None, 0)
+    heading = ac_data.heading_from_front_axle
+
+    sources = (
+        ("shared memory", car.front_contact_points_shared_memory),
+        ("ac module", car.front_contact_points_api),
+    )
+    writer.write_scenario(scenario, 10.0)
+    print("{:>14} {:>10} {:>14} {:>14}".format("source", "us/read", "mean err deg", "max err deg"))
+    for name, read in sources:
+        cost = min(timeit.repeat(lambda: heading(*read()), number=args.reads, repeat=3)) / args.reads
+
+        errors = []
+        for i in range(args.samples):
+            t = 90.0 * i / args.samples
+            fake.clock.t = t
+            writer.write_scenario(scenario, t)
+            errors.append(angle_error(heading(*read()), scenario.heading(t, 0)))
+        print("{:>14} {:>10.3f} {:>14.2e} {:>14.2e}".format(
+            name, 1e6 * cost, math.degrees(sum(errors) / len(errors)), math.degrees(max(errors))))
+
+
+if __name__ == "__main__":
+    main()
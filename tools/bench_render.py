@@ -0,0 +1,126 @@
+"""Frame-time benchmark for the trackconditions render callback.
+
+Runs acMain, a number of frames and acShutdown against the fake `ac` module
+on a deterministic clock, and reports per-frame latency. A frame is an
+acUpdate(deltaT) call followed by the render callbacks of all app windows,
+or only acUpdate when the app is hidden.
+Shared memory is filled from the same scripted scenario before every frame.
+
+Usage:
+    python tools/bench_render.py --frames 20000 --fps 60
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from ac_harness import FakeAC, load_app, latency_summary
+from shm_writer import PageWriter
+
+
+def run(frames, fps, jitter=0.0, seed=0, warmup=100, config=None, hidden=False, status=None, frozen=False):
+    """Drive the app for a number of frames.
+
+    Args:
+        frames (int): Number of measured frames.
+        fps (float): Simulated render rate.
+        jitter (float): Relative random variation of deltaT, 0 for a fixed rate.
+        seed (int): Seed for the deltaT jitter.
+        warmup (int): Unmeasured frames rendered before measuring.
+        config (dict): Config overrides, see ac_harness.load_app.
+        hidden (bool): Simulate a hidden app, without render callbacks.
+        status (int): Fixed sim status, e.g. 3 for paused. Optional.
+        frozen (bool): Stop writing shared memory after the warmup,
+            as if the game stopped.
+
+    Returns:
+        tuple: (latencies in seconds, FakeAC instance, app module)
+    """
+    fake = FakeAC()
+    if status is not None:
+        fake.scenario.status = lambda t: status
+    fake.install()
+    app = load_app(config=config)
+    # Shared memory is filled from the same scenario as the ac functions.
+    writer = PageWriter(sys.modules["TrackConditionsLib.sim_info"].get_info())
+    writer.write_scenario(fake.scenario, fake.clock())
+    app.acMain("1.16")
+
+    rng = random.Random(seed)
+    period = 1 / fps
+    perf_counter = time.perf_counter
+    update = app.acUpdate
+    renders = list(fake.render_callbacks.values())
+    latencies = []
+
+    for n in range(warmup + frames):
+        if n == warmup:
+            fake.reset_calls()
+            sys.modules["TrackConditionsLib.api_stats"].reset()
+        dt = period * (1 + jitter * (2 * rng.random() - 1))
+        fake.clock.advance(dt)
+        if not (frozen and n >= warmup):
+            writer.write_scenario(fake.scenario, fake.clock())
+        start = perf_counter()
+        update(dt)
+        if not hidden:
+            for render in renders:
+                render(dt)
+        end = perf_counter()
+        if n >= warmup:
+            latencies.append(end - start)
+
+    app.acShutdown()
+    return latencies, fake, app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=20000, help="Number of measured frames.")
+    parser.add_argument("--fps", type=float, default=60, help="Simulated render rate.")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Relative deltaT jitter, e.g. 0.1.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the deltaT jitter.")
+    parser.add_argument("--calls", action="store_true", help="Also print ac calls per frame.")
+    parser.add_argument("--record", action="store_true", help="Enable the conditions recorder.")
+    parser.add_argument("--hidden", action="store_true", help="Simulate a hidden app.")
+    parser.add_argument("--status", type=int, default=None, help="Fixed sim status, 1 replay, 3 paused.")
+    parser.add_argument("--windows", action="store_true", help="Enable the wind arrow window and numbers strip.")
+    parser.add_argument("--frozen", action="store_true", help="Stop writing shared memory after the warmup.")
+    args = parser.parse_args(argv)
+
+    config = {}
+    if args.record:
+        config["RECORDER"] = {"recorder_enabled": "True"}
+    if args.windows:
+        config["WINDOWS"] = {"arrow_window": "True", "strip_window": "True"}
+    latencies, fake, app = run(args.frames, args.fps, args.jitter, args.seed,
+                               config=config, hidden=args.hidden, status=args.status, frozen=args.frozen)
+    summary = latency_summary(latencies)
+    print("{} frames at {:g} fps".format(len(latencies), args.fps))
+    for key, value in summary.items():
+        print("  {:>6}: {:8.2f} us".format(key, value))
+
+    if args.calls:
+        print("ac calls per frame:")
+        for name, count in sorted(fake.calls.items()):
+            print("  {:>22}: {:8.3f}".format(name, count / len(latencies)))
+        api_stats = sys.modules["TrackConditionsLib.api_stats"]
+        print("skipped ac calls per frame:")
+        for name, count in sorted(api_stats.skipped.items()):
+            print("  {:>22}: {:8.3f}".format(name, count / len(latencies)))
+        if app.recorder is not None:
+            print("recorder: {} written, {} flushed, {} dropped".format(
+                app.recorder.written, app.recorder.flushed, app.recorder.dropped))
+        seconds = len(latencies) / args.fps
+        print("task runs per second:")
+        for name, task in sorted(app.tasks.items()):
+            print("  {:>22}: {:8.2f}".format(name, task.runs / seconds))
+        cache = app.wind_indicator.mesh_cache
+        print("wind mesh cache: {} hits, {} misses, {} cached".format(
+            cache.hits, cache.misses, len(cache)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Benchmark of shared memory reads: ctypes attribute access vs FieldReader.
+
+Reads increasing numbers of numeric SPageFilePhysics fields both ways and
+reports the cost per read.
+
+Usage:
+    python tools/bench_sim_info.py --reads 100000
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from ac_harness import APP_DIR
+
+sys.path.insert(0, APP_DIR)
+from TrackConditionsLib import sim_info
+
+
+def scalar_fields(structure):
+    """Names of all scalar int and float fields of a structure."""
+    return [name for name, ctype in structure._fields_
+            if getattr(ctype, '_type_', None) in ('i', 'f')]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reads", type=int, default=100000, help="Reads per measurement.")
+    args = parser.parse_args(argv)
+
+    info = sim_info.SimInfo()
+    physics = info.physics
+    fields = scalar_fields(sim_info.SPageFilePhysics)
+
+    print("{:>7} {:>12} {:>12} {:>8}".format("fields", "ctypes us", "reader us", "speedup"))
+    for n in (1, 2, 4, 8, 16, len(fields)):
+        names = fields[:n]
+        # Same shape of code as the app: one attribute access per field.
+        attrs = ", ".join("physics." + name for name in names)
+        ctypes_read = eval("lambda: ({},)".format(attrs), {"physics": physics})
+        reader = info.reader('physics', names)
+
+        t_ctypes = min(timeit.repeat(ctypes_read, number=args.reads, repeat=3)) / args.reads
+        t_reader = min(timeit.repeat(reader.read, number=args.reads, repeat=3)) / args.reads
+        assert reader.read() == ctypes_read(), "Reader and ctypes disagree"
+        print("{:>7} {:>12.3f} {:>12.3f} {:>7.2f}x".format(
+            n, 1e6 * t_ctypes, 1e6 * t_reader, t_ctypes / t_reader))
+
+    # Structures point into the mappings, drop them before closing.
+    del physics, ctypes_read
+    info.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Accuracy and smoothness of the wind arrow at different data rates.
+
+Drives the app at a render rate with the car lapping the harness scenario,
+optionally with noise on the heading, and compares the angle of the arrow in
+every frame with the true angle between wind and heading at that moment.
+Reports the angle error, the largest jump of the arrow between two frames,
+and the cost per frame, with smoothing off and on. The first second of each
+run is left out, while the filters settle.
+
+Usage:
+    python tools/bench_smoothing.py --fps 144 --rates 30 10 --noise 0.5
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from ac_harness import FakeAC, Scenario, load_app, percentile
+from shm_writer import PageWriter
+
+
+class NoisyScenario(Scenario):
+    """Scenario with noise on the heading derived from the contact points.
+
+    The yaw rate in shared memory stays clean, as it comes from the physics.
+
+    Args:
+        noise (float): Standard deviation of the heading noise in degrees.
+        seed (int): Seed of the noise, the same for every run.
+    """
+    def __init__(self, noise, seed=0):
+        super().__init__()
+        rng = random.Random(seed)
+        self.noise = [math.radians(rng.gauss(0, noise)) for n in range(4096)]
+
+    def tyre_contact_point(self, t, car_id, wheel):
+        """Contact point rotated around the car position by the noise at time t."""
+        x, y, z = super().tyre_contact_point(t, car_id, wheel)
+        cx, cy, cz = self.position(t, car_id)
+        a = self.noise[int(t * 1000) % len(self.noise)]
+        dx = x - cx
+        dz = z - cz
+        return (cx + dx * math.cos(a) - dz * math.sin(a), y,
+                cz + dx * math.sin(a) + dz * math.cos(a))
+
+
+def run(fps, data_rate, smoothing, noise, seconds):
+    """Run the app and collect per frame arrow angle errors.
+
+    Returns:
+        tuple: (sorted errors in degrees, largest jump between frames in degrees,
+            mean us per frame)
+    """
+    scenario = NoisyScenario(noise)
+    fake = FakeAC(scenario)
+    fake.install()
+    app = load_app(config={"SMOOTHING": {
+        "smoothing_enabled": str(smoothing), "data_rate": str(data_rate)}})
+    writer = PageWriter(sys.modules["TrackConditionsLib.sim_info"].get_info())
+    writer.write_scenario(scenario, 0.0)
+    app.acMain("1.16")
+
+    period = 1 / fps
+    errors = []
+    jump = 0.0
+    busy = 0.0
+    last_angle = None
+    frames = int(seconds * fps)
+    warmup = int(fps)
+    for n in range(frames):
+        fake.clock.advance(period)
+        t = fake.clock()
+        writer.write_scenario(scenario, t)
+        start = time.perf_counter()
+        app.acUpdate(period)
+        app.app_render(period)
+        busy += time.perf_counter() - start
+
+        if n < warmup:
+            continue
+        angle = app.wind_indicator.angle
+        true_angle = math.radians(scenario.wind_direction(t)) - scenario.heading(t, 0)
+        errors.append(abs(math.degrees(angle_difference(angle, true_angle))))
+        if last_angle is not None:
+            jump = max(jump, abs(math.degrees(angle_difference(angle, last_angle))))
+        last_angle = angle
+    app.acShutdown()
+    return sorted(errors), jump, 1e6 * busy / frames
+
+
+def angle_difference(a, b):
+    """Difference between two angles in radians, wrapped to [-pi, pi)."""
+    return (a - b + math.pi) % (2 * math.pi) - math.pi
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fps", type=float, default=144, help="Render rate.")
+    parser.add_argument("--rates", type=float, nargs="+", default=[30, 10], help="Data rates to compare.")
+    parser.add_argument("--noise", type=float, default=0.5, help="Heading noise in degrees, std dev.")
+    parser.add_argument("--seconds", type=float, default=30, help="Simulated seconds per run.")
+    args = parser.parse_args(argv)
+
+    print("{:>6} {:>10} {:>10} {:>10} {:>10} {:>9}".format(
+        "rate", "smoothing", "mean deg", "p99 deg", "jump deg", "us/frame"))
+    for rate in args.rates:
+        for smoothing in (False, True):
+            errors, jump, cost = run(args.fps, rate, smoothing, args.noise, args.seconds)
+            print("{:>6.0f} {:>10} {:>10.3f} {:>10.3f} {:>10.3f} {:>9.1f}".format(
+                rate, "on" if smoothing else "off", sum(errors) / len(errors),
+                percentile(errors, 99), jump, cost))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Startup benchmark: time to import the app and to run acMain.
+
+Every run starts a fresh python process, so module imports and shared memory
+mappings are measured as the game sees them when it loads the app. The app is
+compiled to bytecode before timing, as after the first start in the game,
+unless --cold is given. Also reports which shared memory pages were mapped by
+the end of acMain.
+
+Usage:
+    python tools/bench_startup.py --runs 20
+    python tools/bench_startup.py --runs 20 --grid
+"""
+import argparse
+import compileall
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from ac_harness import FakeAC, copy_app, import_app
+
+
+def measure(app_dir=None, config=None, cold=False):
+    """Import the app and run acMain once, in this process.
+
+    Returns:
+        tuple: (import seconds, acMain seconds, names of mapped pages or None
+            if the app doesn't tell)
+    """
+    fake = FakeAC()
+    fake.install()
+    dst = copy_app(app_dir, config)
+    if not cold:
+        compileall.compile_dir(dst, quiet=1)
+
+    start = time.perf_counter()
+    app = import_app(dst)
+    imported = time.perf_counter()
+    app.acMain("1.16")
+    started = time.perf_counter()
+
+    sim_info = sys.modules["TrackConditionsLib.sim_info"]
+    pages = sim_info.get_info().mapped() if hasattr(sim_info, "get_info") else None
+    app.acShutdown()
+    return imported - start, started - imported, pages
+
+
+def run(runs, app_dir=None, grid=False, cold=False):
+    """Measure startup in a fresh python process per run.
+
+    Returns:
+        tuple: (import seconds per run, acMain seconds per run, mapped pages)
+    """
+    command = [sys.executable, os.path.abspath(__file__), "--child"]
+    if app_dir:
+        command += ["--app-dir", app_dir]
+    if grid:
+        command.append("--grid")
+    if cold:
+        command.append("--cold")
+
+    imports = []
+    mains = []
+    pages = None
+    for n in range(runs):
+        output = subprocess.check_output(command, universal_newlines=True).split()
+        imports.append(float(output[0]))
+        mains.append(float(output[1]))
+        pages = output[2]
+    return imports, mains, pages
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20, help="Number of fresh processes.")
+    parser.add_argument("--app-dir", default=None, help="App folder to measure, e.g. of another checkout.")
+    parser.add_argument("--grid", action="store_true", help="Enable the tailwind overlay.")
+    parser.add_argument("--cold", action="store_true", help="Don't compile the app before timing.")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        config = {"GRID": {"grid_enabled": "True"}} if args.grid else None
+        import_time, main_time, pages = measure(args.app_dir, config, args.cold)
+        print(import_time, main_time, ",".join(pages) if pages is not None else "?")
+        return
+
+    imports, mains, pages = run(args.runs, args.app_dir, args.grid, args.cold)
+    print("{:>8} {:>10} {:>10} {:>10}".format("stage", "min ms", "median ms", "max ms"))
+    for stage, times in (("import", imports), ("acMain", mains)):
+        print("{:>8} {:>10.2f} {:>10.2f} {:>10.2f}".format(
+            stage, 1e3 * min(times), 1e3 * statistics.median(times), 1e3 * max(times)))
+    print("pages mapped after acMain: {}".format(pages or "none"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""Replay a conditions recording through the app, faster than real time.
+
+Feeds the recorded samples to the fake `ac` module and the shared memory
+pages, and drives acMain, acUpdate, app_render and acShutdown at a simulated
+render rate. Reports throughput and the time spent in each stage of the pipeline.
+
+Usage:
+    # As fast as possible:
+    python tools/replay.py recordings/20201018_120000.tcrec
+    # At 10x real time:
+    python tools/replay.py recordings/20201018_120000.tcrec --speed 10
+"""
+import argparse
+import bisect
+import math
+import os
+import sys
+import time
+from collections import OrderedDict
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from ac_harness import APP_DIR, FakeAC, Scenario, load_app
+from shm_writer import PageWriter
+
+sys.path.insert(0, APP_DIR)
+from TrackConditionsLib.recorder import load_recording
+
+
+class RecordedScenario(Scenario):
+    """Scenario playing back a recording, holding each sample until the next one.
+
+    Recording time is shifted to start at 0.
+
+    Args:
+        fields (tuple): Field names of the recording.
+        data (array): Flat recorded values, one row per sample.
+    """
+    def __init__(self, fields, data):
+        super().__init__()
+        n = len(fields)
+        self.rows = [tuple(data[i:i + n]) for i in range(0, len(data), n)]
+        if not self.rows:
+            raise ValueError("Recording holds no samples")
+        self.columns = dict((name, i) for i, name in enumerate(fields))
+        t0 = self.rows[0][self.columns['time']]
+        self.times = [row[self.columns['time']] - t0 for row in self.rows]
+        self.duration = self.times[-1]
+
+        self.wind_direction = lambda t: math.degrees(self.value(t, 'wind_dir')) % 360
+        self.wind_speed = lambda t: self.value(t, 'wind_speed')
+        self.status = lambda t: int(self.value(t, 'status'))
+        self.air_temp = lambda t: self.value(t, 'air_temp')
+        self.road_temp = lambda t: self.value(t, 'road_temp')
+        self.surface_grip = lambda t: self.value(t, 'track_grip') / 100
+        self.heading = lambda t, car_id: self.value(t, 'heading')
+        self.position = lambda t, car_id: (0.0, 0.0, 0.0)
+
+    def value(self, t, name):
+        """Recorded value of a field at time t."""
+        index = max(bisect.bisect_right(self.times, t) - 1, 0)
+        return self.rows[index][self.columns[name]]
+
+
+class StageTimer:
+    """Accumulates time spent in wrapped functions, per stage name."""
+    def __init__(self):
+        self.totals = OrderedDict()
+        self.counts = OrderedDict()
+
+    def add(self, name, seconds):
+        """Add one timed call of a stage."""
+        self.totals[name] = self.totals.get(name, 0.0) + seconds
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    def wrap(self, name, func):
+        """Return func wrapped to add its run time to stage name."""
+        perf_counter = time.perf_counter
+        add = self.add
+
+        def timed(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                add(name, perf_counter() - start)
+        return timed
+
+
+def instrument(app, timer):
+    """Wrap the stages of the app pipeline with the stage timer.
+
+    Stages nest: Car.update runs inside Session.update_car, and all stages
+    run inside acUpdate or app_render.
+
+    Returns:
+        tuple: Wrapped acUpdate and app_render.
+    """
+    session = app.session
+    session.focused_car.update = timer.wrap("Car.update", session.focused_car.update)
+    session.update_conditions = timer.wrap("Session.update_conditions", session.update_conditions)
+    session.update_car = timer.wrap("Session.update_car", session.update_car)
+    app.wind_indicator.update = timer.wrap("WindIndicator.update", app.wind_indicator.update)
+    app.app_window.draw = timer.wrap("AppWindow.draw", app.app_window.draw)
+    for view in app.views:
+        for label in view.values:
+            label.set_text = timer.wrap("ACLabel.set_text", label.set_text)
+    return timer.wrap("acUpdate", app.acUpdate), timer.wrap("app_render", app.app_render)
+
+
+def replay(path, fps=60, speed=0.0, duration=None):
+    """Replay a recording through the app.
+
+    Args:
+        path (str): Recording file.
+        fps (float): Simulated render rate.
+        speed (float): Multiple of real time to run at, 0 for as fast as possible.
+        duration (float): Seconds of recording to replay. Optional, defaults to all.
+
+    Returns:
+        tuple: (frames rendered, wall time in seconds, StageTimer)
+    """
+    fields, data = load_recording(path)
+    scenario = RecordedScenario(fields, data)
+    fake = FakeAC(scenario)
+    fake.install()
+    app = load_app()
+    writer = PageWriter(sys.modules["TrackConditionsLib.sim_info"].get_info())
+    writer.write_scenario(scenario, 0.0)
+    app.acMain("1.16")
+
+    timer = StageTimer()
+    update, render = instrument(app, timer)
+
+    end = scenario.duration if duration is None else min(duration, scenario.duration)
+    period = 1 / fps
+    frames = 0
+    perf_counter = time.perf_counter
+    start = perf_counter()
+    while fake.clock() < end:
+        fake.clock.advance(period)
+        t_write = perf_counter()
+        writer.write_scenario(scenario, fake.clock())
+        timer.add("shared memory writer", perf_counter() - t_write)
+        update(period)
+        render(period)
+        frames += 1
+
+        if speed > 0:
+            delay = start + fake.clock() / speed - perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+    wall = perf_counter() - start
+
+    app.acShutdown()
+    return frames, wall, timer
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("recording", help="Recording file made by the conditions recorder.")
+    parser.add_argument("--fps", type=float, default=60, help="Simulated render rate.")
+    parser.add_argument("--speed", type=float, default=0, help="Multiple of real time, 0 for max.")
+    parser.add_argument("--duration", type=float, default=None, help="Seconds of recording to replay.")
+    args = parser.parse_args(argv)
+
+    frames, wall, timer = replay(args.recording, args.fps, args.speed, args.duration)
+    print("{} frames in {:.2f} s: {:.0f} frames/s, {:.1f}x real time".format(
+        frames, wall, frames / wall, frames / args.fps / wall))
+    # Stages nest, so percentages add up to more than 100.
+    print("{:>22} {:>10} {:>10} {:>8}".format("stage", "calls", "us/call", "% wall"))
+    for name, total in timer.totals.items():
+        count = timer.counts[name]
+        print("{:>22} {:>10} {:>10.2f} {:>7.1f}%".format(
+            name, count, 1e6 * total / max(count, 1), 100 * total / wall))
+
+
+if __name__ == "__main__":
+    main()
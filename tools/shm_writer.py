@@ -0,0 +1,231 @@
+"""Shared memory producer: fills the AC pages with scripted or recorded values.
+
+Maps the physics, graphics and static pages through a sim_info backend and
+writes values into them at a chosen rate, bumping packetId on every write
+like the game does. Together with the file backend this lets the whole data
+path of the app run on any platform against a realistic producer.
+
+Usage:
+    # Scripted values, 333 writes per second into /dev/shm:
+    python tools/shm_writer.py --dir /dev/shm --rate 333
+
+    # Recorded values from a csv file with a 't' column and columns named
+    # like 'physics.airTemp' or 'physics.tyreContactPoint[4]':
+    python tools/shm_writer.py --dir /dev/shm --csv session.csv
+
+The app reads the same files when started with TRACKCONDITIONS_SHM_DIR=/dev/shm.
+"""
+import argparse
+import csv
+import math
+import os
+import re
+import struct
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from ac_harness import APP_DIR, Scenario, WHEELS
+
+sys.path.insert(0, APP_DIR)
+from TrackConditionsLib import sim_info
+
+STRUCTURES = {
+    'physics': sim_info.SPageFilePhysics,
+    'graphics': sim_info.SPageFileGraphic,
+    'static': sim_info.SPageFileStatic,
+}
+
+
+class PageWriter:
+    """Write field values into the shared memory pages of a SimInfo.
+
+    Values are packed straight into the mapped memory, without holding
+    ctypes structures on it, so the SimInfo can be closed at any time.
+
+    Args:
+        info (obj:SimInfo): Mapped pages to write into.
+    """
+    def __init__(self, info):
+        self.info = info
+        self.packet_id = 0
+        self._formats = {}
+
+    def _format(self, page, name):
+        """Offset, struct format and value count of a field, cached."""
+        key = (page, name)
+        if key not in self._formats:
+            structure = STRUCTURES[page]
+            ctype = dict(structure._fields_)[name]
+            count = 1
+            while hasattr(ctype, '_length_'):
+                count *= ctype._length_
+                ctype = ctype._type_
+            fmt = struct.Struct('<{}{}'.format(count, ctype._type_))
+            self._formats[key] = (getattr(structure, name).offset, fmt, count)
+        return self._formats[key]
+
+    def set(self, page, name, value, index=None):
+        """Write a field.
+
+        Args:
+            page (str): 'physics', 'graphics' or 'static'.
+            name (str): Field name.
+            value: Number, or sequence of numbers for array fields.
+            index (int): Write a single item of a flattened array field. Optional.
+        """
+        offset, fmt, count = self._format(page, name)
+        memory = self.info.memory(page)
+        if index is not None:
+            item = struct.Struct('<' + fmt.format[-1])
+            item.pack_into(memory, offset + index * item.size, value)
+        elif count == 1:
+            fmt.pack_into(memory, offset, value)
+        else:
+            fmt.pack_into(memory, offset, *value)
+
+    def publish(self, physics=True):
+        """Bump packetId of the physics and graphics pages.
+
+        Args:
+            physics (bool): Also bump the physics page. Optional.
+        """
+        self.packet_id += 1
+        if physics:
+            self.set('physics', 'packetId', self.packet_id)
+        self.set('graphics', 'packetId', self.packet_id)
+
+    def write_scenario(self, scenario, t, car_id=0):
+        """Write the values of a harness Scenario at time t.
+
+        Args:
+            scenario (obj:Scenario): Scripted values.
+            t (float): Simulation time in seconds.
+            car_id (int): Car whose data goes in the physics page.
+        """
+        self.set('graphics', 'status', scenario.status(t))
+        self.set('graphics', 'surfaceGrip', scenario.surface_grip(t))
+        self.set('graphics', 'windSpeed', scenario.wind_speed(t))
+        self.set('graphics', 'windDirection', scenario.wind_direction(t))
+        self.set('graphics', 'carCoordinates', scenario.position(t, car_id))
+        self.set('graphics', 'sessionTimeLeft', 1000 * scenario.session_time_left(t))
+        self.set('graphics', 'iLastTime', int(1000 * scenario.lap_time(t)))
+        self.set('static', 'numCars', scenario.num_cars(t))
+        self.set('physics', 'airTemp', scenario.air_temp(t))
+        self.set('physics', 'roadTemp', scenario.road_temp(t))
+        self.set('physics', 'heading', scenario.heading(t, car_id))
+
+        # Yaw rate from a small finite difference of the heading.
+        # Positive rotation around the y-axis (up) turns the car counterclockwise,
+        # against the compass heading.
+        dt = 0.01
+        yaw = scenario.heading(t + dt, car_id) - scenario.heading(t, car_id)
+        yaw = (yaw + math.pi) % (2 * math.pi) - math.pi
+        self.set('physics', 'localAngularVel', (0.0, -yaw / dt, 0.0))
+
+        contact_points = []
+        for wheel in (WHEELS.FL, WHEELS.FR, WHEELS.RL, WHEELS.RR):
+            contact_points.extend(scenario.tyre_contact_point(t, car_id, wheel))
+        self.set('physics', 'tyreContactPoint', contact_points)
+        # Physics isn't stepped while paused.
+        self.publish(physics=scenario.status(t) != 3)
+
+
+# Column names in recorded csv files, e.g. physics.airTemp or physics.velocity[2]
+COLUMN = re.compile(r'^(physics|graphics|static)\.(\w+)(?:\[(\d+)\])?$')
+
+
+def read_csv(path):
+    """Read recorded rows from a csv file.
+
+    Returns:
+        list: (t, [(page, name, index, value), ...]) per row.
+    """
+    rows = []
+    with open(path, newline='') as f:
+        reader = csv.DictReader(f)
+        columns = []
+        for column in reader.fieldnames:
+            match = COLUMN.match(column)
+            if match:
+                page, name, index = match.groups()
+                columns.append((column, page, name, None if index is None else int(index)))
+        for row in reader:
+            values = [(page, name, index, float(row[column]))
+                      for column, page, name, index in columns]
+            rows.append((float(row['t']), values))
+    return rows
+
+
+def run(writer, rate, duration=None, scenario=None, rows=None, speed=1.0):
+    """Write values at a fixed rate until duration or the recording ends.
+
+    Args:
+        writer (obj:PageWriter): Writer for the pages.
+        rate (float): Writes per second.
+        duration (float): Seconds to run. Optional, runs forever for scenarios.
+        scenario (obj:Scenario): Scripted values, used if rows is None.
+        rows (list): Recorded rows as returned by read_csv.
+        speed (float): Playback speed of simulation time relative to real time.
+
+    Returns:
+        int: Number of writes done.
+    """
+    period = 1 / rate
+    start = time.perf_counter()
+    next_write = start
+    row_index = 0
+    writes = 0
+    while True:
+        t = (next_write - start) * speed
+        if duration is not None and t >= duration * speed:
+            break
+
+        if rows is None:
+            writer.write_scenario(scenario, t)
+        else:
+            # Apply every recorded row up to the current time.
+            if row_index >= len(rows):
+                break
+            while row_index < len(rows) and rows[row_index][0] <= t:
+                for page, name, index, value in rows[row_index][1]:
+                    if name == 'packetId':
+                        continue
+                    writer.set(page, name, value, index)
+                row_index += 1
+            writer.publish()
+        writes += 1
+
+        next_write += period
+        delay = next_write - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            # Fell behind, don't try to catch up with a burst of writes.
+            next_write = time.perf_counter()
+    return writes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dir", default="/dev/shm", help="Folder for the page files.")
+    parser.add_argument("--rate", type=float, default=333, help="Writes per second.")
+    parser.add_argument("--duration", type=float, default=None, help="Seconds to run.")
+    parser.add_argument("--csv", default=None, help="Recorded values to play back.")
+    parser.add_argument("--speed", type=float, default=1.0, help="Playback speed multiplier.")
+    args = parser.parse_args(argv)
+
+    info = sim_info.SimInfo(sim_info.FileBackend(args.dir))
+    writer = PageWriter(info)
+    rows = read_csv(args.csv) if args.csv else None
+    try:
+        writes = run(writer, args.rate, args.duration, Scenario(), rows, args.speed)
+        print("{} writes to {}".format(writes, args.dir))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        info.close()
+
+
+if __name__ == "__main__":
+    main()